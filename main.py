@@ -1,5 +1,6 @@
 import sys
 from modules.Network.servers import TRUSTED_SERVERS
+from modules.Network.checkpoints import TRUSTED_CHECKPOINTS
 
 
 # Choosing client or server
@@ -7,35 +8,137 @@ def client(path: str):
     import modules.Client.client as client
     client.main(path)
 
-def server(path: str, index: int):
+def server(path: str, index: int, storage_options: dict = None):
     import modules.Server.server as server
-    server.main(path, index)
+    server.main(path, index, storage_options)
+
+def convert(path: str):
+    import modules.Blockchain.storage_utils.converter as converter
+    count = converter.convert_file_storage(path)
+    print(f'Converted {count} blocks to segment storage!')
+
+def export_archive(path: str, archive_path: str, storage_options: dict):
+    import modules.Blockchain.storage_utils.archive as archive
+    from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+
+    chain = StoredBlockchainFactory().create(path, **storage_options)
+    count = archive.export_blockchain(chain, archive_path)
+    chain.close()
+    print(f'Exported {count} blocks to {archive_path}!')
+
+def import_archive(path: str, archive_path: str, storage_options: dict):
+    import modules.Blockchain.storage_utils.archive as archive
+    from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+
+    chain = StoredBlockchainFactory().create(path, **storage_options)
+    try:
+        count = archive.import_blockchain(chain, archive_path)
+
+    finally:
+        chain.close()
+
+    print(f'Imported {count} blocks from {archive_path}!')
+
+def audit(path: str, storage_options: dict, workers: int = None, executor: str = 'process'):
+    from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+    from modules.Blockchain.validation_utils.factories import ParallelValidatorFactory
+
+    from modules.Blockchain.utils.Drivers.hash import get_hash_algorithm
+
+    chain = StoredBlockchainFactory().create(path, **storage_options)
+    validator = ParallelValidatorFactory().create(workers, executor, get_hash_algorithm(chain.hash_manager.get_algorithm_id()))
+    try:
+        errors = validator.audit_blockchain(chain)
+
+    finally:
+        chain.close()
+
+    for num, error in errors:
+        print(f'Block {num}: {type(error).__name__}: {error}')
+
+    print(f'Audited {chain.num} blocks, found {len(errors)} invalid!')
 
 
 # Load function
 if __name__ == '__main__':
-    if sys.argv.__len__() < 3:
+    # Split options like --storage=segment from arguments
+    args = [arg for arg in sys.argv if not arg.startswith('--')]
+
+    options = {}
+    for arg in sys.argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    if args.__len__() < 3:
         print('Wrong number of arguments!')
-        print('Usage be like: main.py <blockchain path> [server|client]')
+        print('Usage be like: main.py <blockchain path> [server <index>|client|convert|export <archive>|import <archive>|audit] [--storage=file|segment|sqlite] [--lazy] [--cache-size=<bytes>] [--full-verify] [--durability=none|batch|interval] [--copy-on-write] [--lazy-rehash] [--workers=<count>] [--executor=process|thread] [--hash=<algorithm>|auto]')
         sys.exit()
 
-    path = sys.argv[1]
+    path = args[1]
 
-    mode = sys.argv[2]
+    mode = args[2]
+
+    storage_options = {
+        'driver': options.get('storage'),
+        'lazy': 'lazy' in options,
+        'full_verify': 'full-verify' in options,
+        'copy_on_write': 'copy-on-write' in options,
+        'lazy_rehash': 'lazy-rehash' in options,
+        'checkpoints': TRUSTED_CHECKPOINTS,
+    }
+
+    if 'durability' in options:
+        storage_options['durability'] = options['durability']
+
+    if 'hash' in options:
+        storage_options['hash_algorithm'] = options['hash']
+
+    if 'cache-size' in options:
+        storage_options['cache_size'] = int(options['cache-size'])
 
     if mode == 'client':
         client(path)
 
     elif mode == 'server':
-        if len(sys.argv) < 4:
+        if len(args) < 4:
             raise TypeError("Didn't find index argument for server!\n" + "Use: 'py main.py <blockchain path> server <index>")
 
         else:
-            index = int(sys.argv[3])
+            index = int(args[3])
             if index < 0 or index >= len(TRUSTED_SERVERS):
                 raise IndexError("No trusted server with this index!\n" + f"Use index from {0} to {len(TRUSTED_SERVERS) - 1}")
 
-            server(path, index)
+            server(path, index, storage_options)
+
+    elif mode == 'convert':
+        convert(path)
+
+    elif mode in ('export', 'import'):
+        if len(args) < 4:
+            raise TypeError("Didn't find archive argument!\n" + f"Use: 'py main.py <blockchain path> {mode} <archive>")
+
+        # Archived Blocks are streamed, so the storage doesn't need them in memory
+        storage_options['lazy'] = True
+
+        if mode == 'export':
+            # Stored Blocks are exported as they are, nothing is written
+            storage_options['read_only'] = True
+
+            export_archive(path, args[3], storage_options)
+
+        else:
+            import_archive(path, args[3], storage_options)
+
+    elif mode == 'audit':
+        # Blocks are streamed to workers, so the storage doesn't need them in memory
+        storage_options['lazy'] = True
+
+        # Stored Blocks are audited as they are, loading must not repair them
+        storage_options['read_only'] = True
+
+        workers = int(options['workers']) if 'workers' in options else None
+        audit(path, storage_options, workers, options.get('executor', 'process'))
 
     else:
         print('Unknown type of mode!')
\ No newline at end of file
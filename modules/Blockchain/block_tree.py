@@ -0,0 +1,231 @@
+from typing import Dict, List
+from .blockchain import Block, InvalidLink
+from .validated_blockchain import ValidatedBlockchain
+from .validator import BlockchainValidator
+
+import threading
+
+
+BLOCK_KNOWN = 0
+"""Block is already in the tree."""
+
+BLOCK_EXTENDED = 1
+"""Block was appended to the best chain."""
+
+BLOCK_SIDE = 2
+"""Block was kept in a side branch."""
+
+BLOCK_REORGANIZED = 3
+"""Block made its branch the best chain."""
+
+BLOCK_ORPHAN = 4
+"""Parent of the Block is unknown yet, the Block waits for it."""
+
+BLOCK_STALE = 5
+"""Block forks too deep below the best tip and was dropped."""
+
+BLOCK_FORK = 6
+"""Block doesn't extend the best tip and forks weren't allowed, so it was dropped."""
+
+MAX_FORK_DEPTH = 100
+"""Count of Blocks below the best tip side branches are kept for."""
+
+MAX_ORPHANS = 256
+"""Count of Blocks waiting for their parent."""
+
+
+class BlockTree:
+    """Class keeping competing branches of a Blockchain.
+
+    Usage:
+        The best chain is the Blockchain itself, side branches are kept in memory.
+        Block with the highest number is the best tip, the first seen one wins a tie.
+
+        When a side branch gets ahead, only the diverging suffix of the Blockchain
+        is replaced, so a switch costs the depth of the fork.
+        The replaced Blocks become a side branch, so the tip could switch back.
+
+        Blocks coming before their parent are kept by the parent hash
+        and connected when it arrives.
+
+        Blocks from untrusted sources are added with extend_only,
+        so they can't start side branches or rewrite the best chain.
+    """
+
+    def __init__(self, validator: BlockchainValidator, chain: ValidatedBlockchain) -> None:
+        """Block Tree constructor.
+
+        Args:
+            validator: Validator of received Blocks.
+            chain: The best chain. Updated in place on reorganisation.
+        """
+
+        self.validator = validator
+        self.chain = chain
+
+        self.side_blocks: Dict[bytes, Block] = {}
+        self.orphans: Dict[bytes, List[Block]] = {}
+        self.orphan_count = 0
+
+        self.lock = threading.RLock()
+
+    def add_block(self, block: Block, extend_only: bool = False) -> int:
+        """Adds a received Block to the tree.
+
+        Blocks waiting for this one are added after it.
+
+        Args:
+            block: Block to add.
+            extend_only: Drop the Block unless it extends the best tip.
+
+        Returns:
+            What happened to the Block, one of BLOCK_* constants.
+            Blocks connected after it are not reported.
+
+        Raises:
+            InvalidHash: Block has invalid hash.
+            InvalidBlockNumber: Block has invalid number.
+            InvalidLink: Block doesn't follow its parent.
+        """
+
+        self.validator.validate_block(block)
+
+        with self.lock:
+            status = self.connect_block(block, extend_only)
+
+            # Connect Blocks that waited for this one
+            if status in (BLOCK_EXTENDED, BLOCK_SIDE, BLOCK_REORGANIZED):
+                waiting = [block]
+
+                while waiting:
+                    for child in self.orphans.pop(waiting.pop().hash, ()):
+                        self.orphan_count -= 1
+
+                        try:
+                            if self.connect_block(child) in (BLOCK_EXTENDED, BLOCK_SIDE, BLOCK_REORGANIZED):
+                                waiting.append(child)
+
+                        except InvalidLink:
+                            pass
+
+            return status
+
+    def is_known(self, hash: bytes) -> bool:
+        """Checks if a Block with the hash is in the best chain or a side branch."""
+
+        with self.lock:
+            return hash in self.side_blocks or self.chain.get_block_by_hash(hash) is not None
+
+    def connect_block(self, block: Block, extend_only: bool = False) -> int:
+        """Puts a valid Block to the best chain or to a side branch.
+
+        Args:
+            block: Block to connect.
+            extend_only: Drop the Block unless it extends the best tip.
+
+        Raises:
+            InvalidLink: Block doesn't follow its parent.
+        """
+
+        if self.is_known(block.hash):
+            return BLOCK_KNOWN
+
+        if block.num <= self.chain.num - MAX_FORK_DEPTH:
+            return BLOCK_STALE
+
+        # Extends the best tip
+        if block.prev_hash == self.chain.hash and block.num == self.chain.num + 1:
+            self.chain.append_block(block)
+            self.prune()
+            return BLOCK_EXTENDED
+
+        if extend_only:
+            return BLOCK_FORK
+
+        parent = self.find_parent(block)
+
+        if parent is None:
+            self.keep_orphan(block)
+            return BLOCK_ORPHAN
+
+        if isinstance(parent, Block):
+            self.validator.validate_link(parent, block)
+
+        self.side_blocks[block.hash] = block
+
+        if block.num > self.chain.num:
+            self.reorganize(block)
+            return BLOCK_REORGANIZED
+
+        return BLOCK_SIDE
+
+    def find_parent(self, block: Block):
+        """Finds the parent of a Block.
+
+        Returns:
+            Parent Block. Blockchain if the Block is the first one.
+            None if the parent is unknown.
+        """
+
+        if block.num == 1:
+            if block.prev_hash != self.chain.hash_manager.reserved_prev_hash():
+                raise InvalidLink('Invalid prev_hash value of the first block!')
+
+            return self.chain
+
+        parent = self.side_blocks.get(block.prev_hash)
+
+        if parent is None:
+            parent = self.chain.get_block_by_hash(block.prev_hash)
+
+        return parent
+
+    def reorganize(self, tip: Block):
+        """Makes the branch of a side Block the best chain.
+
+        Args:
+            tip: Side Block ahead of the best tip.
+        """
+
+        # Walk down the side branch to the best chain
+        branch = [tip]
+        while branch[-1].num > 1 and branch[-1].prev_hash in self.side_blocks:
+            branch.append(self.side_blocks[branch[-1].prev_hash])
+
+        branch.reverse()
+        fork = branch[0].num
+
+        # Parent of a pruned side Block could be gone
+        if fork > 1 and self.chain.get_block(fork - 1).hash != branch[0].prev_hash:
+            for block in branch:
+                del self.side_blocks[block.hash]
+
+            raise InvalidLink('Branch of the block is forked too deep!')
+
+        # Undone Blocks are kept as a side branch
+        for block in self.chain.iter_blocks(fork):
+            self.side_blocks[block.hash] = block
+
+        for block in branch:
+            del self.side_blocks[block.hash]
+
+        self.chain.replace_blocks(fork, branch)
+        self.prune()
+
+    def keep_orphan(self, block: Block):
+        """Keeps a Block until its parent arrives. The oldest ones are dropped when there are too many."""
+
+        if self.orphan_count >= MAX_ORPHANS:
+            parent_hash = next(iter(self.orphans))
+            self.orphan_count -= len(self.orphans.pop(parent_hash))
+
+        self.orphans.setdefault(block.prev_hash, []).append(block)
+        self.orphan_count += 1
+
+    def prune(self):
+        """Drops side branches forked too deep below the best tip."""
+
+        bottom = self.chain.num - MAX_FORK_DEPTH
+
+        for hash in [hash for hash, block in self.side_blocks.items() if block.num <= bottom]:
+            del self.side_blocks[hash]
@@ -1,5 +1,24 @@
-from typing import List, Union
-import copy
+from typing import Iterable, Iterator, List, Union
+from array import array
+import bisect
+import threading
+
+# NumPy is optional, rows are compared one by one without it
+try:
+    import numpy
+
+except ImportError:
+    numpy = None
+
+
+BLOCK_TABLE_RECENT_SIZE = 64
+"""Count of the last Blocks a table keeps built once they are read."""
+
+HASH_INDEX_MIN_SLOTS = 16
+"""Count of slots of an empty hash index."""
+
+HASH_INDEX_KEY_SIZE = 8
+"""Count of the first hash bytes kept as a key by the hash index."""
 
 
 # Raises
@@ -29,9 +48,14 @@ class Block:
     """Class representing a Block.
 
     Usage:
-        This class is present as a Structure.
+        This class is present as an immutable Structure.
         Use this class with any data.
         Data in class is not validated.
+
+        Blocks can't be changed, so they are shared instead of copied.
+        BlockTable keeps their fields in columns and builds a new Block on read,
+        only Blocks of the last rows are kept and handed out by reference.
+        Use BlockBuilder to make a changed copy.
     
     Structure:
         hash: Hash of the Block.
@@ -41,6 +65,8 @@ class Block:
         data: Data stored in the Block.
     """
 
+    __slots__ = ('hash', 'prev_hash', 'num', 'data')
+
     def __init__(self, hash: bytes, prev_hash: bytes, num: int, data: bytes) -> None:
         """Block constructor.
         
@@ -52,10 +78,25 @@ class Block:
             data: Data storing in the Block.
         """
 
-        self.hash = hash
-        self.prev_hash = prev_hash
-        self.num = num
-        self.data = data
+        object.__setattr__(self, 'hash', hash)
+        object.__setattr__(self, 'prev_hash', prev_hash)
+        object.__setattr__(self, 'num', num)
+        object.__setattr__(self, 'data', data)
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError('Block is immutable! Use BlockBuilder to change it')
+
+    def __delattr__(self, name: str):
+        raise AttributeError('Block is immutable! Use BlockBuilder to change it')
+
+    def __copy__(self) -> 'Block':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'Block':
+        return self
+
+    def __reduce__(self) -> tuple:
+        return Block, (self.hash, self.prev_hash, self.num, self.data)
 
     # Hash
     def get_hash(self) -> bytes:
@@ -67,15 +108,6 @@ class Block:
 
         return self.hash
 
-    def set_hash(self, hash: bytes):
-        """Sets a Hash of Block.
-        
-        Args:
-            hash: New Hash of Block.
-        """
-
-        self.hash = hash
-
     # Previous Hash
     def get_prev_hash(self) -> bytes:
         """Gets a Previous Hash of Block.
@@ -86,7 +118,93 @@ class Block:
 
         return self.prev_hash
 
-    def link_prev_block(self, prev: Union['Block', bytes]):
+    # Num
+    def get_num(self) -> int:
+        """Gets a Number of Block.
+        
+        Returns:
+            Number of Block.
+        """
+
+        return self.num
+
+    # Data
+    def get_data(self) -> bytes:
+        """Gets a Data of Block.
+        
+        Returns:
+            Data of Block.
+        """
+
+        return self.data
+
+
+class BlockBuilder:
+    """Class building a Block.
+
+    Usage:
+        Mutable counterpart of Block. Fill or change fields with setters
+        and get the Block with build. Could be hashed by HashManager
+        the same way as a Block.
+
+    Structure:
+        hash: Hash of the Block.
+        prev_hash: Hash of the previous Block.
+        num: Number of the Block starting from 1.
+        data: Data stored in the Block.
+    """
+
+    __slots__ = ('hash', 'prev_hash', 'num', 'data')
+
+    def __init__(self, hash: bytes = b'', prev_hash: bytes = b'', num: int = 0, data: bytes = b'') -> None:
+        """Block Builder constructor.
+
+        Args:
+            hash: Hash of the Block.
+            prev_hash: Hash of the previous Block.
+            num: Number of the Block starting from 1.
+            data: Data storing in the Block.
+        """
+
+        self.hash = hash
+        self.prev_hash = prev_hash
+        self.num = num
+        self.data = data
+
+    @staticmethod
+    def from_block(block: Block) -> 'BlockBuilder':
+        """Makes Builder with fields of the Block.
+
+        Args:
+            block: Block to start with.
+
+        Returns:
+            Builder of the changed Block.
+        """
+
+        return BlockBuilder(block.hash, block.prev_hash, block.num, block.data)
+
+    def build(self) -> Block:
+        """Makes the Block.
+
+        Returns:
+            Immutable Block with fields of the Builder.
+        """
+
+        return Block(self.hash, self.prev_hash, self.num, self.data)
+
+    # Hash
+    def set_hash(self, hash: bytes):
+        """Sets a Hash of Block.
+        
+        Args:
+            hash: New Hash of Block.
+        """
+
+        self.hash = hash
+
+    # Previous Hash
+    def link_prev_block(self, prev: Union[Block, bytes]):
         """Links the previous block to the current block.
         
         Args:
@@ -99,7 +217,7 @@ class Block:
             TypeError: Invalid argument type.
         """
 
-        if isinstance(prev, Block):
+        if isinstance(prev, (Block, BlockBuilder)):
             self.prev_hash = prev.hash
         elif isinstance(prev, bytes) or prev is None:
             self.prev_hash = prev
@@ -107,15 +225,6 @@ class Block:
             raise TypeError("Argument 'prev' doesn't match allowed argument type!")
 
     # Num
-    def get_num(self) -> int:
-        """Gets a Number of Block.
-        
-        Returns:
-            Number of Block.
-        """
-
-        return self.num
-
     def set_num(self, num: int):
         """Sets a Number of Block.
         
@@ -126,15 +235,6 @@ class Block:
         self.num = num
 
     # Data
-    def get_data(self) -> bytes:
-        """Gets a Data of Block.
-        
-        Returns:
-            Data of Block.
-        """
-
-        return self.data
-
     def set_data(self, data: bytes):
         """Sets a Data of Block.
         
@@ -145,6 +245,521 @@ class Block:
         self.data = data
 
 
+class BlockTable:
+    """Class keeping Blocks in columns.
+
+    Usage:
+        Used by Blockchain classes as blocks instead of a list.
+        Supports the list operations Blockchain classes use.
+
+        Hash and previous hash of every Block lie one after another
+        in one bytearray, data is kept in a separate list.
+        Numbers are not stored: they are kept as runs of consecutive numbers,
+        so a valid Blockchain has one run for all Blocks.
+        Blocks with hashes of another size are kept apart.
+
+        Blocks are built on access, so a read costs a Block and two hash copies.
+        The last Block is kept as it was given, since appends and links read it most.
+        Other Blocks of the last BLOCK_TABLE_RECENT_SIZE rows are kept built once read,
+        so peers asking for recent Blocks share them. Older rows are built on every read,
+        which costs nothing else. Keeping every Block would cost far more memory than the columns save.
+    """
+
+    def __init__(self, blocks: Iterable[Block] = ()) -> None:
+        """Block Table constructor.
+
+        Args:
+            blocks: Blocks to fill the table with.
+        """
+
+        self.hash_size = 0
+        self.hashes = bytearray()
+        self.data = []
+        self.irregular = {}
+        self.run_starts = []
+        self.run_nums = []
+        self.tip = None
+
+        # Built Blocks of the last rows by index, readers share them
+        self.recent = {}
+        self.recent_lock = threading.Lock()
+
+        for block in blocks:
+            self.append(block)
+
+    def normalize_index(self, index: int) -> int:
+        """Turns negative index to positive and checks bounds.
+
+        Raises:
+            IndexError: Index is out of range.
+        """
+
+        if index < 0:
+            index += len(self.data)
+
+        if index < 0 or index >= len(self.data):
+            raise IndexError('Block index out of range')
+
+        return index
+
+    # List operations
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, index: int) -> Block:
+        index = self.normalize_index(index)
+
+        if self.tip is not None and index == len(self.data) - 1:
+            return self.tip
+
+        recent = index >= len(self.data) - BLOCK_TABLE_RECENT_SIZE
+
+        if recent:
+            block = self.recent.get(index)
+
+            if block is not None:
+                return block
+
+        hash, prev_hash = self.get_hashes(index)
+        block = Block(hash, prev_hash, self.get_num(index), self.data[index])
+
+        if recent:
+            self.keep_recent(index, block)
+
+        return block
+
+    def __setitem__(self, index: int, block: Block):
+        index = self.normalize_index(index)
+        self.forget_recent(index)
+
+        self.set_hashes(index, block)
+        self.set_num(index, block.num)
+        self.data[index] = block.data
+
+        if index == len(self.data) - 1:
+            self.tip = block
+
+    def __delitem__(self, index: int):
+        index = self.normalize_index(index)
+        self.forget_recent()
+
+        if index == len(self.data) - 1:
+            self.tip = None
+
+        # Hashes
+        offset = index * 2 * self.hash_size
+        del self.hashes[offset:offset + 2 * self.hash_size]
+        self.shift_irregular(index, -1)
+
+        # Numbers
+        self.split_run(index)
+        self.split_run(index + 1)
+
+        run = self.find_run(index)
+        del self.run_starts[run]
+        del self.run_nums[run]
+
+        for k in range(run, len(self.run_starts)):
+            self.run_starts[k] -= 1
+
+        self.merge_runs(run - 1)
+
+        del self.data[index]
+
+    def __iter__(self) -> Iterator[Block]:
+        return self.iter_range(range(len(self.data)))
+
+    def iter_range(self, indexes: range) -> Iterator[Block]:
+        """Iterates over Blocks by their indexes.
+
+        Rows are read directly and the run of numbers is looked up
+        only when the walk leaves it. Stops if the table got shorter.
+
+        Args:
+            indexes: Indexes of Blocks to yield in order.
+
+        Yields:
+            Blocks.
+        """
+
+        run_start, run_end, run_num = 0, -1, 0
+
+        for index in indexes:
+            if index >= len(self.data):
+                return
+
+            if self.tip is not None and index == len(self.data) - 1:
+                yield self.tip
+                continue
+
+            block = self.recent.get(index) if self.recent else None
+
+            if block is not None:
+                yield block
+                continue
+
+            if index in self.irregular:
+                hash, prev_hash = self.irregular[index]
+
+            else:
+                offset = index * 2 * self.hash_size
+                hash = bytes(self.hashes[offset:offset + self.hash_size])
+                prev_hash = bytes(self.hashes[offset + self.hash_size:offset + 2 * self.hash_size])
+
+            if not run_start <= index < run_end:
+                run = self.find_run(index)
+                run_start, run_num = self.run_starts[run], self.run_nums[run]
+                run_end = self.run_starts[run + 1] if run + 1 < len(self.run_starts) else len(self.data)
+
+            yield Block(hash, prev_hash, run_num + index - run_start, self.data[index])
+
+    def append(self, block: Block):
+        index = len(self.data)
+
+        self.data.append(block.data)
+        self.hashes += bytes(2 * self.hash_size)
+        self.set_hashes(index, block)
+
+        if index == 0 or self.get_num(index - 1) + 1 != block.num:
+            self.run_starts.append(index)
+            self.run_nums.append(block.num)
+
+        self.tip = block
+
+    def insert(self, index: int, block: Block):
+        index = min(max(index + len(self.data) if index < 0 else index, 0), len(self.data))
+
+        if index == len(self.data):
+            self.append(block)
+            return
+
+        self.forget_recent()
+
+        # Hashes
+        offset = index * 2 * self.hash_size
+        self.hashes[offset:offset] = bytes(2 * self.hash_size)
+        self.shift_irregular(index, 1)
+
+        # Numbers
+        self.split_run(index)
+
+        run = self.find_run(index)
+        for k in range(run, len(self.run_starts)):
+            self.run_starts[k] += 1
+
+        self.run_starts.insert(run, index)
+        self.run_nums.insert(run, block.num)
+        self.merge_runs(run)
+        self.merge_runs(run - 1)
+
+        self.data.insert(index, block.data)
+        self.set_hashes(index, block)
+
+    def clear(self):
+        self.tip = None
+        self.forget_recent()
+        self.hashes.clear()
+        self.data.clear()
+        self.irregular.clear()
+        self.run_starts.clear()
+        self.run_nums.clear()
+
+    def keep_recent(self, index: int, block: Block):
+        """Keeps the built Block of a recent row, dropping rows the table grew past."""
+
+        with self.recent_lock:
+            recent = self.recent
+
+            # Readers see either dict whole
+            if len(recent) >= 2 * BLOCK_TABLE_RECENT_SIZE:
+                bottom = len(self.data) - BLOCK_TABLE_RECENT_SIZE
+                recent = {row: kept for row, kept in recent.items() if row >= bottom}
+
+            recent[index] = block
+            self.recent = recent
+
+    def forget_recent(self, index: int = None):
+        """Drops the kept Block of the row, or every kept Block if rows move."""
+
+        with self.recent_lock:
+            if index is None:
+                self.recent = {}
+
+            else:
+                self.recent.pop(index, None)
+
+    # Hashes
+    def set_hashes(self, index: int, block: Block):
+        """Writes hashes of the Block to the row."""
+
+        hash, prev_hash = block.hash, block.prev_hash
+
+        # The first Block with proper hashes sets the size of rows
+        if self.hash_size == 0 and isinstance(hash, bytes) and isinstance(prev_hash, bytes) and len(hash) == len(prev_hash) > 0:
+            self.hash_size = len(hash)
+            self.hashes = bytearray(2 * self.hash_size * len(self.data))
+
+        if self.hash_size == 0 or not isinstance(hash, bytes) or not isinstance(prev_hash, bytes) \
+                or len(hash) != self.hash_size or len(prev_hash) != self.hash_size:
+            self.irregular[index] = (hash, prev_hash)
+            return
+
+        self.irregular.pop(index, None)
+
+        offset = index * 2 * self.hash_size
+        self.hashes[offset:offset + 2 * self.hash_size] = hash + prev_hash
+
+    def shift_irregular(self, index: int, shift: int):
+        """Moves rows kept apart after index by shift."""
+
+        if not self.irregular:
+            return
+
+        irregular = {}
+        for row, hashes in self.irregular.items():
+            if row < index:
+                irregular[row] = hashes
+
+            elif row > index or shift > 0:
+                irregular[row + shift] = hashes
+
+        self.irregular = irregular
+
+    def get_hashes(self, index: int) -> tuple:
+        """Gets hash and previous hash of the row."""
+
+        if index in self.irregular:
+            return self.irregular[index]
+
+        offset = index * 2 * self.hash_size
+        return bytes(self.hashes[offset:offset + self.hash_size]), bytes(self.hashes[offset + self.hash_size:offset + 2 * self.hash_size])
+
+    def find_broken_link(self) -> int:
+        """Finds the first Block which doesn't reference the Block before it.
+
+        All rows are compared at once with NumPy when it's installed.
+
+        Returns:
+            Index of the first Block with prev_hash other than hash of the previous Block.
+            None if every Block is linked.
+        """
+
+        if len(self.data) < 2:
+            return None
+
+        # Rows lie as hash, prev_hash one after another, each hash is compared as a whole.
+        # The view holds the bytearray only until return, it can't be resized meanwhile
+        if numpy is not None and not self.irregular:
+            rows = numpy.frombuffer(self.hashes, dtype=f'V{self.hash_size}').reshape(len(self.data), 2)
+            broken = numpy.flatnonzero(rows[1:, 1] != rows[:-1, 0])
+            del rows
+
+            return int(broken[0]) + 1 if len(broken) else None
+
+        hash, _ = self.get_hashes(0)
+
+        for index in range(1, len(self.data)):
+            next_hash, prev_hash = self.get_hashes(index)
+
+            if prev_hash != hash:
+                return index
+
+            hash = next_hash
+
+        return None
+
+    # Numbers
+    def find_misnumbered(self, num: int) -> int:
+        """Finds the first Block breaking consecutive numbers.
+
+        Costs nothing, since numbers are kept as runs.
+
+        Args:
+            num: Expected number of the first Block.
+
+        Returns:
+            Index of the first Block with number other than num plus its index.
+            None if every Block is numbered so.
+        """
+
+        if not self.data:
+            return None
+
+        if self.run_nums[0] != num:
+            return 0
+
+        return self.run_starts[1] if len(self.run_starts) > 1 else None
+
+    def find_run(self, index: int) -> int:
+        """Finds the run of numbers the row belongs to."""
+
+        return bisect.bisect_right(self.run_starts, index) - 1
+
+    def get_num(self, index: int) -> int:
+        run = self.find_run(index)
+        return self.run_nums[run] + index - self.run_starts[run]
+
+    def set_num(self, index: int, num: int):
+        if self.get_num(index) == num:
+            return
+
+        self.split_run(index)
+        self.split_run(index + 1)
+
+        run = self.find_run(index)
+        self.run_nums[run] = num
+
+        self.merge_runs(run)
+        self.merge_runs(run - 1)
+
+    def split_run(self, index: int):
+        """Makes a run of numbers start at the row."""
+
+        if index >= len(self.data):
+            return
+
+        run = self.find_run(index)
+
+        if self.run_starts[run] != index:
+            self.run_starts.insert(run + 1, index)
+            self.run_nums.insert(run + 1, self.run_nums[run] + index - self.run_starts[run])
+
+    def merge_runs(self, run: int):
+        """Joins the run with the next one if their numbers go on."""
+
+        if run < 0 or run + 1 >= len(self.run_starts):
+            return
+
+        if self.run_nums[run] + self.run_starts[run + 1] - self.run_starts[run] == self.run_nums[run + 1]:
+            del self.run_starts[run + 1]
+            del self.run_nums[run + 1]
+
+
+class HashIndex:
+    """Class finding numbers of Blocks by their hashes.
+
+    Usage:
+        Used by Blockchain classes as hash_index.
+
+        Keeps a key made of the first bytes of a hash and the Block number
+        in two arrays of an open addressed table, so hashes are not copied:
+        Blockchain checks the Block a number points to against its hash column.
+        Keys of different hashes could match, so every matching number is given.
+
+        Records are not updated when Blocks change, outdated ones are dropped with discard.
+    """
+
+    def __init__(self) -> None:
+        self.keys = array('Q', bytes(8 * HASH_INDEX_MIN_SLOTS))
+        self.nums = array('q', bytes(8 * HASH_INDEX_MIN_SLOTS))
+        self.count = 0
+        self.used = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def get_key(hash: bytes) -> int:
+        """Makes the key of a hash. Hashes of other types are keyed by their representation."""
+
+        if not isinstance(hash, (bytes, bytearray)):
+            hash = repr(hash).encode('utf-8')
+
+        return int.from_bytes(hash[:HASH_INDEX_KEY_SIZE], 'little')
+
+    def get_slot(self, key: int) -> int:
+        """Spreads keys over slots, so hashes sharing low bytes don't pile up."""
+
+        return (key * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) % len(self.nums)
+
+    # Slots keep numbers shifted by one, so zero is a free slot and -1 a dropped record
+    def add(self, hash: bytes, num: int):
+        """Adds the record of a Block.
+
+        Args:
+            hash: Hash of the Block.
+            num: Number of the Block.
+        """
+
+        if (self.used + 1) * 3 > len(self.nums) * 2:
+            self.resize()
+
+        key, value = self.get_key(hash), num + 1
+        slot, free = self.get_slot(key), None
+
+        while self.nums[slot] != 0:
+            if self.nums[slot] == -1:
+                free = slot if free is None else free
+
+            elif self.keys[slot] == key and self.nums[slot] == value:
+                return
+
+            slot = (slot + 1) % len(self.nums)
+
+        if free is None:
+            free = slot
+            self.used += 1
+
+        self.keys[free] = key
+        self.nums[free] = value
+        self.count += 1
+
+    def find(self, hash: bytes) -> List[int]:
+        """Finds numbers of Blocks which could have the hash."""
+
+        key = self.get_key(hash)
+        slot = self.get_slot(key)
+        nums = []
+
+        while self.nums[slot] != 0:
+            if self.keys[slot] == key and self.nums[slot] > 0:
+                nums.append(self.nums[slot] - 1)
+
+            slot = (slot + 1) % len(self.nums)
+
+        return nums
+
+    def discard(self, hash: bytes, num: int):
+        """Drops the record of a Block if there's one."""
+
+        key, value = self.get_key(hash), num + 1
+        slot = self.get_slot(key)
+
+        while self.nums[slot] != 0:
+            if self.keys[slot] == key and self.nums[slot] == value:
+                self.nums[slot] = -1
+                self.count -= 1
+                return
+
+            slot = (slot + 1) % len(self.nums)
+
+    def resize(self):
+        """Moves records to a table with at most half of slots taken, dropped records are left behind."""
+
+        keys, nums = self.keys, self.nums
+        size = HASH_INDEX_MIN_SLOTS
+
+        while size < 2 * (self.count + 1):
+            size *= 2
+
+        self.keys = array('Q', bytes(8 * size))
+        self.nums = array('q', bytes(8 * size))
+        self.used = self.count
+
+        for key, value in zip(keys, nums):
+            if value > 0:
+                slot = self.get_slot(key)
+
+                while self.nums[slot] != 0:
+                    slot = (slot + 1) % size
+
+                self.keys[slot] = key
+                self.nums[slot] = value
+
+    def clear(self):
+        self.__init__()
+
+
 class Blockchain:
     """Class representing a whole Blockchain.
     
@@ -159,6 +774,8 @@ class Blockchain:
         num: Number of the last Block in the Blockchain.
         blocks: Tied up Blocks chain.
             Use get method for using Blocks.
+        hash_index: Numbers of Blocks by their hashes, HashIndex.
+            Could keep outdated records, use get_block_by_hash.
     """
 
     def __init__(self, hash: bytes, num: int, blocks: List[Block] = []) -> None:
@@ -169,7 +786,11 @@ class Blockchain:
 
         self.hash = hash
         self.num = num
-        self.blocks = copy.deepcopy(blocks)
+        self.blocks = BlockTable(blocks)
+        self.hash_index = HashIndex()
+
+        for block in self.blocks:
+            self.index_block(block)
 
     # Hash
     def get_hash(self) -> bytes:
@@ -246,7 +867,77 @@ class Blockchain:
 
         self.check_index(index)
 
-        return copy.deepcopy(self.blocks[index])
+        return self.blocks[index]
+
+    def get_block_by_hash(self, hash: bytes) -> Block:
+        """Finds a Block in the Blockchain by its hash.
+
+        Blocks are numbered one after another, so the Block is found
+        with one lookup in the hash index and checked against its hash afterwards.
+
+        Args:
+            hash: Hash of the Block.
+
+        Returns:
+            Block with the hash. None if there's no such Block.
+        """
+
+        nums = self.hash_index.find(hash)
+
+        if not nums or len(self) == 0:
+            return None
+
+        first = self.blocks[0].num
+        key = self.hash_index.get_key(hash)
+
+        for num in nums:
+            index = num - first
+            block = self.blocks[index] if 0 <= index < len(self) else None
+
+            if block is not None and block.hash == hash and block.num == num:
+                return block
+
+            # Block was changed or removed since it was indexed, another hash with the key keeps its record
+            if block is None or block.num != num or self.hash_index.get_key(block.hash) != key:
+                self.hash_index.discard(hash, num)
+
+        return None
+
+    def iter_blocks(self, start: int = 0, stop: int = None, step: int = 1, reverse: bool = False) -> Iterator[Block]:
+        """Iterates over Blocks in the Blockchain.
+
+        Bounds are taken at the call, so Blocks appended while iterating are not yielded.
+        Blocks are immutable and shared, BlockTable builds them from its columns.
+
+        Args:
+            start: Index of the first Block.
+            stop: Index to stop before. None for the end of Blockchain.
+            step: Step between indexes.
+            reverse: Walk the same indexes from the last one.
+
+        Returns:
+            Iterator over Blocks.
+        """
+
+        indexes = range(len(self))[start:stop:step]
+
+        if reverse:
+            indexes = indexes[::-1]
+
+        if hasattr(self.blocks, 'iter_range'):
+            return self.blocks.iter_range(indexes)
+
+        return (self.blocks[index] for index in indexes)
+
+    def index_block(self, block: Block):
+        """Adds a Block to the hash index.
+
+        Args:
+            block: Block to index. Blocks without hash are skipped.
+        """
+
+        if block.hash:
+            self.hash_index.add(block.hash, block.num)
 
     def set_block(self, block: Block, index: int):
         """Set a Block in the Blockchain.
@@ -261,7 +952,8 @@ class Blockchain:
 
         self.check_index(index)
 
-        self.blocks[index] = copy.deepcopy(block)
+        self.blocks[index] = block
+        self.index_block(block)
 
     def append_block(self, block: Block):
         """Appends a block to the end of Blockchain.
@@ -270,7 +962,8 @@ class Blockchain:
             block: Block to append.
         """
 
-        self.blocks.append(copy.deepcopy(block))
+        self.blocks.append(block)
+        self.index_block(block)
 
     def remove_block(self, index: int):
         """Removes a block from the Blockchain.
@@ -284,13 +977,36 @@ class Blockchain:
 
         self.check_index(index)
 
-        block = self.blocks[index]
-        self.blocks.remove(block)
+        del self.blocks[index]
+
+    def replace_blocks(self, index: int, blocks: List[Block]):
+        """Replaces Blocks from index to the end of Blockchain.
+
+        Only the replaced suffix is touched, Blocks before index are kept.
+
+        Args:
+            index: Index of the first replaced Block. Could be the length of Blockchain.
+            blocks: New Blocks following the kept ones.
+
+        Raises:
+            InvalidBlockNumber: Block index is out of bounds!
+        """
+
+        if index != len(self):
+            self.check_index(index)
+
+        for i in range(len(self) - 1, index - 1, -1):
+            del self.blocks[i]
+
+        for block in blocks:
+            self.blocks.append(block)
+            self.index_block(block)
 
     def clear(self):
         """Clears Blockchain."""
 
         self.blocks.clear()
+        self.hash_index.clear()
 
 
 # Interfaces
@@ -320,6 +1036,15 @@ class HashManager:
             Hash size in bytes.
         """
 
+    def get_algorithm_id(self) -> int:
+        """Get Algorithm id.
+
+        Storages record it and peers compare it before exchanging Blocks.
+
+        Returns:
+            Id of the Hash algorithm.
+        """
+
     def is_valid_hash(self, hash: bytes) -> bool:
         """Function used to check if presented Hash corresponds
         to the current Hash algorithm.
@@ -336,7 +1061,7 @@ class HashManager:
         Uses the current Hash Algorithm.
         
         Args:
-            block: Block to hash.
+            block: Block or BlockBuilder to hash.
 
         Returns:
             Hash of block.
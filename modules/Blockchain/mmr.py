@@ -0,0 +1,267 @@
+from typing import List, Tuple
+from .blockchain import HashManager, InvalidBlockNumber
+
+
+MMR_NODE_PREFIX = b'\x01'
+"""Prefix of hashed children, so a parent can't be taken for a leaf."""
+
+
+def mmr_size(leaves: int) -> int:
+    """Count of nodes in a Merkle Mountain Range with the count of leaves."""
+
+    return 2 * leaves - bin(leaves).count('1')
+
+
+def mmr_mountains(leaves: int) -> List[Tuple[int, int]]:
+    """Splits leaves to mountains from the left.
+
+    Returns:
+        Index of the first leaf and height of every mountain.
+    """
+
+    mountains = []
+    start = 0
+
+    for height in range(leaves.bit_length() - 1, -1, -1):
+        if leaves & (1 << height):
+            mountains.append((start, height))
+            start += 1 << height
+
+    return mountains
+
+
+def hash_node(hash_manager: HashManager, left: bytes, right: bytes) -> bytes:
+    return hash_manager.hash(MMR_NODE_PREFIX + left + right)
+
+
+def bag_peaks(hash_manager: HashManager, peaks: List[bytes]) -> bytes:
+    """Folds peaks to a single root from the right. Reserved hash for no peaks."""
+
+    if not peaks:
+        return hash_manager.reserved_prev_hash()
+
+    root = peaks[-1]
+    for peak in reversed(peaks[:-1]):
+        root = hash_node(hash_manager, peak, root)
+
+    return root
+
+
+def verify_proof(hash_manager: HashManager, hash: bytes, num: int, count: int, siblings: List[bytes], peaks: List[bytes]) -> bool:
+    """Checks that a Block is included in a Blockchain.
+
+    Args:
+        hash_manager: Hash Manager of the Blockchain.
+        hash: Hash of the Block.
+        num: Number of the Block.
+        count: Count of Blocks in the Blockchain.
+        siblings: Siblings from the proof, from the leaf up.
+        peaks: Peaks of the Blockchain.
+
+    Returns:
+        True if the proof leads from the Block to one of peaks.
+    """
+
+    if not 0 < num <= count:
+        return False
+
+    mountains = mmr_mountains(count)
+
+    if len(peaks) != len(mountains):
+        return False
+
+    leaf = num - 1
+
+    for mountain, (start, height) in enumerate(mountains):
+        if start <= leaf < start + (1 << height):
+            break
+
+    if len(siblings) != height:
+        return False
+
+    offset = leaf - start
+    node = hash
+
+    for level, sibling in enumerate(siblings):
+        if offset >> level & 1:
+            node = hash_node(hash_manager, sibling, node)
+
+        else:
+            node = hash_node(hash_manager, node, sibling)
+
+    return node == peaks[mountain]
+
+
+class MountainNodes:
+    """Class keeping node hashes of a Merkle Mountain Range in memory one after another.
+
+    Usage:
+        Nodes are added in order, so every prefix of leaves has its nodes at the start.
+        Storages could give another class with the same methods keeping nodes elsewhere.
+    """
+
+    def __init__(self, hash_size: int, nodes: bytes = b'') -> None:
+        """Mountain Nodes constructor.
+
+        Args:
+            hash_size: Size of node hashes.
+            nodes: Node hashes one after another.
+        """
+
+        self.hash_size = hash_size
+        self.buffer = bytearray(nodes)
+
+    def __len__(self) -> int:
+        return len(self.buffer) // self.hash_size
+
+    def get_range(self, start: int, end: int) -> bytes:
+        """Gets node hashes from start to end one after another."""
+
+        return bytes(self.buffer[start * self.hash_size:end * self.hash_size])
+
+    def extend(self, nodes: bytes):
+        """Adds node hashes after the last one."""
+
+        self.buffer += nodes
+
+    def truncate(self, count: int):
+        """Drops nodes after the count."""
+
+        del self.buffer[count * self.hash_size:]
+
+
+class MerkleMountainRange:
+    """Class accumulating Block hashes in a Merkle Mountain Range.
+
+    Usage:
+        Leaves are Block hashes in order of numbers.
+        Nodes are kept by MountainNodes in the order they are added,
+        peaks are kept apart, so appends and roots don't read nodes.
+        Proofs and truncation read a node per level.
+
+        Append costs a hash per merged mountain.
+        Changed Blocks are applied with truncate and append of the following ones.
+
+    Structure:
+        nodes: Node hashes. MountainNodes or a class with the same methods.
+        leaves: Count of accumulated leaves.
+        peak_hashes: Peaks of mountains from the left.
+    """
+
+    def __init__(self, hash_manager: HashManager, nodes: MountainNodes = None) -> None:
+        """Merkle Mountain Range constructor.
+
+        Args:
+            hash_manager: Hash Manager used for nodes.
+            nodes: Node hashes of accumulated leaves. Trailing nodes of a partial leaf are dropped.
+                If None, nodes are kept in memory.
+        """
+
+        self.hash_manager = hash_manager
+        self.hash_size = hash_manager.get_hash_len()
+        self.nodes = nodes if nodes is not None else MountainNodes(self.hash_size)
+        self.leaves = 0
+        self.peak_hashes = []
+
+        # Largest count of leaves fitting the nodes
+        count = len(self.nodes)
+        leaves = (count + count.bit_length()) // 2
+
+        while mmr_size(leaves) > count:
+            leaves -= 1
+
+        self.truncate(leaves)
+
+    def __len__(self) -> int:
+        return self.leaves
+
+    def get_node(self, pos: int) -> bytes:
+        return self.nodes.get_range(pos, pos + 1)
+
+    def get_leaf(self, num: int) -> bytes:
+        """Gets the hash of a Block by its number."""
+
+        return self.get_node(mmr_size(num - 1))
+
+    def append(self, hash: bytes):
+        """Appends a Block hash merging equal mountains.
+
+        Args:
+            hash: Hash of the next Block.
+        """
+
+        node = hash
+        added = bytearray(node)
+
+        # Every trailing one of the leaf index merges the last peak
+        leaf = self.leaves
+
+        while leaf & 1:
+            node = hash_node(self.hash_manager, self.peak_hashes.pop(), node)
+            added += node
+
+            leaf >>= 1
+
+        self.nodes.extend(bytes(added))
+        self.peak_hashes.append(node)
+        self.leaves += 1
+
+    def truncate(self, leaves: int):
+        """Drops leaves after the count.
+
+        Args:
+            leaves: Count of leaves to keep.
+        """
+
+        self.nodes.truncate(mmr_size(leaves))
+        self.leaves = leaves
+        self.peak_hashes = [self.get_node(mmr_size(start + (1 << height)) - 1) for start, height in mmr_mountains(leaves)]
+
+    def peaks(self) -> List[bytes]:
+        """Gets peaks of mountains from the left."""
+
+        return list(self.peak_hashes)
+
+    def root(self) -> bytes:
+        """Gets the single hash of the whole range."""
+
+        return bag_peaks(self.hash_manager, self.peaks())
+
+    def prove(self, num: int) -> List[bytes]:
+        """Builds the inclusion proof of a Block.
+
+        Args:
+            num: Number of the Block.
+
+        Returns:
+            Siblings from the leaf up to its peak.
+
+        Raises:
+            InvalidBlockNumber: Block number is out of bounds!
+        """
+
+        if not 0 < num <= self.leaves:
+            raise InvalidBlockNumber('Block number is out of bounds!')
+
+        leaf = num - 1
+
+        for start, height in mmr_mountains(self.leaves):
+            if start <= leaf < start + (1 << height):
+                break
+
+        offset = leaf - start
+        pos = mmr_size(leaf)
+        siblings = []
+
+        for level in range(height):
+            span = (1 << level + 1) - 1
+
+            if offset >> level & 1:
+                siblings.append(self.get_node(pos - span))
+                pos += 1
+
+            else:
+                siblings.append(self.get_node(pos + span))
+                pos += span + 1
+
+        return siblings
@@ -1,5 +1,5 @@
 from typing import List
-from .blockchain import Block, Blockchain
+from .blockchain import Block, Blockchain, InvalidHash
 from .validator import BlockchainValidator
 
 
@@ -8,6 +8,9 @@ class ServerBlockchain(Blockchain):
     
     It implements operation Insert Block that inserts blocks
     from the end and validates insertion.
+
+    Once a trusted checkpoint of the validator is inserted and validated,
+    Blocks below it are only checked to link to it.
     """
 
     def __init__(self, validator: BlockchainValidator, header: Blockchain) -> None:
@@ -20,6 +23,7 @@ class ServerBlockchain(Blockchain):
         """
 
         self.validator = validator
+        self.anchored = False
         super().__init__(header.hash, header.num)
 
     def insert_block(self, block: Block) -> bool:
@@ -39,7 +43,12 @@ class ServerBlockchain(Blockchain):
             InvalidHash: Inserted block has invalid hash.
         """
 
-        self.validator.validate_block(block)
+        # Checkpoint Block itself is rehashed, so its hash is bound to its fields
+        if not self.anchored:
+            self.validator.validate_block(block)
+
+        elif block.num == 1 and block.prev_hash != self.validator.hash_manager.reserved_prev_hash():
+            raise InvalidHash("Invalid prev_hash value of the first block!")
 
         if len(self) == 0:
             self.validator.validate_link(block, self)
@@ -49,5 +58,10 @@ class ServerBlockchain(Blockchain):
             self.validator.validate_link(block, next_block)
 
         self.blocks.insert(0, block)
+        self.index_block(block)
+
+        # Blocks below are trusted by the chain of links to the checkpoint
+        if not self.anchored and self.validator.is_checkpoint(block):
+            self.anchored = True
 
         return block.num != 1
\ No newline at end of file
@@ -1,5 +1,19 @@
-from typing import List
+from typing import Iterable, List, Tuple
 from .validated_blockchain import Block, Blockchain, ValidatedBlockchain, HashManager
+from .storage_utils.lazy import LazyBlockList
+from .storage_utils.snapshot import Snapshot, SnapshotFile, SNAPSHOT_INTERVAL
+from .storage_utils.writer import GroupCommitWriter, DURABILITY_NONE, DURABILITY_BATCH
+from .storage_utils.journal import EDIT_SET, EDIT_REMOVE, EDIT_APPEND
+from .storage_utils.hash_index import HashIndexFile, HASH_INDEX_TAIL
+from .storage_utils.mmr import MountainRangeFile, StoredMountainNodes, MMR_STORE_BATCH
+from .mmr import MerkleMountainRange, mmr_size
+
+import contextlib
+import threading
+
+
+class ReadOnlyStorage(Exception):
+    """Thrown when a storage opened read-only is edited."""
 
 
 class StoredBlockchain(ValidatedBlockchain):
@@ -8,14 +22,635 @@ class StoredBlockchain(ValidatedBlockchain):
     Syncronizes every operation of Blockchain with storage.
 
     If operation doesn't throw an exception, changes would be applied to the storage.
+
+    Blocks could be loaded lazily. In this case only the Header is read
+    on start and Blocks are read from the storage on first access.
+
+    Storage keeps a snapshot of the last verified Block. On load only Blocks
+    after the snapshot are rehashed unless the full verification is asked.
+    Blocks failing the verification are fixed in memory only and the first
+    of them is kept in invalid_from, so the storage keeps the evidence for an audit.
+
+    Changed Blocks are written by GroupCommitWriter, so appends coming
+    close in time share one write. Durability level tells when
+    storage files are synced and if operations wait for it.
+
+    Hash index of stored Blocks is kept in a file next to them and searched there,
+    so Blocks are found by hash without loading the index or reading the storage.
+    Only Blocks indexed since the load are kept in the hash index in memory.
+
+    In lazy rehash mode and inside a transaction edits are kept in memory
+    and written as one batch on commit, flush or close.
+    Outside a transaction appends and replaced suffixes are stored right away
+    together with the edits deferred before them, so accepted Blocks are durable.
+
+    Merkle Mountain Range over Block hashes is kept in a file and loaded on first use.
+    Only its peaks and nodes not written yet are kept in memory, proofs read nodes from the file.
+    It's updated from the first changed Block, so an append costs a few hashes.
+    Stored nodes are kept on load if their last leaf matches the stored Block.
+
+    Opened read-only, stored Blocks are served as they are for audits:
+    nothing is recalculated or written and edits are refused.
     """
 
-    def __init__(self, hash_manager: HashManager, blocks: List[Block]):
+    def __init__(self, hash_manager: HashManager, blocks: List[Block], snapshots: SnapshotFile = None, full_verify: bool = False,
+                 durability: str = DURABILITY_NONE, hash_indexes: HashIndexFile = None, mountain_range: MountainRangeFile = None,
+                 lazy_rehash: bool = False, checkpoints: Iterable[Tuple[int, bytes]] = (), read_only: bool = False):
         """Loads Blockchain from the storage.
         
         If nothing found, creates the new one.
+
+        Args:
+            hash_manager: Hash Manager of the Blockchain.
+            blocks: Stored Blocks. Could be LazyBlockList.
+            snapshots: Snapshot File of the storage. None to always verify everything.
+            full_verify: Rehash every Block ignoring the snapshot.
+            durability: Durability level from writer DURABILITY_LEVELS.
+            hash_indexes: Hash Index File of the storage.
+                None if Driver finds stored Blocks by hash itself with find_block.
+            mountain_range: Merkle Mountain Range File of the storage.
+                None to rebuild the range from Blocks on every load.
+            lazy_rehash: Recalculate and store edited Blocks only when they are needed.
+            checkpoints: Trusted numbers and hashes of Blocks.
+                Blocks below the highest matching one are not rehashed unless the full verification is asked.
+            read_only: Serve stored Blocks as they are without recalculating or writing anything.
+        """
+
+        self.lock = threading.RLock()
+        self.snapshot_lock = threading.RLock()
+        self.snapshots = snapshots
+        self.snapshot = None
+        self.hash_indexes = hash_indexes
+        self.mountain_range = mountain_range
+        self.mmr = None
+        self.mmr_from = None
+        self.mmr_lock = threading.Lock()
+        self.deferred_edits = []
+        self.read_only = read_only
+        self.invalid_from = None
+
+        verified = 0
+        if read_only:
+            verified = len(blocks)
+
+        elif snapshots is not None and not full_verify:
+            verified = self.verified_height(blocks, snapshots.read())
+
+        if not full_verify and not read_only:
+            verified = max(verified, self.checkpoint_height(hash_manager, blocks, checkpoints))
+
+        self.indexed = 0
+        if hash_indexes is not None:
+            self.indexed = hash_indexes.open(not read_only)
+
+        super().__init__(hash_manager, blocks, len(blocks), None, lazy_rehash)
+
+        self.writer = GroupCommitWriter(self.write_blocks, self.sync_storage, durability)
+
+        # Stored files are left as they are
+        if read_only:
+            return
+
+        if verified < len(self):
+            self.invalid_from = self.recalculate_blockchain(verified + 1)
+
+        # Snapshots would cover stored invalid Blocks, so none are kept while they are loaded
+        if self.invalid_from is not None:
+            self.snapshot = None
+
+        elif snapshots is not None and (self.snapshot is None or self.snapshot.height != len(self)):
+            self.write_snapshot(self.num, self.hash)
+
+        if hash_indexes is not None and self.indexed != len(self):
+            self.index_loaded()
+
+    # Snapshots
+    def storage_checksum(self, height: int) -> int:
+        """Calculates checksum of the storage up to height.
+
+        Driver could override it to detect changes of stored Blocks
+        made after the snapshot. It guards only against torn writes
+        of the Driver itself, edits made outside are found by full verification or audit.
+
+        Args:
+            height: Number of the last Block to cover.
+
+        Returns:
+            Checksum of the storage.
+        """
+
+        return 0
+
+    def verified_height(self, blocks: List[Block], snapshot: Snapshot) -> int:
+        """Checks the snapshot against stored Blocks.
+
+        Args:
+            blocks: Stored Blocks.
+            snapshot: Snapshot to check. Could be None.
+
+        Returns:
+            Count of the first Blocks known to be valid. Zero if the snapshot doesn't match.
+        """
+
+        if snapshot is None or snapshot.height == 0 or snapshot.height > len(blocks):
+            return 0
+
+        block = blocks[snapshot.height - 1]
+
+        if block.hash != snapshot.hash or block.num != snapshot.height:
+            return 0
+
+        if snapshot.checksum != self.storage_checksum(snapshot.height):
+            return 0
+
+        self.snapshot = snapshot
+        return snapshot.height
+
+    def checkpoint_height(self, hash_manager: HashManager, blocks: List[Block], checkpoints: Iterable[Tuple[int, bytes]]) -> int:
+        """Finds the highest trusted checkpoint stored Blocks match.
+
+        Checkpoint Block is rehashed. Loaded Blocks below it are checked to link to it.
+        Lazily loaded ones are trusted like ones below the snapshot, so they are not read.
+
+        Args:
+            hash_manager: Hash Manager of the Blockchain.
+            blocks: Stored Blocks. Could be LazyBlockList.
+            checkpoints: Trusted numbers and hashes of Blocks.
+
+        Returns:
+            Count of the first Blocks known to be valid. Zero if no checkpoint matches.
+        """
+
+        for height, hash in sorted(checkpoints, reverse=True):
+            if not 0 < height <= len(blocks):
+                continue
+
+            block = blocks[height - 1]
+
+            # Checkpoint Block is rehashed, so its fields are bound to the trusted hash
+            if block.hash != hash or block.num != height or hash_manager.hash_block(block) != hash:
+                continue
+
+            if isinstance(blocks, LazyBlockList):
+                return height
+
+            if blocks[0].prev_hash != hash_manager.reserved_prev_hash():
+                continue
+
+            if all(blocks[n].num == n + 1 and blocks[n].prev_hash == blocks[n - 1].hash for n in range(1, height)):
+                return height
+
+        return 0
+
+    def write_snapshot(self, height: int, hash: bytes):
+        """Writes the snapshot of stored Blocks.
+
+        Every written Block comes from the validated Blockchain,
+        so any stored height could be a snapshot.
+
+        Args:
+            height: Number of the last stored Block.
+            hash: Hash of the last stored Block.
+        """
+
+        with self.snapshot_lock:
+            self.snapshot = Snapshot(height, hash, self.storage_checksum(height))
+            self.snapshots.write(self.snapshot)
+
+    def lower_snapshot(self, start: int):
+        """Moves the snapshot below start before Blocks it covers are rewritten.
+
+        Called by Drivers rewriting Blocks in place, so a write interrupted
+        after rewriting some of them leaves a snapshot of untouched Blocks only.
+        The snapshot is refreshed once the write is stored.
+
+        Args:
+            start: Number of the first Block to rewrite.
+        """
+
+        with self.snapshot_lock:
+            if self.snapshots is None or self.snapshot is None or start > self.snapshot.height:
+                return
+
+            height = start - 1
+            hash = self.read_block(height).hash if height > 0 else self.hash_manager.reserved_prev_hash()
+            self.write_snapshot(height, hash)
+
+    # Merkle Mountain Range
+    def load_mountain_range(self):
+        """Loads the Merkle Mountain Range on first use and adds Blocks it misses.
+
+        Blocks are verified on load and every hash covers the Blocks before it,
+        so stored nodes are valid if their last leaf is the hash of the Block.
+        Only peaks are read, Blocks missing from the file are added and written in batches.
+        """
+
+        if self.mmr is not None:
+            return
+
+        with self.lock:
+            self.refresh()
+
+            with self.mmr_lock:
+                if self.mmr is not None:
+                    return
+
+                nodes = None
+
+                if self.mountain_range is not None and not self.read_only:
+                    self.mountain_range.open()
+                    nodes = StoredMountainNodes(self.mountain_range)
+
+                mmr = MerkleMountainRange(self.hash_manager, nodes)
+
+                if len(mmr) > len(self):
+                    mmr.truncate(len(self))
+
+                if len(mmr) > 0 and mmr.get_leaf(len(mmr)) != self.get_block(len(mmr)).hash:
+                    mmr.truncate(0)
+
+                for block in self.iter_blocks(len(mmr) + 1):
+                    mmr.append(block.hash)
+
+                    if nodes is not None and len(mmr) % MMR_STORE_BATCH == 0:
+                        nodes.store(len(nodes))
+
+                if nodes is not None:
+                    nodes.store(len(nodes))
+
+                self.mmr = mmr
+
+    def update_mountain_range(self, num: int):
+        """Applies Blocks changed in memory to the Merkle Mountain Range.
+        Nothing is done before it's loaded, the load check catches up with changed Blocks.
+
+        Args:
+            num: Number of the first changed Block.
+        """
+
+        with self.mmr_lock:
+            if self.mmr is None:
+                return
+
+            self.mmr.truncate(min(num - 1, len(self.mmr)))
+
+            for block in self.iter_blocks(len(self.mmr) + 1):
+                self.mmr.append(block.hash)
+
+    def store_mountain_range(self, end: int):
+        """Writes nodes of written Blocks to the Merkle Mountain Range File.
+
+        Nodes of Blocks changed in memory after the write could be written too,
+        the load check drops them if their Blocks weren't stored.
+
+        Args:
+            end: Number of the last stored Block.
+        """
+
+        with self.mmr_lock:
+            if self.mmr is None or self.read_only:
+                return
+
+            self.mmr.nodes.store(mmr_size(min(end, len(self.mmr))))
+
+    # Deferred edits
+    def defer_edit(self, operation: int, num: int, block: Block = None):
+        """Keeps an edit applied in memory to store it on commit."""
+
+        self.deferred_edits.append((operation, num, block))
+        self.mmr_from = num if self.mmr_from is None else min(self.mmr_from, num)
+
+    def refresh(self):
+        """Recalculates Blocks and the Merkle Mountain Range after deferred edits."""
+
+        if self.dirty_from is None and self.mmr_from is None:
+            return
+
+        with self.lock:
+            super().refresh()
+
+            if self.mmr_from is not None:
+                start, self.mmr_from = self.mmr_from, None
+                self.update_mountain_range(start)
+
+    def store_deferred(self) -> int:
+        """Recalculates deferred edits and writes them to the storage.
+
+        Returns:
+            Ticket of the write for wait_stored. None if nothing was edited.
+        """
+
+        self.refresh()
+
+        edits, self.deferred_edits = self.deferred_edits, []
+        return self.store_edits(edits) if edits else None
+
+    def store_edits(self, edits: list) -> int:
+        """Stores a batch of edits applied in memory.
+
+        Driver could override it to store them another way.
+        By default Blocks are written from the first edited one.
+
+        Args:
+            edits: Operations, numbers and Blocks of edits in order.
+
+        Returns:
+            Ticket of the write for wait_stored.
         """
-        super().__init__(hash_manager, blocks)
+
+        return self.store_blocks(min(num for _, num, _ in edits))
+
+    def commit(self):
+        """Recalculates and stores deferred edits."""
+
+        with self.lock:
+            ticket = self.store_deferred()
+
+        self.wait_stored(ticket)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Applies edits made inside as one write at the end.
+
+        Edits of other threads wait until the transaction ends.
+        Transactions could be nested, edits are stored by the outer one.
+        Edits are not rolled back on error, they are stored as well.
+
+        Yields:
+            The Blockchain itself.
+        """
+
+        with self.lock:
+            self.transactions += 1
+
+            try:
+                yield self
+
+            finally:
+                self.transactions -= 1
+                ticket = self.store_deferred() if self.transactions == 0 else None
+
+        self.wait_stored(ticket)
+
+    def get_proof(self, num: int) -> Tuple[int, List[bytes], List[bytes]]:
+        """Builds the inclusion proof of a Block.
+
+        Args:
+            num: Number of the Block.
+
+        Returns:
+            Count of Blocks the proof is built for, siblings from the leaf up and peaks.
+
+        Raises:
+            InvalidBlockNumber: Block number is out of bounds!
+        """
+
+        self.refresh()
+        self.load_mountain_range()
+
+        with self.mmr_lock:
+            return len(self.mmr), self.mmr.prove(num), self.mmr.peaks()
+
+    def get_peaks(self) -> Tuple[int, List[bytes]]:
+        """Gets peaks of the Merkle Mountain Range.
+
+        Returns:
+            Count of Blocks and peaks of their mountains from the left.
+        """
+
+        self.refresh()
+        self.load_mountain_range()
+
+        with self.mmr_lock:
+            return len(self.mmr), self.mmr.peaks()
+
+    # Storage
+    def check_writable(self):
+        """Refuses edits of a storage opened read-only.
+
+        Raises:
+            ReadOnlyStorage: Storage is opened read-only.
+        """
+
+        if self.read_only:
+            raise ReadOnlyStorage('Storage is opened read-only!')
+
+    def is_lazy(self) -> bool:
+        """Checks if Blocks are loaded on demand.
+
+        Returns:
+            True if Blocks are kept in LazyBlockList.
+        """
+
+        return isinstance(self.blocks, LazyBlockList)
+
+    def read_blocks(self, start: int, count: int) -> List[Block]:
+        """Reads stored Blocks one after another.
+
+        Driver could override it to read them at once.
+
+        Args:
+            start: Number of the first Block.
+            count: Count of Blocks to read.
+
+        Returns:
+            Stored Blocks.
+        """
+
+        blocks = []
+        for n in range(start, start + count):
+            blocks.append(self.read_block(n))
+
+        return blocks
+
+    def store_blocks(self, start: int) -> int:
+        """Queues Blocks from start to the end of Blockchain to be written.
+
+        Args:
+            start: Number of the first Block to write.
+
+        Returns:
+            Ticket of the write for wait_stored.
+        """
+
+        blocks = list(self.iter_blocks(start))
+
+        # Remapped lazy Blocks must not be read from the stored places the write replaces
+        if self.is_lazy():
+            self.blocks.rebase(start, blocks)
+
+        return self.writer.submit(start, blocks)
+
+    def store_edit(self, operation: int, num: int, block: Block = None) -> int:
+        """Stores an edit of Blockchain applied in memory.
+
+        Writes Blocks from the edited one to the end of Blockchain.
+        Driver could override it to store the edit in a cheaper way.
+
+        Args:
+            operation: One of journal EDIT_OPERATIONS.
+            num: Number of the edited Block.
+            block: New Block. None for EDIT_REMOVE.
+
+        Returns:
+            Ticket of the write for wait_stored. None if the edit is already stored.
+        """
+
+        return self.store_blocks(num)
+
+    def wait_stored(self, ticket: int):
+        """Waits for the write if durability level asks for it.
+
+        Called without holding the lock, so other writes could join the batch.
+
+        Args:
+            ticket: Ticket of the write. None if there's nothing to wait for.
+        """
+
+        if ticket is not None and self.writer.durability == DURABILITY_BATCH:
+            self.writer.wait(ticket)
+
+    def write_blocks(self, start: int, blocks: List[Block]):
+        """Writes Blocks to the storage.
+
+        Implemented by Drivers. Called from the writer thread.
+        Stored Blocks from start are replaced and the ones after given Blocks are dropped.
+        Drivers call blocks_stored when Blocks are written.
+
+        Args:
+            start: Number of the first Block to write.
+            blocks: Blocks to write.
+        """
+
+    def sync_storage(self):
+        """Flushes written storage files to the disk.
+
+        Implemented by Drivers. Called from the writer thread.
+        """
+
+    def blocks_stored(self, start: int, blocks: List[Block]):
+        """Tells that Blocks from start are written to the storage.
+
+        Lets lazily loaded Blocks be evicted from the cache.
+        Refreshes the snapshot if it covers changed Blocks
+        or if enough Blocks were appended since the last one.
+
+        Args:
+            start: Number of the first written Block.
+            blocks: Written Blocks.
+        """
+
+        if self.is_lazy():
+            self.blocks.mark_clean(start, blocks, self.writer.queued_start)
+
+        end = start + len(blocks) - 1
+
+        if self.hash_indexes is not None:
+            self.index_stored(start, end, blocks)
+
+        # Blocks written before the range is loaded are added by the load
+        if self.mountain_range is not None:
+            self.store_mountain_range(end)
+
+        if self.snapshots is None or self.snapshot is None:
+            return
+
+        if start <= self.snapshot.height or end - self.snapshot.height >= SNAPSHOT_INTERVAL:
+            if blocks:
+                hash = blocks[-1].hash
+
+            elif end > 0:
+                hash = self.read_block(end).hash
+
+            else:
+                hash = self.hash_manager.reserved_prev_hash()
+
+            self.write_snapshot(end, hash)
+
+    def index_loaded(self):
+        """Adds loaded Blocks the stored hash index doesn't cover, in batches."""
+
+        self.indexed = min(self.indexed, len(self))
+        entries = []
+
+        for block in self.iter_blocks(self.indexed + 1):
+            entries.append((block.hash, block.num))
+
+            if len(entries) >= HASH_INDEX_TAIL:
+                self.hash_indexes.append(entries, block.num, len(self))
+                entries = []
+
+        self.indexed = len(self)
+        self.hash_indexes.append(entries, self.indexed, self.indexed)
+
+    def index_stored(self, start: int, end: int, blocks: List[Block]):
+        """Adds written Blocks to the stored hash index.
+
+        Args:
+            start: Number of the first written Block.
+            end: Number of the last stored Block.
+            blocks: Written Blocks.
+        """
+
+        # Index covers the written Blocks only if it covered the ones before them
+        self.indexed = end if self.indexed >= start - 1 else min(self.indexed, end)
+        self.hash_indexes.append([(block.hash, block.num) for block in blocks], self.indexed, end)
+
+    def find_block(self, hash: bytes) -> int:
+        """Finds the stored Block by its hash.
+
+        Implemented by Drivers which keep their own hash index.
+
+        Args:
+            hash: Hash of the Block.
+
+        Returns:
+            Number of the stored Block with the hash. None if it's not found.
+        """
+
+        return None
+
+    def get_block_by_hash(self, hash: bytes) -> Block:
+        """Finds a Block in the Blockchain by its hash.
+
+        Args:
+            hash: Hash of the Block.
+
+        Returns:
+            Block with the hash. None if there's no such Block.
+        """
+
+        block = super().get_block_by_hash(hash)
+
+        if block is None:
+            num = self.hash_indexes.find(hash) if self.hash_indexes is not None else self.find_block(hash)
+
+            if num is not None and 0 < num <= len(self):
+                block = super().get_block(num)
+
+                # Search of the stored index is cheap, so found Blocks aren't kept in memory
+                if block.hash != hash:
+                    return None
+
+        return block
+
+    def flush(self):
+        """Waits until every change is written to the storage."""
+
+        self.commit()
+        self.writer.flush()
+
+    def close(self):
+        """Writes every change and stops the writer."""
+
+        self.commit()
+        self.writer.close()
+
+        if self.hash_indexes is not None:
+            self.hash_indexes.close()
+
+        if self.mountain_range is not None:
+            self.mountain_range.close()
 
     def get_block(self, num: int) -> Block:
         """Get a Block in the Blockchain.
@@ -43,16 +678,85 @@ class StoredBlockchain(ValidatedBlockchain):
             InvalidBlockNumber: Block number is out of bounds!
         """
 
-        super().set_block(block, num)
+        self.check_writable()
+
+        with self.lock:
+            super().set_block(block, num)
+
+            if self.is_deferred():
+                self.defer_edit(EDIT_SET, num, block)
+                return
+
+            self.update_mountain_range(num)
+            ticket = self.store_edit(EDIT_SET, num, block)
+
+        self.wait_stored(ticket)
 
     def append_block(self, block: Block):
         """Appends a block to the end of Blockchain.
+
+        Stored right away outside a transaction, in lazy rehash mode too.
         
         Args:
             block: Block to append.
         """
 
-        super().append_block(block)
+        self.check_writable()
+
+        with self.lock:
+            super().append_block(block)
+
+            if self.is_deferred():
+                self.defer_edit(EDIT_APPEND, len(self), block)
+
+                if self.transactions > 0:
+                    return
+
+                ticket = self.store_deferred()
+
+            else:
+                self.update_mountain_range(len(self))
+                ticket = self.store_edit(EDIT_APPEND, len(self), block)
+
+        self.wait_stored(ticket)
+
+    def append_blocks(self, blocks: List[Block], verified: bool = False):
+        """Appends several blocks to the end of Blockchain.
+
+        Blocks are written to the storage as one write.
+
+        Args:
+            blocks: Blocks to append in order.
+            verified: Blocks are already validated and linked to each other,
+                so they are stored as they are without rehashing.
+
+        Raises:
+            InvalidLink: Verified Blocks don't follow the last Block.
+        """
+
+        if not blocks:
+            return
+
+        self.check_writable()
+
+        with self.lock:
+            start = len(self) + 1
+            super().append_blocks(blocks, verified)
+
+            if self.is_deferred():
+                for num, block in enumerate(blocks, start):
+                    self.defer_edit(EDIT_APPEND, num, block)
+
+                if self.transactions > 0:
+                    return
+
+                ticket = self.store_deferred()
+
+            else:
+                self.update_mountain_range(start)
+                ticket = self.store_blocks(start)
+
+        self.wait_stored(ticket)
 
     def remove_block(self, num: int):
         """Removes a block from the Blockchain.
@@ -64,9 +768,69 @@ class StoredBlockchain(ValidatedBlockchain):
             InvalidBlockNumber: Block number is out of bounds!
         """
 
-        super().remove_block(num)
+        self.check_writable()
+
+        with self.lock:
+            super().remove_block(num)
+
+            if self.is_deferred():
+                self.defer_edit(EDIT_REMOVE, num)
+                return
+
+            self.update_mountain_range(num)
+            ticket = self.store_edit(EDIT_REMOVE, num)
+
+        self.wait_stored(ticket)
+
+    def replace_blocks(self, num: int, blocks: List[Block]):
+        """Replaces Blocks from num to the end of Blockchain.
+
+        Only the replaced suffix is written to the storage as one write.
+
+        Args:
+            num: Number of the first replaced Block. Could be the number after the last one.
+            blocks: New Blocks following the kept ones.
+
+        Raises:
+            InvalidBlockNumber: Block number is out of bounds!
+        """
+
+        self.check_writable()
+
+        with self.lock:
+            end = len(self)
+            super().replace_blocks(num, blocks)
+
+            if self.is_deferred():
+                for removed in range(end, num - 1, -1):
+                    self.defer_edit(EDIT_REMOVE, removed)
+
+                for appended, block in enumerate(blocks, num):
+                    self.defer_edit(EDIT_APPEND, appended, block)
+
+                if self.transactions > 0:
+                    return
+
+                ticket = self.store_deferred()
+
+            else:
+                self.update_mountain_range(num)
+                ticket = self.store_blocks(num)
+
+        self.wait_stored(ticket)
 
     def clear(self):
         """Clears Blockchain."""
 
-        super().clear()
\ No newline at end of file
+        self.check_writable()
+
+        with self.lock:
+            # Clear drops every deferred edit
+            self.deferred_edits = []
+            self.mmr_from = None
+
+            super().clear()
+            self.update_mountain_range(1)
+            ticket = self.store_blocks(1)
+
+        self.wait_stored(ticket)
\ No newline at end of file
@@ -1,73 +1,166 @@
 """Store Blockchain in files"""
 
 
+from typing import Iterable, List, Tuple
 from ...storage import StoredBlockchain
 from ...blockchain import Block, Blockchain, HashManager
-from ...utils.Drivers.hash import HASH_SIZE
+from ...utils.Drivers.hash import HashManagerDriver, HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM, InvalidHashAlgorithm
+from ..lazy import LazyBlockList, BLOCK_CACHE_SIZE
+from ..snapshot import SnapshotFile
+from ..hash_index import HashIndexFile
+from ..mmr import MountainRangeFile
+from ..writer import DURABILITY_NONE
 
 import os
+import struct
+import zlib
+
+
+LEGACY_HEADER_SIZE = HashManagerDriver(DEFAULT_HASH_ALGORITHM).get_hash_len() + 4
+"""Size of the header written before Hash algorithms were recorded: hash, 4 byte number."""
+
+BLOCK_FILE_STAMP = struct.Struct('<QQ')
+"""Block file stamp taken by the storage checksum: size, modification time in nanoseconds."""
 
 
 class BlockchainFileStorage(StoredBlockchain):
     """Driver for BlockchainStorage.
     
     Implements operations to store Blockchain in files.
+
+    Header file keeps the hash and the number of the last Block
+    followed by the id of the Hash algorithm.
+
+    Every Block is rewritten in place, so the snapshot is lowered
+    before Blocks it covers are rewritten and its checksum
+    covers the size and the modification time of its last Block file.
     """
 
-    def __init__(self, hash_manager: HashManager, path: str = 'blockchain'):
+    def __init__(self, hash_manager: HashManager, path: str = 'blockchain', lazy: bool = False, cache_size: int = BLOCK_CACHE_SIZE,
+                 full_verify: bool = False, durability: str = DURABILITY_NONE, lazy_rehash: bool = False,
+                 checkpoints: Iterable[Tuple[int, bytes]] = (), read_only: bool = False):
         """File Storage Constructor.
         
         Reads Blockchain from files. If they don't exist, created new ones.
+
+        Args:
+            hash_manager: Hash Manager of the Blockchain.
+            path: Directory of the storage.
+            lazy: Read only the header now and Blocks on first access.
+            cache_size: Max size in bytes of cached Blocks in lazy mode.
+            full_verify: Rehash every Block ignoring the snapshot.
+            durability: Durability level from writer DURABILITY_LEVELS.
+            lazy_rehash: Recalculate and store edited Blocks only when they are needed.
+            checkpoints: Trusted numbers and hashes of Blocks. Blocks below the highest matching one are not rehashed.
+            read_only: Serve stored Blocks as they are without recalculating or writing them.
+
+        Raises:
+            InvalidHashAlgorithm: Storage was made with another Hash algorithm.
         """
 
         self.path = path
         self.hash_manager = hash_manager
+        self.unsynced = set()
 
         # Read Blockchain from file
         chain = self.read_blockchain_header()
 
-        blocks = []
-        for n in range(1, chain.get_num() + 1):
-            blocks.append(self.read_block(n))
+        if lazy:
+            blocks = LazyBlockList(self.read_block, chain.get_num(), cache_size, self.read_blocks)
+
+        else:
+            blocks = self.read_blocks(1, chain.get_num())
 
         # Set up Blockchain
-        super().__init__(hash_manager, blocks)
+        snapshots = SnapshotFile(os.path.join(path, 'snapshot'))
+        hash_indexes = HashIndexFile(os.path.join(path, 'hash_index'), hash_manager.get_hash_len())
+        mountain_range = MountainRangeFile(os.path.join(path, 'mmr'), hash_manager.get_hash_len())
+        super().__init__(hash_manager, blocks, snapshots, full_verify, durability, hash_indexes, mountain_range, lazy_rehash, checkpoints, read_only)
 
-    # Methods to implement
-    def get_block(self, num: int) -> Block:
-        return super().get_block(num)
+    @staticmethod
+    def is_stored(path: str) -> bool:
+        """Checks if a file storage exists in the directory.
 
-    def set_block(self, block: Block, num: int):
-        super().set_block(block, num)
-        block = super().get_block(num)
-        self.write_block(block)
-        self.update_header()
+        Args:
+            path: Directory to check.
 
-    def append_block(self, block: Block):
-        super().append_block(block)
-        block = super().get_block(len(self))
-        self.write_block(block)
-        self.update_header()
+        Returns:
+            True if the directory keeps a file storage.
+        """
 
-    def remove_block(self, num: int):
-        super().remove_block(num)
+        return os.path.isfile(os.path.join(os.getcwd(), path, 'blockchain'))
 
-        for n in range(num, len(self)):
-            block = super().get_block(n)
-            self.write_block(block)
+    @staticmethod
+    def read_hash_algorithm(path: str) -> int:
+        """Reads the id of the Hash algorithm the storage was made with.
 
-        self.update_header()
+        Args:
+            path: Directory of the storage.
 
-    def clear(self):
-        super().clear()
+        Returns:
+            Id of the Hash algorithm. None if nothing is stored.
+        """
 
-        self.write_blockchain_header(self)
+        try:
+            with open(os.path.join(os.getcwd(), path, 'blockchain'), 'rb') as header:
+                header = header.read()
+
+        except FileNotFoundError:
+            return None
+
+        # Headers written before algorithms were recorded have no id
+        if len(header) <= LEGACY_HEADER_SIZE:
+            return HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]
+
+        return header[-1]
 
     # Driver methods
-    def update_header(self):
-        last_block = super().get_block(len(self))
-        header = Blockchain(last_block.get_hash(), last_block.get_num())
-        self.write_blockchain_header(header)
+    def write_blocks(self, start: int, blocks: List[Block]):
+        self.lower_snapshot(start)
+
+        for block in blocks:
+            self.write_block(block)
+
+        # One header update for the whole batch
+        end = start + len(blocks) - 1
+
+        if blocks:
+            hash = blocks[-1].get_hash()
+
+        elif end > 0:
+            hash = self.read_block(end).get_hash()
+
+        else:
+            hash = self.hash_manager.reserved_prev_hash()
+
+        self.write_blockchain_header(Blockchain(hash, end))
+        self.blocks_stored(start, blocks)
+
+    def storage_checksum(self, height: int) -> int:
+        """Calculates checksum of the size and the modification time of the Block file at height.
+
+        Blocks under the snapshot are rewritten only after it's lowered,
+        so only its last Block is checked. It's rewritten if the storage
+        was cut and appended again. Edits made outside are not noticed.
+        """
+
+        if height == 0:
+            return 0
+
+        try:
+            stat = os.stat(self.get_block_path(height))
+
+        except FileNotFoundError:
+            return 0
+
+        return zlib.crc32(BLOCK_FILE_STAMP.pack(stat.st_size, stat.st_mtime_ns))
+
+    def sync_storage(self):
+        for path in self.unsynced:
+            with open(path, 'r+b') as file:
+                os.fsync(file.fileno())
+
+        self.unsynced.clear()
 
     # Paths
     def get_header_path(self):
@@ -80,44 +173,56 @@ class BlockchainFileStorage(StoredBlockchain):
 
     # Read
     def read_blockchain_header(self) -> Blockchain:
-        try:
-            with open(self.get_header_path(), 'rb') as header:
-                hash = header.read(HASH_SIZE)
-                num = int.from_bytes(header.read(4), 'little')
+        """Reads the header, creating the storage if needed.
 
-                return Blockchain(hash, num)
+        Raises:
+            InvalidHashAlgorithm: Storage was made with another Hash algorithm.
+        """
 
-        except FileNotFoundError:
-            with open(self.get_header_path(), 'wb') as header:
-                hash = self.hash_manager.reserved_prev_hash()
-                num = 0
+        algorithm_id = self.read_hash_algorithm(self.path)
+
+        if algorithm_id is None:
+            os.makedirs(os.path.join(os.getcwd(), self.path), exist_ok=True)
+
+            chain = Blockchain(self.hash_manager.reserved_prev_hash(), 0)
+            self.write_blockchain_header(chain)
+
+            return chain
+
+        if algorithm_id != self.hash_manager.get_algorithm_id():
+            raise InvalidHashAlgorithm(f"Storage '{self.path}' uses another hash algorithm!")
 
-                header.write(hash)
-                header.write(int.to_bytes(num, 4, 'little'))
+        hash_size = self.hash_manager.get_hash_len()
 
-                return Blockchain(hash, num)
+        with open(self.get_header_path(), 'rb') as header:
+            hash = header.read(hash_size)
+            num = int.from_bytes(header.read(4), 'little')
+
+            return Blockchain(hash, num)
 
     def read_block(self, num: int) -> Block:
+        hash_size = self.hash_manager.get_hash_len()
+
         with open(self.get_block_path(num), 'rb') as block:
-            hash = block.read(HASH_SIZE)
-            prev_hash = block.read(HASH_SIZE)
+            hash = block.read(hash_size)
+            prev_hash = block.read(hash_size)
             num = int.from_bytes(block.read(4), 'little')
-            data = b''
-
-            byte = block.read(1)
-            while byte:
-                data += byte
-                byte = block.read(1)
+            data = block.read()
 
             return Block(hash, prev_hash, num, data)
 
     # Write
     def write_blockchain_header(self, chain: Blockchain):
+        self.unsynced.add(self.get_header_path())
+
         with open(self.get_header_path(), 'wb') as header:
             header.write(chain.hash)
             header.write(int.to_bytes(chain.num, 4, 'little'))
+            header.write(bytes([self.hash_manager.get_algorithm_id()]))
 
     def write_block(self, block: Block):
+        self.unsynced.add(self.get_block_path(block.num))
+
         with open(self.get_block_path(block.num), 'wb') as file:
             file.write(block.hash)
             file.write(block.prev_hash)
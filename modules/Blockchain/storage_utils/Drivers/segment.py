@@ -0,0 +1,727 @@
+"""Store Blockchain in append-only segment files"""
+
+
+from typing import Iterable, List, Tuple
+from ...storage import StoredBlockchain
+from ...blockchain import Block, Blockchain, HashManager
+from ...utils.Drivers.hash import HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM, InvalidHashAlgorithm
+from ..lazy import LazyBlockList, BLOCK_CACHE_SIZE
+from ..snapshot import SnapshotFile
+from ..hash_index import HashIndexFile
+from ..mmr import MountainRangeFile
+from ..writer import DURABILITY_NONE, DURABILITY_BATCH, DURABILITY_INTERVAL
+from ..journal import EditJournal, EDIT_SET, EDIT_REMOVE, EDIT_APPEND, JOURNAL_MAX_SIZE
+from ..compactor import BackgroundCompactor, COMPACT_LIVE_RATIO
+from ...validated_blockchain import ValidatedBlockchain
+
+import os
+import re
+import struct
+import threading
+import zlib
+
+
+SEGMENT_MAX_SIZE = 64 * 1024 * 1024
+"""Size in bytes after which a new segment file is started."""
+
+MANIFEST_MAGIC = b'BTPS'
+"""Marks a directory as a segment storage."""
+
+MANIFEST_VERSION = 2
+"""Version of the segment storage layout."""
+
+MANIFEST = struct.Struct('<4sBIB')
+"""Manifest record: magic, layout version, segment max size, Hash algorithm id."""
+
+LEGACY_MANIFEST = struct.Struct('<4sBI')
+"""Manifest record of version 1: magic, layout version, segment max size. Hash algorithm is the default one."""
+
+INDEX_ENTRY = struct.Struct('<III')
+"""Index record: segment number, offset in segment, record size."""
+
+
+class InvalidSegmentStorage(Exception):
+    """Thrown when the segment storage files are damaged or unknown."""
+
+
+class BlockchainSegmentStorage(StoredBlockchain):
+    """Driver for BlockchainStorage.
+
+    Implements operations to store Blockchain in append-only segment files.
+
+    Blocks are packed one after another into 'segment{N}' files
+    which never grow past the segment max size.
+    The 'index' file keeps a fixed size record for every Block
+    telling where the Block lives, so the Block number is the record position.
+
+    Appending a Block costs one sequential write to the last segment
+    and one index record. Reading a Block costs one index probe and one read.
+    Header of the Blockchain is taken from the last Block.
+
+    In copy-on-write mode setting or removing a Block before the last one
+    costs one record in the 'journal' file instead of rewriting every following Block.
+    Changed Blocks stay in memory until BackgroundCompactor writes them
+    to the segments, trims the journal and rewrites segments
+    mostly taken by dropped records. Journaled edits are applied again on load.
+    """
+
+    def __init__(self, hash_manager: HashManager, path: str = 'blockchain', segment_size: int = SEGMENT_MAX_SIZE,
+                 lazy: bool = False, cache_size: int = BLOCK_CACHE_SIZE, full_verify: bool = False,
+                 durability: str = DURABILITY_NONE, copy_on_write: bool = False, lazy_rehash: bool = False,
+                 checkpoints: Iterable[Tuple[int, bytes]] = (), read_only: bool = False):
+        """Segment Storage Constructor.
+
+        Reads Blockchain from segments. If they don't exist, creates new ones.
+
+        Args:
+            hash_manager: Hash Manager of the Blockchain.
+            path: Directory of the storage.
+            segment_size: Size in bytes after which a new segment is started.
+                Used only when the storage is created.
+            lazy: Read only the header now and Blocks on first access.
+            cache_size: Max size in bytes of cached Blocks in lazy mode.
+            full_verify: Rehash every Block ignoring the snapshot.
+            durability: Durability level from writer DURABILITY_LEVELS.
+            copy_on_write: Journal edits and write them from the background.
+            lazy_rehash: Recalculate and store edited Blocks only when they are needed.
+            checkpoints: Trusted numbers and hashes of Blocks. Blocks below the highest matching one are not rehashed.
+            read_only: Serve stored Blocks as they are without recalculating or writing them.
+
+        Raises:
+            InvalidSegmentStorage: Storage files are damaged or unknown.
+            InvalidHashAlgorithm: Storage was made with another Hash algorithm.
+        """
+
+        self.path = path
+        self.hash_manager = hash_manager
+        self.segment_size = segment_size
+        self.copy_on_write = copy_on_write
+        self.io_lock = threading.RLock()
+        self.reclaimable = False
+        self.journal_start = None
+        self.compactor = None
+
+        self.open_storage()
+
+        self.journal = EditJournal(os.path.join(path, 'journal'))
+        edits = self.read_journal()
+
+        # Read Blockchain from segments
+        chain = self.read_blockchain_header()
+
+        if lazy:
+            blocks = LazyBlockList(self.read_block, chain.get_num(), cache_size, self.read_blocks)
+
+        else:
+            blocks = self.read_blocks(1, chain.get_num())
+
+        # Set up Blockchain
+        snapshots = SnapshotFile(os.path.join(path, 'snapshot'))
+        hash_indexes = HashIndexFile(os.path.join(path, 'hash_index'), hash_manager.get_hash_len())
+        mountain_range = MountainRangeFile(os.path.join(path, 'mmr'), hash_manager.get_hash_len())
+        super().__init__(hash_manager, blocks, snapshots, full_verify, durability, hash_indexes, mountain_range, lazy_rehash, checkpoints, read_only)
+
+        # Segments are audited as they are, journaled edits are left for the next load
+        if read_only:
+            return
+
+        self.replay_journal(edits)
+
+        if copy_on_write:
+            self.compactor = BackgroundCompactor(self.compact)
+
+        elif self.journal_start is not None:
+            self.compact()
+
+    @staticmethod
+    def is_stored(path: str) -> bool:
+        """Checks if a segment storage exists in the directory.
+
+        Args:
+            path: Directory to check.
+
+        Returns:
+            True if the directory keeps a segment storage.
+        """
+
+        return os.path.isfile(os.path.join(os.getcwd(), path, 'manifest'))
+
+    # Methods to implement
+    def clear(self):
+        self.check_writable()
+
+        with self.lock:
+            self.journal_start = None
+            super().clear()
+            self.writer.flush()
+
+            # Nothing is referenced, drop every segment and edit
+            with self.io_lock:
+                self.journal.trim(self.journal.size)
+                self.close_files()
+
+                for segment in self.list_segments():
+                    os.remove(self.get_segment_path(segment))
+
+                self.open_storage()
+                self.reclaimable = False
+
+    def store_edit(self, operation: int, num: int, block: Block = None) -> int:
+        # Edits of the last Block are as cheap as appends
+        if self.journal_start is None and (not self.copy_on_write or num >= len(self)):
+            return super().store_edit(operation, num, block)
+
+        return self.journal_edit(operation, num, block)
+
+    def store_edits(self, edits: list) -> int:
+        # Journal is replayed in order on load, so edits are journaled all together
+        if self.journal_start is None and not self.copy_on_write:
+            return super().store_edits(edits)
+
+        for operation, num, block in edits:
+            self.journal_edit(operation, num, block)
+
+        return None
+
+    def journal_edit(self, operation: int, num: int, block: Block = None):
+        """Records an edit to the journal instead of writing Blocks.
+
+        Args:
+            operation: One of journal EDIT_OPERATIONS.
+            num: Number of the edited Block.
+            block: New Block. None for EDIT_REMOVE.
+        """
+
+        # Journal is applied on top of every queued write
+        self.writer.flush()
+
+        data = block.data if block is not None else b''
+
+        with self.io_lock:
+            base = (self.index_count, self.tail_segment, self.tail_size)
+            self.journal.append(operation, num, data, base, self.writer.durability == DURABILITY_BATCH)
+
+        if self.writer.durability == DURABILITY_INTERVAL:
+            self.writer.mark_unsynced()
+
+        self.journal_start = num if self.journal_start is None else min(self.journal_start, num)
+
+        if self.compactor is not None and self.journal.size >= JOURNAL_MAX_SIZE:
+            self.compactor.wake()
+
+    def append_blocks(self, blocks: List[Block], verified: bool = False):
+        with self.lock:
+            # Appends after journaled edits are journaled too, verified Blocks are rehashed there
+            if self.journal_start is not None:
+                for block in blocks:
+                    self.append_block(block)
+
+                return
+
+            super().append_blocks(blocks, verified)
+
+    def replace_blocks(self, num: int, blocks: List[Block]):
+        with self.lock:
+            # Replaced suffix is journaled too if edits are waiting
+            if self.journal_start is not None:
+                for n in range(len(self), num - 1, -1):
+                    self.remove_block(n)
+
+                for block in blocks:
+                    self.append_block(block)
+
+                return
+
+            super().replace_blocks(num, blocks)
+
+    # Driver methods
+    def open_storage(self):
+        """Opens storage files, creating the storage if needed.
+
+        Raises:
+            InvalidSegmentStorage: Manifest is damaged or has unknown version.
+            InvalidHashAlgorithm: Storage was made with another Hash algorithm.
+        """
+
+        os.makedirs(os.path.join(os.getcwd(), self.path), exist_ok=True)
+
+        # Manifest
+        if not os.path.exists(self.get_manifest_path()):
+            record = MANIFEST.pack(MANIFEST_MAGIC, MANIFEST_VERSION, self.segment_size, self.hash_manager.get_algorithm_id())
+
+            with open(self.get_manifest_path(), 'wb') as manifest:
+                manifest.write(record)
+
+        self.segment_size, algorithm_id = self.read_manifest(self.path)
+
+        if algorithm_id != self.hash_manager.get_algorithm_id():
+            raise InvalidHashAlgorithm(f"Storage '{self.path}' uses another hash algorithm!")
+
+        # Index
+        if not os.path.exists(self.get_index_path()):
+            open(self.get_index_path(), 'wb').close()
+
+        self.index = open(self.get_index_path(), 'r+b', buffering=0)
+
+        # Drop a torn record left by an interrupted append
+        size = os.fstat(self.index.fileno()).st_size
+        self.index_count = size // INDEX_ENTRY.size
+
+        if size % INDEX_ENTRY.size:
+            self.index.truncate(self.index_count * INDEX_ENTRY.size)
+
+        # Segments
+        self.readers = {}
+        self.unsynced_segments = []
+        self.tail_segment = max(self.list_segments(), default=0)
+
+        self.tail = open(self.get_segment_path(self.tail_segment), 'ab', buffering=0)
+        self.tail_size = self.tail.tell()
+
+    @staticmethod
+    def read_manifest(path: str) -> tuple:
+        """Reads the manifest of a segment storage.
+
+        Args:
+            path: Directory of the storage.
+
+        Returns:
+            Segment max size and Hash algorithm id.
+
+        Raises:
+            InvalidSegmentStorage: Manifest is damaged or has unknown version.
+        """
+
+        with open(os.path.join(os.getcwd(), path, 'manifest'), 'rb') as manifest:
+            record = manifest.read(MANIFEST.size)
+
+        if len(record) == LEGACY_MANIFEST.size:
+            magic, version, segment_size = LEGACY_MANIFEST.unpack(record)
+            algorithm_id = HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]
+            expected_version = 1
+
+        elif len(record) == MANIFEST.size:
+            magic, version, segment_size, algorithm_id = MANIFEST.unpack(record)
+            expected_version = MANIFEST_VERSION
+
+        else:
+            raise InvalidSegmentStorage('Segment storage manifest is damaged!')
+
+        if magic != MANIFEST_MAGIC or version != expected_version:
+            raise InvalidSegmentStorage('Unknown segment storage manifest!')
+
+        return segment_size, algorithm_id
+
+    @staticmethod
+    def read_hash_algorithm(path: str) -> int:
+        """Reads the id of the Hash algorithm the storage was made with.
+
+        Args:
+            path: Directory of the storage.
+
+        Returns:
+            Id of the Hash algorithm. None if nothing is stored.
+
+        Raises:
+            InvalidSegmentStorage: Manifest is damaged or has unknown version.
+        """
+
+        if not BlockchainSegmentStorage.is_stored(path):
+            return None
+
+        return BlockchainSegmentStorage.read_manifest(path)[1]
+
+    def close(self):
+        """Writes every change and closes storage files."""
+
+        self.commit()
+
+        if self.compactor is not None:
+            self.compactor.close()
+            self.compact()
+
+        super().close()
+
+        with self.io_lock:
+            self.close_files()
+            self.journal.close()
+
+    def close_files(self):
+        """Closes storage files."""
+
+        self.index.close()
+        self.tail.close()
+
+        for reader in self.readers.values():
+            reader.close()
+
+        self.readers.clear()
+
+    def write_blocks(self, start: int, blocks: List[Block]):
+        with self.io_lock:
+            if start <= self.index_count:
+                self.reclaimable = True
+
+            self.truncate_index(start - 1)
+            self.append_records(blocks)
+
+        self.blocks_stored(start, blocks)
+
+    def sync_storage(self):
+        with self.io_lock:
+            for path in self.unsynced_segments:
+                if os.path.exists(path):
+                    with open(path, 'r+b') as segment:
+                        os.fsync(segment.fileno())
+
+            self.unsynced_segments.clear()
+
+            os.fsync(self.tail.fileno())
+            os.fsync(self.index.fileno())
+            self.journal.sync()
+
+    def append_records(self, blocks: List[Block]):
+        """Appends Blocks to the segments and the index.
+
+        Blocks are packed into as few writes as possible.
+        In-memory Blockchain is not changed.
+
+        Args:
+            blocks: Blocks to store in order after the last indexed Block.
+        """
+
+        entries = bytearray()
+        records = bytearray()
+
+        for block in blocks:
+            record = self.encode_block(block)
+
+            # Start the new segment when the current one is full
+            if self.tail_size > 0 and self.tail_size + len(record) > self.segment_size:
+                self.tail.write(records)
+                records.clear()
+
+                self.start_segment()
+
+            entries += INDEX_ENTRY.pack(self.tail_segment, self.tail_size, len(record))
+            records += record
+            self.tail_size += len(record)
+
+        self.tail.write(records)
+
+        with self.io_lock:
+            self.index.seek(self.index_count * INDEX_ENTRY.size)
+            self.index.write(entries)
+            self.index_count += len(blocks)
+
+    def storage_checksum(self, height: int) -> int:
+        """Calculates checksum of index records up to height.
+
+        Every rewrite of a Block moves its record, so the index changes with it.
+        Payloads are not covered, so edits of segments made outside are not noticed.
+        """
+
+        with self.io_lock:
+            self.index.seek(0)
+            records = self.index.read(height * INDEX_ENTRY.size)
+
+        return zlib.crc32(records)
+
+    def start_segment(self):
+        """Closes the last segment and starts the new one."""
+
+        self.tail.close()
+        self.unsynced_segments.append(self.get_segment_path(self.tail_segment))
+
+        self.tail_segment += 1
+        self.tail = open(self.get_segment_path(self.tail_segment), 'ab', buffering=0)
+        self.tail_size = 0
+
+    def truncate_index(self, count: int):
+        """Leaves only the first count records in the index.
+
+        Args:
+            count: Number of records to keep.
+        """
+
+        if count < self.index_count:
+            self.index.truncate(count * INDEX_ENTRY.size)
+            self.index_count = count
+
+    # Copy-on-write
+    def read_journal(self) -> list:
+        """Reads edits journaled after the stored Blocks.
+
+        Journal is dropped if its edits are already in the segments,
+        which happens when the storage was stopped between writing them
+        and trimming the journal.
+
+        Returns:
+            Journaled edits as (operation, number, data).
+        """
+
+        if self.journal.is_empty():
+            return []
+
+        edits = list(self.journal.records())
+        height, segment, offset = self.journal.base
+        start = min(num for _, num, _ in edits)
+
+        # Writing the edits rewrites the index from the first edited Block
+        if self.index_count != height or start > height or self.read_index(start)[:2] >= (segment, offset):
+            self.journal.trim(self.journal.size)
+            return []
+
+        return edits
+
+    def replay_journal(self, edits: list):
+        """Applies journaled edits to the loaded Blockchain.
+
+        Edits are applied in memory only, they are still kept in the journal.
+        Replay stops on the first edit that doesn't fit the Blockchain.
+
+        Args:
+            edits: Edits from read_journal.
+        """
+
+        for operation, num, data in edits:
+            block = Block(b'', b'', num, data)
+
+            if operation == EDIT_APPEND and num == len(self) + 1:
+                ValidatedBlockchain.append_block(self, block)
+
+            elif operation == EDIT_SET and 0 < num <= len(self):
+                ValidatedBlockchain.set_block(self, block, num)
+
+            elif operation == EDIT_REMOVE and 0 < num <= len(self):
+                ValidatedBlockchain.remove_block(self, num)
+
+            else:
+                break
+
+            self.journal_start = num if self.journal_start is None else min(self.journal_start, num)
+
+        if self.journal_start is not None:
+            self.update_mountain_range(self.journal_start)
+
+    def compact(self):
+        """Writes journaled edits to the segments and reclaims dropped records.
+
+        Called by BackgroundCompactor. Operations are not blocked
+        while Blocks are written, edits made meanwhile stay in the journal.
+        """
+
+        ticket = None
+
+        with self.lock:
+            # Deferred edits are in memory but not in the journal yet, so they wait for their commit
+            if self.journal_start is not None and not self.deferred_edits:
+                ticket = self.store_blocks(min(self.journal_start, len(self) + 1))
+                offset = self.journal.size
+                self.journal_start = None
+
+        if ticket is not None:
+            self.writer.wait(ticket)
+
+            if self.writer.durability != DURABILITY_NONE:
+                self.sync_storage()
+
+            # Edits left in the journal were made after the written state
+            with self.lock:
+                self.writer.flush()
+
+                with self.io_lock:
+                    base = (self.index_count, self.tail_segment, self.tail_size)
+                    self.journal.trim(offset, base)
+
+        if self.reclaimable:
+            self.reclaim_segments()
+
+    def reclaim_segments(self):
+        """Moves referenced records out of segments mostly taken by dropped ones.
+
+        Such segments are removed afterwards. The last segment is never moved.
+        Runs only while the journal is empty, since the journal relies on
+        records of the stored Blocks staying in place.
+        """
+
+        with self.io_lock:
+            if not self.journal.is_empty():
+                return
+
+            self.reclaimable = False
+
+            self.index.seek(0)
+            entries = list(INDEX_ENTRY.iter_unpack(self.index.read(self.index_count * INDEX_ENTRY.size)))
+
+            live = {}
+            for segment, _, size in entries:
+                live[segment] = live.get(segment, 0) + size
+
+            victims = set()
+            for segment in self.list_segments():
+                path = self.get_segment_path(segment)
+
+                if segment != self.tail_segment and live.get(segment, 0) < os.path.getsize(path) * COMPACT_LIVE_RATIO:
+                    victims.add(segment)
+
+            if not victims:
+                return
+
+            # Copy referenced records to the end
+            moved = {}
+            for num, (segment, offset, size) in enumerate(entries, 1):
+                if segment not in victims:
+                    continue
+
+                reader = self.get_reader(segment)
+                reader.seek(offset)
+                record = reader.read(size)
+
+                if self.tail_size > 0 and self.tail_size + size > self.segment_size:
+                    self.start_segment()
+
+                moved[num] = INDEX_ENTRY.pack(self.tail_segment, self.tail_size, size)
+                self.tail.write(record)
+                self.tail_size += size
+
+            if self.writer.durability != DURABILITY_NONE:
+                self.sync_storage()
+
+            for num, entry in moved.items():
+                self.index.seek((num - 1) * INDEX_ENTRY.size)
+                self.index.write(entry)
+
+            if self.writer.durability != DURABILITY_NONE:
+                os.fsync(self.index.fileno())
+
+            for segment in victims:
+                if segment in self.readers:
+                    self.readers.pop(segment).close()
+
+                os.remove(self.get_segment_path(segment))
+
+        # Moved records changed the index
+        with self.snapshot_lock:
+            if self.snapshot is not None:
+                self.write_snapshot(self.snapshot.height, self.snapshot.hash)
+
+    # Paths
+    def get_manifest_path(self):
+        path = os.path.join(self.path, 'manifest')
+        return os.path.join(os.getcwd(), path)
+
+    def get_index_path(self):
+        path = os.path.join(self.path, 'index')
+        return os.path.join(os.getcwd(), path)
+
+    def get_segment_path(self, segment: int):
+        path = os.path.join(self.path, f'segment{segment}')
+        return os.path.join(os.getcwd(), path)
+
+    def list_segments(self) -> List[int]:
+        """Lists numbers of existing segments in order."""
+
+        segments = []
+        for name in os.listdir(os.path.join(os.getcwd(), self.path)):
+            match = re.fullmatch(r'segment(\d+)', name)
+
+            if match is not None:
+                segments.append(int(match.group(1)))
+
+        return sorted(segments)
+
+    # Read
+    def read_blockchain_header(self) -> Blockchain:
+        if self.index_count == 0:
+            return Blockchain(self.hash_manager.reserved_prev_hash(), 0)
+
+        last_block = self.read_block(self.index_count)
+        return Blockchain(last_block.get_hash(), last_block.get_num())
+
+    def read_index(self, num: int) -> tuple:
+        with self.io_lock:
+            self.index.seek((num - 1) * INDEX_ENTRY.size)
+            entry = self.index.read(INDEX_ENTRY.size)
+
+        if len(entry) != INDEX_ENTRY.size:
+            raise InvalidSegmentStorage(f'Index record of block {num} is missing!')
+
+        return INDEX_ENTRY.unpack(entry)
+
+    def get_reader(self, segment: int):
+        """Gets the open file of a segment for reading."""
+
+        if segment not in self.readers:
+            self.readers[segment] = open(self.get_segment_path(segment), 'rb', buffering=0)
+
+        return self.readers[segment]
+
+    def read_block(self, num: int) -> Block:
+        # Records could be moved by compaction between the index probe and the read
+        with self.io_lock:
+            segment, offset, size = self.read_index(num)
+
+            reader = self.get_reader(segment)
+            reader.seek(offset)
+            record = reader.read(size)
+
+        if len(record) != size:
+            raise InvalidSegmentStorage(f'Record of block {num} is truncated!')
+
+        return self.decode_block(record)
+
+    def read_blocks(self, start: int, count: int) -> List[Block]:
+        """Reads stored Blocks with one read per run of adjacent records."""
+
+        blocks = []
+
+        with self.io_lock:
+            self.index.seek((start - 1) * INDEX_ENTRY.size)
+            entries = self.index.read(count * INDEX_ENTRY.size)
+
+            if len(entries) != count * INDEX_ENTRY.size:
+                raise InvalidSegmentStorage(f'Index records of blocks {start}-{start + count - 1} are missing!')
+
+            entries = list(INDEX_ENTRY.iter_unpack(entries))
+
+            run = 0
+            while run < len(entries):
+                segment, offset, _ = entries[run]
+
+                # Records written one after another are read at once
+                end = run + 1
+                while end < len(entries) and entries[end][0] == segment \
+                        and entries[end][1] == entries[end - 1][1] + entries[end - 1][2]:
+                    end += 1
+
+                span = entries[end - 1][1] + entries[end - 1][2] - offset
+
+                reader = self.get_reader(segment)
+                reader.seek(offset)
+                records = reader.read(span)
+
+                if len(records) != span:
+                    raise InvalidSegmentStorage(f'Record of block {start + end - 1} is truncated!')
+
+                for _, record_offset, size in entries[run:end]:
+                    position = record_offset - offset
+                    blocks.append(self.decode_block(records[position:position + size]))
+
+                run = end
+
+        return blocks
+
+    # Records
+    def encode_block(self, block: Block) -> bytes:
+        return block.hash + block.prev_hash + int.to_bytes(block.num, 4, 'little') + block.data
+
+    def decode_block(self, record: bytes) -> Block:
+        hash_size = self.hash_manager.get_hash_len()
+
+        hash = record[:hash_size]
+        prev_hash = record[hash_size:2 * hash_size]
+        num = int.from_bytes(record[2 * hash_size:2 * hash_size + 4], 'little')
+        data = record[2 * hash_size + 4:]
+
+        return Block(hash, prev_hash, num, data)
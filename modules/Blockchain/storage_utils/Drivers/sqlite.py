@@ -0,0 +1,279 @@
+"""Store Blockchain in SQLite database"""
+
+
+from typing import Iterable, List, Tuple
+from ...storage import StoredBlockchain
+from ...blockchain import Block, Blockchain, HashManager
+from ..lazy import LazyBlockList, BLOCK_CACHE_SIZE
+from ..snapshot import SnapshotFile
+from ..mmr import MountainRangeFile
+from ..writer import DURABILITY_NONE, DURABILITY_BATCH
+from ...utils.Drivers.hash import HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM, InvalidHashAlgorithm
+
+import os
+import sqlite3
+import threading
+
+
+DATABASE_NAME = 'blockchain.db'
+"""Name of the database file inside the storage directory."""
+
+SYNCHRONOUS_MODES = {
+    DURABILITY_NONE: 'OFF',
+    DURABILITY_BATCH: 'FULL',
+}
+"""SQLite synchronous mode for durability levels. NORMAL for the others."""
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS blocks (num INTEGER PRIMARY KEY, hash BLOB NOT NULL, prev_hash BLOB NOT NULL, data BLOB NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS blocks_hash ON blocks (hash)',
+    'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+)
+"""Tables of the database. Block number is the row id, so it's indexed by itself."""
+
+SELECT_BLOCK = 'SELECT hash, prev_hash, num, data FROM blocks WHERE num = ?'
+SELECT_BLOCKS = 'SELECT hash, prev_hash, num, data FROM blocks WHERE num BETWEEN ? AND ? ORDER BY num'
+SELECT_BLOCK_NUM = 'SELECT num FROM blocks WHERE hash = ? ORDER BY num LIMIT 1'
+SELECT_HEIGHT = 'SELECT MAX(num) FROM blocks'
+SELECT_META = 'SELECT value FROM meta WHERE name = ?'
+DELETE_BLOCKS = 'DELETE FROM blocks WHERE num >= ?'
+INSERT_BLOCK = 'INSERT INTO blocks (hash, prev_hash, num, data) VALUES (?, ?, ?, ?)'
+UPDATE_META = 'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)'
+
+
+class InvalidSQLiteStorage(Exception):
+    """Thrown when the database misses stored Blocks."""
+
+
+class BlockchainSQLiteStorage(StoredBlockchain):
+    """Driver for BlockchainStorage.
+
+    Implements operations to store Blockchain in a single SQLite database.
+
+    Database is kept in WAL mode, so readers don't wait for the writer.
+    Every batch of the writer is one transaction. Each thread uses
+    its own connection, statements are prepared once and cached by it.
+    Header of the Blockchain is taken from the last Block.
+
+    Durability levels map to synchronous modes of SQLite:
+    'none' is OFF, 'batch' is FULL and 'interval' is NORMAL
+    with a checkpoint on every sync.
+    """
+
+    def __init__(self, hash_manager: HashManager, path: str = 'blockchain', lazy: bool = False, cache_size: int = BLOCK_CACHE_SIZE,
+                 full_verify: bool = False, durability: str = DURABILITY_NONE, lazy_rehash: bool = False,
+                 checkpoints: Iterable[Tuple[int, bytes]] = (), read_only: bool = False):
+        """SQLite Storage Constructor.
+
+        Reads Blockchain from the database. If it doesn't exist, creates the new one.
+
+        Args:
+            hash_manager: Hash Manager of the Blockchain.
+            path: Directory of the storage.
+            lazy: Read only the header now and Blocks on first access.
+            cache_size: Max size in bytes of cached Blocks in lazy mode.
+            full_verify: Rehash every Block ignoring the snapshot.
+            durability: Durability level from writer DURABILITY_LEVELS.
+            lazy_rehash: Recalculate and store edited Blocks only when they are needed.
+            checkpoints: Trusted numbers and hashes of Blocks. Blocks below the highest matching one are not rehashed.
+            read_only: Serve stored Blocks as they are without recalculating or writing them.
+
+        Raises:
+            InvalidHashAlgorithm: Storage was made with another Hash algorithm.
+        """
+
+        self.path = path
+        self.hash_manager = hash_manager
+        self.synchronous = SYNCHRONOUS_MODES.get(durability, 'NORMAL')
+        self.connections = threading.local()
+        self.opened = []
+        self.connections_lock = threading.Lock()
+
+        os.makedirs(os.path.join(os.getcwd(), path), exist_ok=True)
+
+        connection = self.get_connection()
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+            # Databases made before algorithms were recorded use the default one
+            algorithm_id = self.read_meta('hash_algorithm')
+
+            if algorithm_id is None:
+                algorithm_id = HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM] if self.read_height() else hash_manager.get_algorithm_id()
+                connection.execute(UPDATE_META, ('hash_algorithm', algorithm_id))
+
+        if algorithm_id != hash_manager.get_algorithm_id():
+            connection.close()
+            raise InvalidHashAlgorithm(f"Storage '{path}' uses another hash algorithm!")
+
+        # Read Blockchain from the database
+        chain = self.read_blockchain_header()
+
+        if lazy:
+            blocks = LazyBlockList(self.read_block, chain.get_num(), cache_size, self.read_blocks)
+
+        else:
+            blocks = []
+            for row in connection.execute('SELECT hash, prev_hash, num, data FROM blocks ORDER BY num'):
+                blocks.append(Block(*row))
+
+        # Set up Blockchain
+        snapshots = SnapshotFile(os.path.join(path, 'snapshot'))
+        mountain_range = MountainRangeFile(os.path.join(path, 'mmr'), hash_manager.get_hash_len())
+        super().__init__(hash_manager, blocks, snapshots, full_verify, durability, mountain_range=mountain_range, lazy_rehash=lazy_rehash, checkpoints=checkpoints, read_only=read_only)
+
+    @staticmethod
+    def is_stored(path: str) -> bool:
+        """Checks if a SQLite storage exists in the directory.
+
+        Args:
+            path: Directory to check.
+
+        Returns:
+            True if the directory keeps a SQLite storage.
+        """
+
+        return os.path.isfile(os.path.join(os.getcwd(), path, DATABASE_NAME))
+
+    @staticmethod
+    def read_hash_algorithm(path: str) -> int:
+        """Reads the id of the Hash algorithm the storage was made with.
+
+        Args:
+            path: Directory of the storage.
+
+        Returns:
+            Id of the Hash algorithm. None if nothing is stored.
+        """
+
+        if not BlockchainSQLiteStorage.is_stored(path):
+            return None
+
+        connection = sqlite3.connect(os.path.join(os.getcwd(), path, DATABASE_NAME))
+
+        try:
+            row = connection.execute(SELECT_META, ('hash_algorithm',)).fetchone()
+
+        except sqlite3.OperationalError:
+            row = None
+
+        finally:
+            connection.close()
+
+        # Databases made before algorithms were recorded use the default one
+        return row[0] if row is not None else HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]
+
+    # Driver methods
+    def get_connection(self) -> sqlite3.Connection:
+        """Gets the database connection of the current thread, opening it if needed."""
+
+        connection = getattr(self.connections, 'connection', None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.get_database_path(), check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(f'PRAGMA synchronous={self.synchronous}')
+
+            self.connections.connection = connection
+
+            with self.connections_lock:
+                self.opened.append(connection)
+
+        return connection
+
+    def close(self):
+        """Writes every change and closes database connections."""
+
+        super().close()
+
+        with self.connections_lock:
+            for connection in self.opened:
+                connection.close()
+
+            self.opened.clear()
+
+        self.connections = threading.local()
+
+    def write_blocks(self, start: int, blocks: List[Block]):
+        connection = self.get_connection()
+
+        with connection:
+            stored = self.read_height()
+
+            connection.execute(DELETE_BLOCKS, (start,))
+            connection.executemany(INSERT_BLOCK, ((block.hash, block.prev_hash, block.num, block.data) for block in blocks))
+
+            # Stored Blocks were replaced, snapshots before it are outdated
+            if start <= stored:
+                connection.execute(UPDATE_META, ('generation', self.read_generation() + 1))
+
+        self.blocks_stored(start, blocks)
+
+    def sync_storage(self):
+        if self.synchronous == 'NORMAL':
+            self.get_connection().execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def storage_checksum(self, height: int) -> int:
+        """Gives the count of writes that replaced stored Blocks.
+
+        SQLite keeps the database consistent itself,
+        so the snapshot only needs to know if Blocks were replaced after it.
+        """
+
+        return self.read_generation()
+
+    # Paths
+    def get_database_path(self):
+        path = os.path.join(self.path, DATABASE_NAME)
+        return os.path.join(os.getcwd(), path)
+
+    # Read
+    def read_height(self) -> int:
+        height, = self.get_connection().execute(SELECT_HEIGHT).fetchone()
+        return height or 0
+
+    def read_meta(self, name: str) -> int:
+        row = self.get_connection().execute(SELECT_META, (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def read_generation(self) -> int:
+        return self.read_meta('generation') or 0
+
+    def read_blockchain_header(self) -> Blockchain:
+        height = self.read_height()
+
+        if height == 0:
+            return Blockchain(self.hash_manager.reserved_prev_hash(), 0)
+
+        last_block = self.read_block(height)
+        return Blockchain(last_block.get_hash(), last_block.get_num())
+
+    def read_block(self, num: int) -> Block:
+        row = self.get_connection().execute(SELECT_BLOCK, (num,)).fetchone()
+
+        if row is None:
+            raise InvalidSQLiteStorage(f'Block {num} is missing in the database!')
+
+        return Block(*row)
+
+    def read_blocks(self, start: int, count: int) -> List[Block]:
+        blocks = [Block(*row) for row in self.get_connection().execute(SELECT_BLOCKS, (start, start + count - 1))]
+
+        if len(blocks) != count:
+            raise InvalidSQLiteStorage(f'Blocks {start}-{start + count - 1} are missing in the database!')
+
+        return blocks
+
+    def find_block(self, hash: bytes) -> int:
+        """Finds the stored Block by its hash.
+
+        Args:
+            hash: Hash of the Block.
+
+        Returns:
+            Number of the first stored Block with the hash. None if there's no such Block.
+        """
+
+        row = self.get_connection().execute(SELECT_BLOCK_NUM, (hash,)).fetchone()
+        return row[0] if row is not None else None
@@ -0,0 +1,206 @@
+"""Export and import Blockchain as one sequential archive"""
+
+
+from typing import BinaryIO, Iterator
+from ..blockchain import Block, Blockchain, HashManager
+from ..storage import StoredBlockchain
+from ..validator import BlockchainValidator
+
+import hashlib
+import struct
+
+
+ARCHIVE_MAGIC = b'BTPA'
+"""Marks an archive file."""
+
+ARCHIVE_VERSION = 2
+"""Version of the archive layout."""
+
+ARCHIVE_LEGACY_VERSION = 1
+"""Version of archives keeping the hash size instead of the Hash algorithm id."""
+
+ARCHIVE_HEADER = struct.Struct('<4sBBQ')
+"""Archive header: magic, layout version, Hash algorithm id, count of Blocks."""
+
+ARCHIVE_RECORD = struct.Struct('<I')
+"""Size of the Block record following it: hash, prev_hash, 4 byte number, data."""
+
+ARCHIVE_DIGEST = hashlib.sha256
+"""Digest of everything before it, written at the end of the archive."""
+
+ARCHIVE_BUFFER_SIZE = 1024 * 1024
+"""Size in bytes of the file buffer used for archives."""
+
+IMPORT_BATCH_SIZE = 4096
+"""Count of Blocks appended to the storage at once."""
+
+
+class InvalidArchive(Exception):
+    """Thrown when the archive is damaged or doesn't fit the Blockchain."""
+
+
+def export_blockchain(chain: Blockchain, path: str) -> int:
+    """Writes every Block of the Blockchain to the archive.
+
+    Blocks are streamed in batches, so a lazily loaded storage
+    is exported with bounded memory.
+
+    Args:
+        chain: Blockchain to export. Storages are better opened read-only,
+            so stored Blocks are exported as they are.
+        path: Path of the archive file.
+
+    Returns:
+        Count of exported Blocks.
+    """
+
+    digest = ARCHIVE_DIGEST()
+    count = len(chain)
+
+    with open(path, 'wb', buffering=ARCHIVE_BUFFER_SIZE) as archive:
+        def write(data: bytes):
+            digest.update(data)
+            archive.write(data)
+
+        write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, chain.hash_manager.get_algorithm_id(), count))
+
+        for block in chain.iter_blocks(1, count + 1):
+            record = encode_block(block)
+
+            write(ARCHIVE_RECORD.pack(len(record)))
+            write(record)
+
+        archive.write(digest.digest())
+
+    return count
+
+
+def import_blockchain(chain: StoredBlockchain, path: str) -> int:
+    """Appends Blocks from the archive to an empty Blockchain.
+
+    The archive is read twice. Blocks are validated and the digest is checked
+    on the first pass, so nothing is stored from a damaged archive.
+    On the second pass Blocks are appended in batches as verified ones,
+    so they are not hashed again. Memory doesn't grow with the archive.
+
+    Args:
+        chain: Empty Blockchain to fill.
+        path: Path of the archive file.
+
+    Returns:
+        Count of imported Blocks.
+
+    Raises:
+        InvalidArchive: The archive is damaged or the Blockchain isn't empty.
+        InvalidHash, InvalidLink: Archived Block is invalid.
+    """
+
+    if len(chain) != 0:
+        raise InvalidArchive('Archive could be imported only to an empty Blockchain!')
+
+    hash_manager = chain.hash_manager
+    validator = BlockchainValidator(hash_manager)
+
+    with open(path, 'rb', buffering=ARCHIVE_BUFFER_SIZE) as archive:
+        prev_block = None
+        count = 0
+
+        for block in read_archive(archive, hash_manager):
+            validator.validate_block(block)
+            if prev_block is not None:
+                validator.validate_link(prev_block, block)
+
+            prev_block = block
+            count += 1
+
+        # Same open file is read again, so a replaced archive isn't imported
+        archive.seek(0)
+        prev_block = None
+        batch = []
+
+        try:
+            # Links are checked again, appended Blocks are only checked to follow the tip
+            for block in read_archive(archive, hash_manager):
+                if prev_block is not None:
+                    validator.validate_link(prev_block, block)
+
+                batch.append(block)
+                prev_block = block
+
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    chain.append_blocks(batch, verified=True)
+                    batch = []
+
+            chain.append_blocks(batch, verified=True)
+
+        # Archive changed after the first pass
+        except Exception:
+            chain.clear()
+            raise
+
+        chain.flush()
+
+    return count
+
+
+def read_archive(archive: BinaryIO, hash_manager: HashManager) -> Iterator[Block]:
+    """Reads Blocks of the archive, checking the digest after the last one.
+
+    Args:
+        archive: Archive file read from the start.
+        hash_manager: Hash Manager of the Blockchain the archive is imported to.
+
+    Yields:
+        Archived Blocks in order.
+
+    Raises:
+        InvalidArchive: The archive is damaged or uses another Hash algorithm.
+    """
+
+    digest = ARCHIVE_DIGEST()
+
+    def read(size: int) -> bytes:
+        data = archive.read(size)
+
+        if len(data) != size:
+            raise InvalidArchive('Archive is truncated!')
+
+        digest.update(data)
+        return data
+
+    magic, version, algorithm, count = ARCHIVE_HEADER.unpack(read(ARCHIVE_HEADER.size))
+
+    if magic != ARCHIVE_MAGIC or version not in (ARCHIVE_VERSION, ARCHIVE_LEGACY_VERSION):
+        raise InvalidArchive('Unknown archive format!')
+
+    # Legacy archives tell only the hash size
+    expected = hash_manager.get_algorithm_id() if version == ARCHIVE_VERSION else hash_manager.get_hash_len()
+
+    if algorithm != expected:
+        raise InvalidArchive('Archive uses another hash algorithm!')
+
+    for _ in range(count):
+        size, = ARCHIVE_RECORD.unpack(read(ARCHIVE_RECORD.size))
+        yield decode_block(read(size), hash_manager)
+
+    if archive.read(digest.digest_size) != digest.digest():
+        raise InvalidArchive('Archive digest doesn\'t match!')
+
+
+# Records
+def encode_block(block: Block) -> bytes:
+    return block.hash + block.prev_hash + int.to_bytes(block.num, 4, 'little') + block.data
+
+
+def decode_block(record: bytes, hash_manager: HashManager) -> Block:
+    hash_size = hash_manager.get_hash_len()
+
+    if len(record) < 2 * hash_size + 4:
+        raise InvalidArchive('Archived Block record is truncated!')
+
+    hash = record[:hash_size]
+    prev_hash = record[hash_size:2 * hash_size]
+    num = int.from_bytes(record[2 * hash_size:2 * hash_size + 4], 'little')
+    data = record[2 * hash_size + 4:]
+
+    return Block(hash, prev_hash, num, data)
@@ -0,0 +1,82 @@
+"""Compact storages in the background"""
+
+
+from typing import Callable
+
+import atexit
+import threading
+
+
+COMPACT_INTERVAL = 5.0
+"""Seconds between compactions."""
+
+COMPACT_LIVE_RATIO = 0.5
+"""Share of referenced bytes below which a segment is rewritten."""
+
+
+class BackgroundCompactor:
+    """Class running storage compaction from a background thread.
+
+    Usage:
+        compact is called once in the interval or earlier after wake.
+        Failed compaction stops the thread, the error is kept
+        and raised once by close.
+    """
+
+    def __init__(self, compact: Callable[[], None], interval: float = COMPACT_INTERVAL) -> None:
+        """Background Compactor constructor.
+
+        Args:
+            compact: Function compacting the storage.
+            interval: Seconds between compactions.
+        """
+
+        self.compact = compact
+        self.interval = interval
+
+        self.error = None
+        self.closed = False
+
+        self.event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def wake(self):
+        """Runs compaction without waiting for the interval."""
+
+        self.event.set()
+
+    def close(self):
+        """Stops the compactor thread.
+
+        Raises:
+            Exception: The last compaction failed.
+        """
+
+        if not self.closed:
+            self.closed = True
+            self.event.set()
+            self.thread.join()
+
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def run(self):
+        """Compactor thread loop."""
+
+        while not self.closed:
+            self.event.wait(self.interval)
+            self.event.clear()
+
+            if self.closed:
+                return
+
+            try:
+                self.compact()
+
+            except Exception as exc:
+                self.error = exc
+                return
@@ -0,0 +1,76 @@
+"""Migrate Blockchain storages between Storage Drivers"""
+
+
+from .Drivers.file import BlockchainFileStorage
+from .Drivers.segment import BlockchainSegmentStorage
+from ..utils.Drivers.hash import HashManagerDriver, get_hash_algorithm
+
+import os
+import re
+import shutil
+
+
+CONVERT_BATCH_SIZE = 4096
+"""Count of Blocks written to segments at once."""
+
+CONVERT_DIRECTORY = 'convert'
+"""Temporary directory inside the storage used while converting."""
+
+
+def convert_file_storage(path: str) -> int:
+    """Migrates file storage directory to the segment storage.
+
+    New segments are built in a temporary directory and moved in place
+    with the manifest going last, so an interrupted conversion leaves
+    the file storage untouched. Block files are removed afterwards.
+
+    Args:
+        path: Directory keeping the file storage.
+
+    Returns:
+        Count of converted Blocks.
+
+    Raises:
+        FileNotFoundError: There's no file storage in the directory.
+        FileExistsError: The directory already keeps a segment storage.
+        InvalidHashAlgorithm: File storage uses an unknown Hash algorithm.
+    """
+
+    if BlockchainSegmentStorage.is_stored(path):
+        raise FileExistsError(f"'{path}' already keeps a segment storage!")
+
+    if not BlockchainFileStorage.is_stored(path):
+        raise FileNotFoundError(f"'{path}' doesn't keep a file storage!")
+
+    # Segments keep the algorithm of the file storage
+    hash_manager = HashManagerDriver(get_hash_algorithm(BlockchainFileStorage.read_hash_algorithm(path)))
+    source = BlockchainFileStorage(hash_manager, path, lazy=True)
+
+    # Build segments aside
+    temp_path = os.path.join(path, CONVERT_DIRECTORY)
+    shutil.rmtree(os.path.join(os.getcwd(), temp_path), ignore_errors=True)
+
+    target = BlockchainSegmentStorage(hash_manager, temp_path)
+
+    for start in range(1, len(source) + 1, CONVERT_BATCH_SIZE):
+        target.append_records(list(source.iter_blocks(start, start + CONVERT_BATCH_SIZE)))
+
+    source.close()
+    target.close()
+
+    # Move segments in place, manifest marks the storage as converted
+    temp_dir = os.path.join(os.getcwd(), temp_path)
+    storage_dir = os.path.join(os.getcwd(), path)
+
+    names = sorted(os.listdir(temp_dir), key=lambda name: name == 'manifest')
+    for name in names:
+        os.replace(os.path.join(temp_dir, name), os.path.join(storage_dir, name))
+
+    os.rmdir(temp_dir)
+
+    # Remove file storage
+    for name in os.listdir(storage_dir):
+        if name == 'blockchain' or re.fullmatch(r'block\d+', name):
+            os.remove(os.path.join(storage_dir, name))
+
+    return len(source)
\ No newline at end of file
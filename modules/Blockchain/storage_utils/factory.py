@@ -1,21 +1,131 @@
+from typing import Iterable, Tuple
 from ..storage import StoredBlockchain, Blockchain
 from .Drivers.file import BlockchainFileStorage
-from ..utils.Drivers.hash import HashManagerDriver
+from .Drivers.segment import BlockchainSegmentStorage
+from .Drivers.sqlite import BlockchainSQLiteStorage
+from .lazy import BLOCK_CACHE_SIZE
+from .writer import DURABILITY_NONE
+from ..utils.Drivers.hash import HashManagerDriver, get_hash_algorithm, fastest_hash_algorithm
+from ..utils.Drivers.hash import DEFAULT_HASH_ALGORITHM, HASH_ALGORITHM_AUTO, InvalidHashAlgorithm
+
+
+STORAGE_DRIVERS = {
+    'segment': BlockchainSegmentStorage,
+    'sqlite': BlockchainSQLiteStorage,
+    'file': BlockchainFileStorage,
+}
+"""Storage Drivers available by name.
+
+Existing storages are detected in this order.
+"""
+
+DEFAULT_STORAGE_DRIVER = 'file'
+"""Storage Driver used when a new storage is created."""
 
 
 class StoredBlockchainFactory:
     """Class that incapsulates BlockchainStorage creation logic.
-    
+
     Gives all dependencies BlockchainStorage needs.
     """
 
     def __init__(self) -> None:
         """Factory constructor."""
 
-    def create(self, path: str = 'blockchain') -> Blockchain:
-        """Creates storage for Blockchain."""
+    def create(self, path: str = 'blockchain', driver: str = None, lazy: bool = False, cache_size: int = BLOCK_CACHE_SIZE,
+               full_verify: bool = False, durability: str = DURABILITY_NONE, copy_on_write: bool = False,
+               lazy_rehash: bool = False, hash_algorithm: str = None, checkpoints: Iterable[Tuple[int, bytes]] = (),
+               read_only: bool = False) -> Blockchain:
+        """Creates storage for Blockchain.
+
+        Args:
+            path: Directory of the storage.
+            driver: Name of Storage Driver from STORAGE_DRIVERS.
+                If None, Driver of the existing storage is used
+                or DEFAULT_STORAGE_DRIVER for a new one.
+            lazy: Read Blocks on first access instead of loading all of them.
+            cache_size: Max size in bytes of cached Blocks in lazy mode.
+            full_verify: Rehash every Block on load ignoring the snapshot.
+            durability: When storage files are synced. One of writer DURABILITY_LEVELS.
+            copy_on_write: Journal edits and write them from the background.
+                Supported by segment storage only.
+            lazy_rehash: Recalculate and store edited Blocks only when they are needed.
+                Edits are written on commit, flush or close. Appends are written right away.
+            hash_algorithm: Name of the Hash algorithm of a new storage from hash HASH_ALGORITHMS.
+                HASH_ALGORITHM_AUTO picks the fastest secure one of the host.
+                If None, DEFAULT_HASH_ALGORITHM is used.
+                Existing storages keep the algorithm they were made with.
+            checkpoints: Trusted numbers and hashes of Blocks.
+                Blocks below the highest matching one are not rehashed on load unless full_verify is set.
+            read_only: Serve stored Blocks as they are, so audits see them untouched.
+                Nothing is recalculated or written and edits are refused.
+
+        Raises:
+            ValueError: Unknown Storage Driver or the Driver doesn't support the option.
+            InvalidHashAlgorithm: Existing storage uses another or unknown Hash algorithm.
+        """
+
+        if driver is None:
+            driver = self.detect_driver(path)
+
+        if driver not in STORAGE_DRIVERS:
+            raise ValueError(f"Unknown storage driver '{driver}'! Use one of: {', '.join(STORAGE_DRIVERS)}")
 
         # Dependencies
-        hash_manager = HashManagerDriver()
+        hash_manager = HashManagerDriver(self.select_hash_algorithm(STORAGE_DRIVERS[driver], path, hash_algorithm))
+
+        options = {}
+        if copy_on_write:
+            if driver != 'segment':
+                raise ValueError(f"Storage driver '{driver}' doesn't support copy-on-write mode! Use 'segment'")
+
+            options['copy_on_write'] = True
+
+        return STORAGE_DRIVERS[driver](hash_manager, path, lazy=lazy, cache_size=cache_size, full_verify=full_verify,
+                                       durability=durability, lazy_rehash=lazy_rehash, checkpoints=checkpoints, read_only=read_only, **options)
+
+    def select_hash_algorithm(self, driver: type, path: str, hash_algorithm: str = None) -> str:
+        """Selects the Hash algorithm of the storage.
+
+        Args:
+            driver: Storage Driver class.
+            path: Directory of the storage.
+            hash_algorithm: Requested algorithm name, HASH_ALGORITHM_AUTO or None.
+
+        Returns:
+            Name of the Hash algorithm.
+
+        Raises:
+            InvalidHashAlgorithm: Existing storage uses another or unknown Hash algorithm.
+        """
+
+        algorithm_id = driver.read_hash_algorithm(path)
+
+        if algorithm_id is not None:
+            stored = get_hash_algorithm(algorithm_id)
+
+            if hash_algorithm not in (None, HASH_ALGORITHM_AUTO, stored):
+                raise InvalidHashAlgorithm(f"Storage '{path}' uses '{stored}' hash algorithm, not '{hash_algorithm}'!")
+
+            return stored
+
+        if hash_algorithm == HASH_ALGORITHM_AUTO:
+            return fastest_hash_algorithm()
+
+        return hash_algorithm or DEFAULT_HASH_ALGORITHM
+
+    def detect_driver(self, path: str) -> str:
+        """Detects Storage Driver of the existing storage.
+
+        Args:
+            path: Directory of the storage.
+
+        Returns:
+            Name of Storage Driver. DEFAULT_STORAGE_DRIVER if nothing is stored.
+        """
+
+        for name, driver in STORAGE_DRIVERS.items():
+            if driver.is_stored(path):
+                return name
 
-        return BlockchainFileStorage(hash_manager, path)
\ No newline at end of file
+        return DEFAULT_STORAGE_DRIVER
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""Keep the index of stored Block hashes"""
+
+
+from typing import Dict, Iterable, Tuple
+
+import heapq
+import mmap
+import os
+import struct
+import threading
+
+
+HASH_INDEX_MAGIC = b'BTPI'
+"""Marks a hash index file."""
+
+HASH_INDEX_HEADER = struct.Struct('<4sBQQ')
+"""Hash index header: magic, hash size, count of the first stored Blocks covered by the index, count of sorted records."""
+
+HASH_INDEX_NUM = struct.Struct('<Q')
+"""Block number following its hash in a hash index record."""
+
+HASH_INDEX_TAIL = 4096
+"""Count of appended records kept unsorted before they are merged into the sorted ones."""
+
+HASH_INDEX_MERGE_BATCH = 65536
+"""Count of merged records written at once."""
+
+
+class HashIndexFile:
+    """Class searching and writing the hash index of a storage.
+
+    Usage:
+        Records sorted by hash lie after the header and are searched
+        by bisection in the mapped file, so the index isn't loaded.
+        Records of written Blocks are appended after them and kept in memory
+        until there are HASH_INDEX_TAIL of them, then they are merged into the sorted ones.
+
+        A record could be outdated by a later one or by a removed Block,
+        readers check the Block the index points to.
+        Outdated records are dropped by the merge.
+
+        Header tells how many of the first stored Blocks surely have a record.
+        Blocks after it are indexed again on load.
+    """
+
+    def __init__(self, path: str, hash_size: int) -> None:
+        """Hash Index File constructor.
+
+        Args:
+            path: Path of the hash index file.
+            hash_size: Size of Block hashes.
+        """
+
+        self.path = os.path.join(os.getcwd(), path)
+        self.hash_size = hash_size
+        self.record_size = hash_size + HASH_INDEX_NUM.size
+        self.covered = 0
+        self.sorted = 0
+        self.tail = {}
+        self.tail_nums = {}
+        self.file = None
+        self.map = None
+        self.lock = threading.Lock()
+
+    def open(self, writable: bool = True) -> int:
+        """Opens the index, only records appended after the sorted ones are read.
+
+        Args:
+            writable: Damaged index is started over and torn records are cut off.
+                Otherwise nothing is written and a damaged index covers nothing.
+
+        Returns:
+            Count of the first stored Blocks covered by the index.
+            Nothing is covered if the file is missing or damaged.
+        """
+
+        try:
+            self.file = open(self.path, 'r+b' if writable else 'rb', buffering=0)
+
+        except FileNotFoundError:
+            if writable:
+                self.rewrite({}, 0)
+
+            return 0
+
+        header = self.file.read(HASH_INDEX_HEADER.size)
+        size = self.file.seek(0, os.SEEK_END)
+        magic, hash_size, self.covered, self.sorted = HASH_INDEX_HEADER.unpack(header) if len(header) == HASH_INDEX_HEADER.size else (b'', 0, 0, 0)
+        start = HASH_INDEX_HEADER.size + self.sorted * self.record_size
+
+        if magic != HASH_INDEX_MAGIC or hash_size != self.hash_size or size < start:
+            self.close()
+            self.covered, self.sorted = 0, 0
+
+            if writable:
+                self.rewrite({}, 0)
+
+            return 0
+
+        # Torn record of an interrupted append is ignored
+        end = size - (size - start) % self.record_size
+        self.file.seek(start)
+        records = self.file.read(end - start)
+
+        for offset in range(0, len(records), self.record_size):
+            hash = records[offset:offset + self.hash_size]
+            self.add_tail(hash, HASH_INDEX_NUM.unpack_from(records, offset + self.hash_size)[0])
+
+        if writable and end != size:
+            self.file.truncate(end)
+
+        self.map_sorted()
+        return self.covered
+
+    def map_sorted(self):
+        """Maps the sorted records of the file for searching."""
+
+        if self.sorted > 0:
+            self.map = mmap.mmap(self.file.fileno(), HASH_INDEX_HEADER.size + self.sorted * self.record_size, access=mmap.ACCESS_READ)
+
+    def add_tail(self, hash: bytes, num: int):
+        """Keeps an appended record, a Block number has only its last hash."""
+
+        old = self.tail_nums.get(num)
+
+        if old is not None and old != hash and self.tail.get(old) == num:
+            del self.tail[old]
+
+        self.tail[hash] = num
+        self.tail_nums[num] = hash
+
+    def find(self, hash: bytes) -> int:
+        """Finds the number of the Block with the hash.
+
+        Returns:
+            Number of the Block the index points to. None if the hash isn't indexed.
+        """
+
+        with self.lock:
+            num = self.tail.get(hash)
+
+            if num is not None or self.map is None:
+                return num
+
+            low, high = 0, self.sorted
+
+            while low < high:
+                middle = (low + high) // 2
+                offset = HASH_INDEX_HEADER.size + middle * self.record_size
+
+                if self.map[offset:offset + self.hash_size] < hash:
+                    low = middle + 1
+
+                else:
+                    high = middle
+
+            offset = HASH_INDEX_HEADER.size + low * self.record_size
+
+            if low < self.sorted and self.map[offset:offset + self.hash_size] == hash:
+                return HASH_INDEX_NUM.unpack_from(self.map, offset + self.hash_size)[0]
+
+            return None
+
+    def append(self, entries: Iterable[Tuple[bytes, int]], covered: int, size: int):
+        """Appends records and updates the count of covered Blocks.
+
+        Args:
+            entries: Hashes and numbers of written Blocks.
+            covered: Count of the first stored Blocks having a record.
+            size: Count of stored Blocks. Records after it are dropped by a merge.
+        """
+
+        with self.lock:
+            records = bytearray()
+
+            for hash, num in entries:
+                if isinstance(hash, bytes) and len(hash) == self.hash_size:
+                    records += hash + HASH_INDEX_NUM.pack(num)
+                    self.add_tail(hash, num)
+
+            self.file.seek(0, os.SEEK_END)
+            self.file.write(records)
+
+            self.covered = covered
+            self.write_header()
+
+            if len(self.tail) >= HASH_INDEX_TAIL:
+                self.merge(size)
+
+    def write_header(self):
+        self.file.seek(0)
+        self.file.write(HASH_INDEX_HEADER.pack(HASH_INDEX_MAGIC, self.hash_size, self.covered, self.sorted))
+
+    def iter_sorted(self) -> Iterable[Tuple[bytes, int]]:
+        """Iterates over sorted records of the file."""
+
+        for index in range(self.sorted):
+            offset = HASH_INDEX_HEADER.size + index * self.record_size
+            yield self.map[offset:offset + self.hash_size], HASH_INDEX_NUM.unpack_from(self.map, offset + self.hash_size)[0]
+
+    def merge(self, size: int):
+        """Merges appended records into the sorted ones, dropping outdated records.
+
+        A record is outdated if its Block is removed or its number got another hash later.
+
+        Args:
+            size: Count of stored Blocks.
+        """
+
+        def is_actual(hash: bytes, num: int) -> bool:
+            return num <= size and self.tail_nums.get(num, hash) == hash
+
+        appended = sorted((hash, num) for hash, num in self.tail.items() if is_actual(hash, num))
+        stored = ((hash, num) for hash, num in self.iter_sorted() if hash not in self.tail and is_actual(hash, num))
+
+        self.rewrite_records(heapq.merge(stored, appended), self.covered)
+
+        self.tail.clear()
+        self.tail_nums.clear()
+
+    def rewrite(self, index: Dict[bytes, int], covered: int):
+        """Replaces the file with records of the index.
+
+        Args:
+            index: Hashes and numbers of Blocks.
+            covered: Count of the first stored Blocks having a record.
+        """
+
+        with self.lock:
+            self.rewrite_records(sorted(index.items()), covered)
+
+            self.tail.clear()
+            self.tail_nums.clear()
+
+    def rewrite_records(self, records: Iterable[Tuple[bytes, int]], covered: int):
+        """Writes sorted records to a new file replacing the old one.
+
+        File is replaced atomically, so a crash leaves either the old or the new one.
+        """
+
+        temp_path = self.path + '.tmp'
+        count = 0
+
+        with open(temp_path, 'wb') as file:
+            file.write(bytes(HASH_INDEX_HEADER.size))
+            batch = bytearray()
+
+            for hash, num in records:
+                if isinstance(hash, bytes) and len(hash) == self.hash_size:
+                    batch += hash + HASH_INDEX_NUM.pack(num)
+                    count += 1
+
+                if len(batch) >= HASH_INDEX_MERGE_BATCH * self.record_size:
+                    file.write(batch)
+                    batch.clear()
+
+            file.write(batch)
+            file.seek(0)
+            file.write(HASH_INDEX_HEADER.pack(HASH_INDEX_MAGIC, self.hash_size, covered, count))
+
+        # Mapped file can't be replaced on every system
+        self.close()
+        os.replace(temp_path, self.path)
+
+        self.covered, self.sorted = covered, count
+        self.file = open(self.path, 'r+b', buffering=0)
+        self.map_sorted()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
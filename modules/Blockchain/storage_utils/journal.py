@@ -0,0 +1,198 @@
+"""Record Blockchain edits before they are stored"""
+
+
+from typing import Iterator, Tuple
+
+import os
+import struct
+
+
+EDIT_SET = 1
+"""Block was replaced."""
+
+EDIT_REMOVE = 2
+"""Block was removed."""
+
+EDIT_APPEND = 3
+"""Block was appended."""
+
+EDIT_OPERATIONS = (EDIT_SET, EDIT_REMOVE, EDIT_APPEND)
+"""Known edit operations."""
+
+JOURNAL_MAGIC = b'BTPJ'
+"""Marks a journal file."""
+
+JOURNAL_HEADER = struct.Struct('<4sQII')
+"""Journal header: magic, base height, base segment, base offset."""
+
+JOURNAL_RECORD = struct.Struct('<BQI')
+"""Journal record: operation, Block number, data size. Followed by data."""
+
+JOURNAL_MAX_SIZE = 16 * 1024 * 1024
+"""Size in bytes after which journaled edits should be stored without waiting."""
+
+
+class EditJournal:
+    """Class keeping edits of a storage in an append-only file.
+
+    Usage:
+        Storage records an edit with append instead of rewriting its Blocks.
+        On load the recorded edits are applied again with records.
+        When edits are written to the storage the covered part is dropped with trim.
+
+        Non-empty journal starts with the base: the stored height and the position
+        of the storage end the edits were made on top of. It lets the storage tell
+        if the edits were already written before the journal was trimmed.
+
+        Torn record left by an interrupted append is ignored and dropped.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Edit Journal constructor.
+
+        Opens the journal file, creating it if needed.
+
+        Args:
+            path: Path of the journal file.
+        """
+
+        self.path = os.path.join(os.getcwd(), path)
+
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+
+        self.file = open(self.path, 'r+b', buffering=0)
+        self.base = self.read_base()
+        self.size = self.valid_size()
+        self.file.truncate(self.size)
+
+    def read_base(self) -> Tuple[int, int, int]:
+        """Reads the header of the journal.
+
+        Returns:
+            Base height, segment and offset. None if the journal is empty or damaged.
+        """
+
+        self.file.seek(0)
+        header = self.file.read(JOURNAL_HEADER.size)
+
+        if len(header) != JOURNAL_HEADER.size:
+            return None
+
+        magic, height, segment, offset = JOURNAL_HEADER.unpack(header)
+
+        if magic != JOURNAL_MAGIC:
+            return None
+
+        return height, segment, offset
+
+    def valid_size(self) -> int:
+        """Finds the size of complete records.
+
+        Returns:
+            Offset after the last complete record. Zero if there are none.
+        """
+
+        size = 0
+        if self.base is not None:
+            for _, _, _, end in self.scan():
+                size = end
+
+        return size
+
+    def scan(self) -> Iterator[Tuple[int, int, bytes, int]]:
+        """Reads complete records from the start of the journal.
+
+        Yields:
+            Operation, Block number, data and offset after the record.
+        """
+
+        self.file.seek(0)
+        journal = self.file.read()
+
+        offset = JOURNAL_HEADER.size
+        while offset + JOURNAL_RECORD.size <= len(journal):
+            operation, num, size = JOURNAL_RECORD.unpack_from(journal, offset)
+            end = offset + JOURNAL_RECORD.size + size
+
+            if operation not in EDIT_OPERATIONS or end > len(journal):
+                break
+
+            yield operation, num, journal[offset + JOURNAL_RECORD.size:end], end
+            offset = end
+
+    def records(self) -> Iterator[Tuple[int, int, bytes]]:
+        """Reads recorded edits in order.
+
+        Yields:
+            Operation, Block number and data of the Block.
+        """
+
+        for operation, num, data, _ in self.scan():
+            yield operation, num, data
+
+    def append(self, operation: int, num: int, data: bytes, base: Tuple[int, int, int], sync: bool = False):
+        """Records an edit.
+
+        Args:
+            operation: One of EDIT_OPERATIONS.
+            num: Number of the edited Block.
+            data: Data of the Block. Empty for EDIT_REMOVE.
+            base: Stored height, segment and offset of the storage end.
+                Used only if the journal is empty.
+            sync: Flush the journal to the disk.
+        """
+
+        record = JOURNAL_RECORD.pack(operation, num, len(data)) + data
+
+        if self.size == 0:
+            self.base = base
+            record = JOURNAL_HEADER.pack(JOURNAL_MAGIC, *base) + record
+
+        self.file.seek(self.size)
+        self.file.write(record)
+        self.size += len(record)
+
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def trim(self, offset: int, base: Tuple[int, int, int] = None):
+        """Drops records before offset.
+
+        Records appended after offset are kept.
+        Journal is replaced atomically, so a crash leaves either the old or the new one.
+
+        Args:
+            offset: Journal size at the moment the dropped records were stored.
+            base: Stored height, segment and offset the kept records were made on top of.
+        """
+
+        self.file.seek(max(offset, JOURNAL_HEADER.size))
+        rest = self.file.read(max(self.size - offset, 0))
+
+        if rest:
+            rest = JOURNAL_HEADER.pack(JOURNAL_MAGIC, *base) + rest
+
+        temp_path = self.path + '.tmp'
+
+        with open(temp_path, 'wb') as file:
+            file.write(rest)
+            os.fsync(file.fileno())
+
+        self.file.close()
+        os.replace(temp_path, self.path)
+
+        self.file = open(self.path, 'r+b', buffering=0)
+        self.size = len(rest)
+        self.base = base if rest else None
+
+    def sync(self):
+        """Flushes the journal to the disk."""
+
+        os.fsync(self.file.fileno())
+
+    def is_empty(self) -> bool:
+        return self.size == 0
+
+    def close(self):
+        self.file.close()
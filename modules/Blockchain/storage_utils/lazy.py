@@ -0,0 +1,365 @@
+"""Load stored Blocks on demand"""
+
+
+from typing import Callable, Iterator, List
+from collections import OrderedDict
+from ..blockchain import Block
+
+import bisect
+import threading
+
+
+BLOCK_CACHE_SIZE = 64 * 1024 * 1024
+"""Default size in bytes of cached Blocks."""
+
+BLOCK_OVERHEAD_SIZE = 200
+"""Approximate memory taken by a cached Block besides its fields."""
+
+READ_AHEAD_SIZE = 256
+"""Count of Blocks read from the storage at once while iterating."""
+
+
+class LazyBlockList:
+    """List of Blocks read from a storage on first access.
+
+    Usage:
+        Used by storages as blocks of Blockchain instead of a list.
+        Supports the list operations Blockchain classes use.
+
+        Read Blocks are kept in LRU cache bounded by size in bytes.
+        Changed Blocks are kept apart until the storage tells they are written
+        with mark_clean, so they can't be evicted before that.
+
+        Iteration reads Blocks ahead in batches and doesn't put them
+        to the cache, so a walk over the storage doesn't evict used Blocks.
+
+        Removing or inserting a Block doesn't read the following ones.
+        Their indexes are remapped to stored positions by runs of offsets
+        until the storage rewrites them, see rebase.
+    """
+
+    def __init__(self, read_block: Callable[[int], Block], length: int, cache_size: int = BLOCK_CACHE_SIZE,
+                 read_blocks: Callable[[int, int], List[Block]] = None) -> None:
+        """Lazy Block List constructor.
+
+        Args:
+            read_block: Function reading the stored Block by its number.
+            length: Count of stored Blocks.
+            cache_size: Max size in bytes of cached unchanged Blocks.
+            read_blocks: Function reading count of stored Blocks from a number at once.
+                If None, Blocks are read one by one.
+        """
+
+        self.read_block = read_block
+        self.read_blocks = read_blocks
+        self.length = length
+        self.cache_size = cache_size
+
+        # Cached Blocks by stored index, changed Blocks by index
+        self.cache = OrderedDict()
+        self.cached_size = 0
+        self.dirty = {}
+
+        # Index from run_starts[k] on is stored at index + run_offsets[k]
+        self.run_starts = [0]
+        self.run_offsets = [0]
+
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def block_size(block: Block) -> int:
+        """Estimates memory taken by a Block.
+
+        Args:
+            block: Block to estimate.
+
+        Returns:
+            Size in bytes.
+        """
+
+        return len(block.hash) + len(block.prev_hash) + len(block.data) + BLOCK_OVERHEAD_SIZE
+
+    def normalize_index(self, index: int) -> int:
+        """Turns negative index to positive and checks bounds.
+
+        Raises:
+            IndexError: Index is out of range.
+        """
+
+        if index < 0:
+            index += self.length
+
+        if index < 0 or index >= self.length:
+            raise IndexError('Block index out of range')
+
+        return index
+
+    def stored_index(self, index: int) -> int:
+        """Gets the index of the stored Block kept at the index."""
+
+        return index + self.run_offsets[bisect.bisect_right(self.run_starts, index) - 1]
+
+    def shift_runs(self, index: int, step: int):
+        """Remaps indexes after a Block is removed or inserted, so they keep their stored Blocks.
+
+        Args:
+            index: Index of the removed or inserted Block.
+            step: -1 if removed, 1 if inserted.
+        """
+
+        if step < 0:
+            after = index + 1
+            offset = self.stored_index(after) - index
+
+        else:
+            after = index
+            offset = self.stored_index(index) - index - 1
+
+        run = bisect.bisect_right(self.run_starts, after)
+        starts = [start + step for start in self.run_starts[run:]]
+        offsets = [stored - step for stored in self.run_offsets[run:]]
+
+        head = bisect.bisect_left(self.run_starts, index)
+        self.run_starts[head:] = [index] + starts
+        self.run_offsets[head:] = [offset] + offsets
+
+        # Neighbour runs with the same offset are one run
+        for k in range(len(self.run_starts) - 1, 0, -1):
+            if self.run_offsets[k] == self.run_offsets[k - 1]:
+                del self.run_starts[k]
+                del self.run_offsets[k]
+
+    def shift_dirty(self, index: int, step: int):
+        """Moves changed Blocks after the index by step."""
+
+        self.dirty = {(key + step if key > index or (step > 0 and key == index) else key): block
+                      for key, block in self.dirty.items()}
+
+    # List operations
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> Block:
+        with self.lock:
+            index = self.normalize_index(index)
+
+            if index in self.dirty:
+                return self.dirty[index]
+
+            stored = self.stored_index(index)
+
+            if stored in self.cache:
+                self.cache.move_to_end(stored)
+                return self.cache[stored]
+
+            block = self.read_block(stored + 1)
+            self.cache_block(stored, block)
+
+            return block
+
+    def __setitem__(self, index: int, block: Block):
+        with self.lock:
+            index = self.normalize_index(index)
+
+            self.uncache_block(self.stored_index(index))
+            self.dirty[index] = block
+
+    def __delitem__(self, index: int):
+        with self.lock:
+            index = self.normalize_index(index)
+
+            self.dirty.pop(index, None)
+
+            # Following Blocks are remapped, not read
+            if index < self.length - 1:
+                self.shift_dirty(index, -1)
+                self.shift_runs(index, -1)
+
+            self.length -= 1
+
+    def __iter__(self) -> Iterator[Block]:
+        return self.iter_range(range(self.length))
+
+    def iter_range(self, indexes: range) -> Iterator[Block]:
+        """Iterates over Blocks by their indexes.
+
+        Stops if the list got shorter.
+
+        Args:
+            indexes: Indexes of Blocks to yield in order.
+
+        Yields:
+            Blocks.
+        """
+
+        for offset in range(0, len(indexes), READ_AHEAD_SIZE):
+            batch = indexes[offset:offset + READ_AHEAD_SIZE]
+            blocks = self.read_batch(batch)
+
+            yield from blocks
+
+            if len(blocks) != len(batch):
+                return
+
+    def read_batch(self, indexes: range) -> List[Block]:
+        """Gets Blocks by indexes reading missing ones at once.
+
+        Args:
+            indexes: Indexes of Blocks.
+
+        Returns:
+            Blocks up to the first index out of the list.
+        """
+
+        with self.lock:
+            found = {}
+            missing = {}
+
+            for index in indexes:
+                if index >= self.length:
+                    break
+
+                block = self.dirty.get(index)
+
+                if block is None:
+                    stored = self.stored_index(index)
+                    block = self.cache.get(stored)
+
+                    if block is None:
+                        missing[stored] = index
+                        continue
+
+                found[index] = block
+
+            # Sequential walks read the whole span of missing Blocks between remapped ones
+            if missing and self.read_blocks is not None and abs(indexes.step) == 1:
+                stored = sorted(missing)
+                low = 0
+
+                for high in range(1, len(stored) + 1):
+                    if high < len(stored) and stored[high] - stored[high - 1] < READ_AHEAD_SIZE:
+                        continue
+
+                    first, last = stored[low], stored[high - 1]
+
+                    for position, block in zip(range(first, last + 1), self.read_blocks(first + 1, last - first + 1)):
+                        if position in missing:
+                            found[missing[position]] = block
+
+                    low = high
+
+            else:
+                for stored, index in missing.items():
+                    found[index] = self.read_block(stored + 1)
+
+            return [found[index] for index in indexes[:len(found)]]
+
+    def append(self, block: Block):
+        with self.lock:
+            self.length += 1
+            self.dirty[self.length - 1] = block
+
+    def insert(self, index: int, block: Block):
+        with self.lock:
+            index = min(max(index + self.length if index < 0 else index, 0), self.length)
+
+            # Following Blocks are remapped, not read
+            if index < self.length:
+                self.shift_dirty(index, 1)
+                self.shift_runs(index, 1)
+
+            self.length += 1
+
+            self.dirty[index] = block
+
+    def clear(self):
+        with self.lock:
+            self.length = 0
+            self.cache.clear()
+            self.cached_size = 0
+            self.dirty.clear()
+            self.run_starts = [0]
+            self.run_offsets = [0]
+
+    # Cache
+    def cache_block(self, stored: int, block: Block):
+        """Puts unchanged Block to the cache by its stored index evicting the oldest ones."""
+
+        self.cache[stored] = block
+        self.cached_size += self.block_size(block)
+
+        while self.cached_size > self.cache_size and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_size -= self.block_size(evicted)
+
+    def uncache_block(self, stored: int):
+        """Drops Block from the cache by its stored index."""
+
+        block = self.cache.pop(stored, None)
+        if block is not None:
+            self.cached_size -= self.block_size(block)
+
+    def rebase(self, start: int, blocks: List[Block]):
+        """Takes Blocks the storage is about to write from start to the end.
+
+        Stored Blocks from start are replaced by the write, so the given Blocks
+        are kept as changed until mark_clean and their indexes aren't remapped anymore.
+        The writer holds them until then anyway.
+
+        Args:
+            start: Number of the first written Block.
+            blocks: Blocks from start to the end of the list.
+        """
+
+        with self.lock:
+            first = start - 1
+
+            for index, block in enumerate(blocks, first):
+                self.dirty[index] = block
+
+            for stored in [stored for stored in self.cache if stored >= first]:
+                self.uncache_block(stored)
+
+            run = bisect.bisect_left(self.run_starts, first)
+            del self.run_starts[run:]
+            del self.run_offsets[run:]
+
+            if not self.run_offsets or self.run_offsets[-1] != 0:
+                self.run_starts.append(first)
+                self.run_offsets.append(0)
+
+    def mark_clean(self, start: int, blocks: List[Block], pending: Callable[[], int] = None):
+        """Marks written Blocks as stored.
+
+        They become ordinary cached Blocks and can be evicted.
+        Blocks changed or moved again after the write stay as they are.
+
+        Args:
+            start: Number of the first written Block.
+            blocks: Written Blocks.
+            pending: Gives the number of the first Block replaced by writes still queued, None if there are none.
+                Blocks from it stay changed, since queued writes could store others in their places.
+        """
+
+        with self.lock:
+            # Asked under the lock, so no rebase could be queued meanwhile
+            end = pending() if pending is not None else None
+
+            if end is not None:
+                blocks = blocks[:max(end - start, 0)]
+
+            for index, block in enumerate(blocks, start - 1):
+                current = self.dirty.get(index)
+
+                if current is None or self.stored_index(index) != index or not self.same_blocks(current, block):
+                    continue
+
+                del self.dirty[index]
+                self.cache_block(index, current)
+
+    @staticmethod
+    def same_blocks(first: Block, second: Block) -> bool:
+        """Compares Blocks by their fields."""
+
+        return (first.hash == second.hash and first.prev_hash == second.prev_hash
+                and first.num == second.num and first.data == second.data)
\ No newline at end of file
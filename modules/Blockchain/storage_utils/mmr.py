@@ -0,0 +1,157 @@
+"""Keep the Merkle Mountain Range of stored Blocks"""
+
+
+import os
+import struct
+
+
+MMR_MAGIC = b'BTPM'
+"""Marks a Merkle Mountain Range file."""
+
+MMR_HEADER = struct.Struct('<4sB')
+"""Merkle Mountain Range header: magic, hash size. Followed by node hashes."""
+
+MMR_STORE_BATCH = 4096
+"""Count of Blocks added on load before their nodes are written, so a rebuild doesn't keep them all in memory."""
+
+
+class MountainRangeFile:
+    """Class reading and writing nodes of a Merkle Mountain Range.
+
+    Usage:
+        Nodes are kept in the order they were added, so changed Blocks
+        are written by truncating the file to the kept nodes and appending the rest.
+        Nodes left by an interrupted write are a valid range of fewer leaves,
+        the storage checks the last leaf against its Blocks on load.
+    """
+
+    def __init__(self, path: str, hash_size: int) -> None:
+        """Mountain Range File constructor.
+
+        Args:
+            path: Path of the Merkle Mountain Range file.
+            hash_size: Size of node hashes.
+        """
+
+        self.path = os.path.join(os.getcwd(), path)
+        self.hash_size = hash_size
+        self.count = 0
+        self.file = None
+
+    def open(self):
+        """Checks the header and opens the file for reading and writing nodes.
+        Nodes aren't read, count is taken from the file size. Damaged file is started over.
+        """
+
+        try:
+            with open(self.path, 'rb') as file:
+                header = file.read(MMR_HEADER.size)
+
+        except FileNotFoundError:
+            header = b''
+
+        if len(header) < MMR_HEADER.size or MMR_HEADER.unpack(header) != (MMR_MAGIC, self.hash_size):
+            with open(self.path, 'wb') as file:
+                file.write(MMR_HEADER.pack(MMR_MAGIC, self.hash_size))
+
+        self.file = open(self.path, 'r+b', buffering=0)
+        self.count = (self.file.seek(0, os.SEEK_END) - MMR_HEADER.size) // self.hash_size
+
+    def read(self, start: int, end: int) -> bytes:
+        """Reads node hashes from start to end one after another.
+
+        Args:
+            start: Index of the first read node.
+            end: Index after the last read node. Not greater than count of written nodes.
+        """
+
+        self.file.seek(MMR_HEADER.size + start * self.hash_size)
+        return self.file.read((end - start) * self.hash_size)
+
+    def write(self, start: int, nodes: bytes):
+        """Replaces nodes from start to the end.
+
+        Args:
+            start: Index of the first written node. Not greater than count of written nodes.
+            nodes: Node hashes.
+        """
+
+        self.file.truncate(MMR_HEADER.size + start * self.hash_size)
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(nodes)
+
+        self.count = start + len(nodes) // self.hash_size
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class StoredMountainNodes:
+    """Class keeping nodes of a Merkle Mountain Range in its file.
+
+    Usage:
+        Given to MerkleMountainRange in place of MountainNodes.
+        Nodes before base are read from the file on demand,
+        nodes added after them are kept in memory until store writes them.
+        Nodes in the file after base are left from dropped leaves and are replaced by the next store.
+
+        Not thread safe, the storage calls it under its Merkle Mountain Range lock.
+    """
+
+    def __init__(self, file: MountainRangeFile) -> None:
+        """Stored Mountain Nodes constructor.
+
+        Args:
+            file: Opened Merkle Mountain Range file.
+        """
+
+        self.file = file
+        self.hash_size = file.hash_size
+        self.base = file.count
+        self.tail = bytearray()
+
+    def __len__(self) -> int:
+        return self.base + len(self.tail) // self.hash_size
+
+    def get_range(self, start: int, end: int) -> bytes:
+        """Gets node hashes from start to end one after another."""
+
+        nodes = self.file.read(start, min(end, self.base)) if start < self.base else b''
+
+        if end > self.base:
+            nodes += self.tail[max(start - self.base, 0) * self.hash_size:(end - self.base) * self.hash_size]
+
+        return bytes(nodes)
+
+    def extend(self, nodes: bytes):
+        """Adds node hashes after the last one."""
+
+        self.tail += nodes
+
+    def truncate(self, count: int):
+        """Drops nodes after the count."""
+
+        if count <= self.base:
+            self.base = count
+            self.tail.clear()
+
+        else:
+            del self.tail[(count - self.base) * self.hash_size:]
+
+    def store(self, count: int):
+        """Writes nodes up to the count and drops them from memory.
+
+        Args:
+            count: Count of nodes to have in the file.
+        """
+
+        if count <= self.base:
+            return
+
+        size = (count - self.base) * self.hash_size
+        self.file.write(self.base, bytes(self.tail[:size]))
+
+        del self.tail[:size]
+        self.base = count
@@ -0,0 +1,103 @@
+"""Keep verified state of stored Blockchain"""
+
+
+import os
+import struct
+
+
+SNAPSHOT_INTERVAL = 1000
+"""Count of appended Blocks after which a new snapshot is written."""
+
+SNAPSHOT_MAGIC = b'BTPV'
+"""Marks a snapshot file."""
+
+SNAPSHOT_RECORD = struct.Struct('<4sQI')
+"""Snapshot record: magic, verified height, storage checksum. Followed by hash."""
+
+
+class Snapshot:
+    """Class representing a verified state of a storage.
+
+    Usage:
+        This class is present as a Structure.
+
+    Structure:
+        height: Number of the last verified Block.
+        hash: Hash of the last verified Block.
+        checksum: Checksum of the storage up to height given by the Driver.
+    """
+
+    def __init__(self, height: int, hash: bytes, checksum: int) -> None:
+        """Snapshot constructor.
+
+        Args:
+            height: Number of the last verified Block.
+            hash: Hash of the last verified Block.
+            checksum: Checksum of the storage up to height given by the Driver.
+        """
+
+        self.height = height
+        self.hash = hash
+        self.checksum = checksum
+
+
+class SnapshotFile:
+    """Class reading and writing the snapshot of a storage.
+
+    Snapshot is replaced atomically, so a crash leaves either
+    the old or the new one.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Snapshot File constructor.
+
+        Args:
+            path: Path of the snapshot file.
+        """
+
+        self.path = os.path.join(os.getcwd(), path)
+
+    def read(self) -> Snapshot:
+        """Reads the snapshot.
+
+        Returns:
+            Stored snapshot or None if it's missing or damaged.
+        """
+
+        try:
+            with open(self.path, 'rb') as file:
+                record = file.read()
+
+        except FileNotFoundError:
+            return None
+
+        if len(record) < SNAPSHOT_RECORD.size:
+            return None
+
+        magic, height, checksum = SNAPSHOT_RECORD.unpack(record[:SNAPSHOT_RECORD.size])
+
+        if magic != SNAPSHOT_MAGIC:
+            return None
+
+        return Snapshot(height, record[SNAPSHOT_RECORD.size:], checksum)
+
+    def write(self, snapshot: Snapshot):
+        """Replaces the snapshot.
+
+        Args:
+            snapshot: Snapshot to write.
+        """
+
+        temp_path = self.path + '.tmp'
+
+        with open(temp_path, 'wb') as file:
+            file.write(SNAPSHOT_RECORD.pack(SNAPSHOT_MAGIC, snapshot.height, snapshot.checksum))
+            file.write(snapshot.hash)
+
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """Removes the snapshot."""
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
\ No newline at end of file
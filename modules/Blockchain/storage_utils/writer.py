@@ -0,0 +1,240 @@
+"""Write stored Blocks in groups"""
+
+
+from typing import Callable, List, Tuple
+from ..blockchain import Block
+
+import atexit
+import threading
+import time
+
+
+DURABILITY_NONE = 'none'
+"""Storage files are never synced. Written data is left to the OS."""
+
+DURABILITY_BATCH = 'batch'
+"""Storage files are synced after every batch. Writers wait for it."""
+
+DURABILITY_INTERVAL = 'interval'
+"""Storage files are synced once in SYNC_INTERVAL."""
+
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_BATCH, DURABILITY_INTERVAL)
+"""Allowed durability levels."""
+
+COMMIT_WINDOW = 0.002
+"""Seconds to wait for more writes after the first one of a batch."""
+
+COMMIT_MAX_BATCH = 1024
+"""Count of Blocks after which a batch is written without waiting."""
+
+SYNC_INTERVAL = 1.0
+"""Seconds between syncs for DURABILITY_INTERVAL."""
+
+
+class GroupCommitWriter:
+    """Class writing Blocks to a storage in batches from a background thread.
+
+    Usage:
+        Every write is a range of Blocks starting from some number.
+        Ranges queued together are merged into one, so a batch
+        of appends costs one write and one header update of the storage.
+
+        submit returns a ticket. Use wait with it or flush to be sure
+        that Blocks are written and synced according to durability level.
+    """
+
+    def __init__(self, write: Callable[[int, List[Block]], None], sync: Callable[[], None],
+                 durability: str = DURABILITY_NONE, window: float = COMMIT_WINDOW,
+                 max_batch: int = COMMIT_MAX_BATCH, interval: float = SYNC_INTERVAL) -> None:
+        """Group Commit Writer constructor.
+
+        Args:
+            write: Function writing Blocks from given number to the end of storage.
+            sync: Function flushing storage files to the disk.
+            durability: One of DURABILITY_LEVELS.
+            window: Seconds to wait for more writes after the first one of a batch.
+            max_batch: Count of Blocks after which a batch is written without waiting.
+            interval: Seconds between syncs for DURABILITY_INTERVAL.
+
+        Raises:
+            ValueError: Unknown durability level.
+        """
+
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability '{durability}'! Use one of: {', '.join(DURABILITY_LEVELS)}")
+
+        self.write = write
+        self.sync = sync
+        self.durability = durability
+        self.window = window
+        self.max_batch = max_batch
+        self.interval = interval
+
+        self.queue = []
+        self.queued_blocks = 0
+        self.submitted = 0
+        self.committed = 0
+        self.error = None
+        self.closed = False
+        self.unsynced = False
+        self.last_sync = time.monotonic()
+
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+        atexit.register(self.close)
+
+    def submit(self, start: int, blocks: List[Block]) -> int:
+        """Queues Blocks to be written.
+
+        Args:
+            start: Number of the first Block.
+                Stored Blocks from this number are replaced.
+            blocks: Blocks to write. Blocks are immutable, so they are shared with Blockchain.
+
+        Returns:
+            Ticket for wait.
+
+        Raises:
+            Exception: The previous write failed.
+        """
+
+        with self.condition:
+            if self.error is not None:
+                raise self.error
+
+            self.queue.append((start, blocks))
+            self.queued_blocks += len(blocks)
+            self.submitted += 1
+
+            self.condition.notify_all()
+
+            return self.submitted
+
+    def wait(self, ticket: int):
+        """Waits until the write with ticket is done.
+
+        Raises:
+            Exception: The write failed.
+        """
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.committed >= ticket or self.error is not None)
+
+            if self.error is not None:
+                raise self.error
+
+    def flush(self):
+        """Waits until every queued write is done."""
+
+        self.wait(self.submitted)
+
+    def queued_start(self) -> int:
+        """Gives the number of the first Block queued writes replace.
+
+        Returns:
+            Number of the Block. None if nothing is queued.
+        """
+
+        with self.condition:
+            return min((start for start, _ in self.queue), default=None)
+
+    def mark_unsynced(self):
+        """Tells that storage files were written besides the writer.
+
+        They are synced with the next sync of the writer.
+        """
+
+        with self.condition:
+            self.unsynced = True
+
+    def close(self):
+        """Writes queued Blocks, syncs them and stops the writer thread."""
+
+        with self.condition:
+            if self.closed:
+                return
+
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+
+        if self.error is None and self.durability != DURABILITY_NONE and self.unsynced:
+            self.sync()
+
+    @staticmethod
+    def merge(writes: List[Tuple[int, List[Block]]]) -> Tuple[int, List[Block]]:
+        """Merges queued writes into one.
+
+        Later writes replace Blocks of earlier ones from their start.
+
+        Returns:
+            Start and Blocks of the merged write.
+        """
+
+        start, blocks = writes[0]
+        blocks = list(blocks)
+
+        for write_start, write_blocks in writes[1:]:
+            if write_start <= start:
+                start, blocks = write_start, list(write_blocks)
+
+            else:
+                del blocks[write_start - start:]
+                blocks.extend(write_blocks)
+
+        return start, blocks
+
+    def run(self):
+        """Writer thread loop."""
+
+        while True:
+            with self.condition:
+                timeout = self.interval if self.durability == DURABILITY_INTERVAL else None
+                self.condition.wait_for(lambda: self.queue or self.closed, timeout)
+
+                # Let more writes join the batch
+                deadline = time.monotonic() + self.window
+                while self.queue and not self.closed and self.queued_blocks < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+
+                    self.condition.wait(remaining)
+
+                writes = self.queue
+                ticket = self.submitted
+
+                self.queue = []
+                self.queued_blocks = 0
+
+            try:
+                if writes:
+                    self.write(*self.merge(writes))
+                    self.unsynced = True
+
+                now = time.monotonic()
+                if self.durability == DURABILITY_BATCH and self.unsynced:
+                    self.sync()
+                    self.unsynced = False
+
+                elif self.durability == DURABILITY_INTERVAL and self.unsynced and now - self.last_sync >= self.interval:
+                    self.sync()
+                    self.unsynced = False
+                    self.last_sync = now
+
+            except Exception as exc:
+                with self.condition:
+                    self.error = exc
+                    self.condition.notify_all()
+
+                return
+
+            with self.condition:
+                self.committed = ticket
+                self.condition.notify_all()
+
+                if self.closed and not self.queue:
+                    return
\ No newline at end of file
@@ -1,38 +1,189 @@
+import functools
 import hashlib
+import time
+from typing import Dict, Iterable
 from ...blockchain import Block, HashManager
 
 
-HASH_ALGORITHM = hashlib.sha1
-"""Represents the Constructor for Hash algorithm."""
+HASH_ALGORITHMS = {
+    'sha1': 1,
+    'sha256': 2,
+    'sha512_256': 3,
+    'blake2b': 4,
+    'blake2s': 5,
+    'sha3_256': 6,
+}
+"""Ids of supported Hash algorithms by name.
 
-HASH_SIZE = HASH_ALGORITHM().digest_size
-"""Size of Hash algorithm"""
+Ids are kept in storages and sent to peers, so they never change.
+"""
+
+HASH_CONSTRUCTORS = {
+    'sha1': hashlib.sha1,
+    'sha256': hashlib.sha256,
+    'sha512_256': functools.partial(hashlib.new, 'sha512_256'),
+    'blake2b': functools.partial(hashlib.blake2b, digest_size=32),
+    'blake2s': hashlib.blake2s,
+    'sha3_256': hashlib.sha3_256,
+}
+"""Constructors of supported Hash algorithms by name."""
+
+SECURE_HASH_ALGORITHMS = ('sha256', 'sha512_256', 'blake2b', 'blake2s', 'sha3_256')
+"""Algorithms without known collisions. Candidates of the benchmark."""
+
+DEFAULT_HASH_ALGORITHM = 'sha1'
+"""Algorithm of storages made before algorithms were recorded and of new Blockchains by default."""
+
+HASH_NUM_BYTES = 2
+"""Size of the Block number in hashed data below WIDE_HASH_HEIGHT."""
+
+WIDE_HASH_NUM_BYTES = 8
+"""Size of the Block number in hashed data from WIDE_HASH_HEIGHT on."""
+
+WIDE_HASH_HEIGHT = 1 << 8 * HASH_NUM_BYTES
+"""First Block number hashed with a wide number.
+
+Blocks below keep the hashes they were made with, so existing chains grow past it without rehashing.
+"""
+
+HASH_ALGORITHM_AUTO = 'auto'
+"""Asks for the fastest secure algorithm of the host."""
+
+HASH_BENCHMARK_SIZE = 256
+"""Size in bytes of data hashed by the benchmark. About a small Block."""
+
+HASH_BENCHMARK_ROUNDS = 2000
+"""Count of hashes the benchmark times per algorithm and repeat."""
+
+
+class InvalidHashAlgorithm(Exception):
+    """Thrown when a storage or a peer uses an unknown or another Hash algorithm."""
+
+
+def get_hash_algorithm(algorithm_id: int) -> str:
+    """Gets the name of a Hash algorithm by its id.
+
+    Raises:
+        InvalidHashAlgorithm: Unknown algorithm id.
+    """
+
+    for name, known_id in HASH_ALGORITHMS.items():
+        if known_id == algorithm_id:
+            return name
+
+    raise InvalidHashAlgorithm(f'Unknown hash algorithm id {algorithm_id}!')
+
+
+def is_hash_available(algorithm: str) -> bool:
+    """Checks if hashlib of the host provides the algorithm."""
+
+    try:
+        HASH_CONSTRUCTORS[algorithm]()
+
+    except ValueError:
+        return False
+
+    return True
+
+
+def benchmark_hash_algorithms(algorithms: Iterable[str] = SECURE_HASH_ALGORITHMS, size: int = HASH_BENCHMARK_SIZE,
+                              rounds: int = HASH_BENCHMARK_ROUNDS, repeats: int = 3) -> Dict[str, float]:
+    """Times Hash algorithms on this host.
+
+    Args:
+        algorithms: Names of algorithms to time. Unavailable ones are skipped.
+        size: Size in bytes of hashed data.
+        rounds: Count of hashes per repeat.
+        repeats: Count of repeats, the best one is taken.
+
+    Returns:
+        Seconds per hash of every available algorithm.
+    """
+
+    data = bytes(size)
+    timings = {}
+
+    for algorithm in algorithms:
+        if not is_hash_available(algorithm):
+            continue
+
+        constructor = HASH_CONSTRUCTORS[algorithm]
+        best = None
+
+        for _ in range(repeats):
+            start = time.perf_counter()
+
+            for _ in range(rounds):
+                constructor(data).digest()
+
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        timings[algorithm] = best / rounds
+
+    return timings
+
+
+def fastest_hash_algorithm() -> str:
+    """Picks the fastest secure Hash algorithm of this host."""
+
+    timings = benchmark_hash_algorithms()
+    return min(timings, key=timings.get)
 
 
 class HashManagerDriver(HashManager):
     """Concrete class for Blockchain Hash Manager abstract class.
 
     Implements the Driver for using hashlib Hash Algorithms.
-    
+
     Implements abstract HashManager class.
     """
 
+    def __init__(self, algorithm: str = DEFAULT_HASH_ALGORITHM) -> None:
+        """Hash Manager Driver constructor.
+
+        Args:
+            algorithm: Name of the algorithm from HASH_ALGORITHMS.
+
+        Raises:
+            ValueError: Unknown algorithm or hashlib of the host doesn't provide it.
+        """
+
+        if algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unknown hash algorithm '{algorithm}'! Use one of: {', '.join(HASH_ALGORITHMS)}")
+
+        if not is_hash_available(algorithm):
+            raise ValueError(f"Hash algorithm '{algorithm}' is not available on this host!")
+
+        self.algorithm = algorithm
+        self.constructor = HASH_CONSTRUCTORS[algorithm]
+        self.hash_size = self.constructor().digest_size
+
+    def __reduce__(self) -> tuple:
+        # Constructors are not always picklable, the name is enough for workers
+        return (HashManagerDriver, (self.algorithm,))
+
     def hash(self, data: bytes) -> bytes:
-        hash = HASH_ALGORITHM(data)
+        hash = self.constructor(data)
         return hash.digest()
 
 
     def get_hash_len(self) -> int:
-        return HASH_SIZE
+        return self.hash_size
+
+
+    def get_algorithm_id(self) -> int:
+        return HASH_ALGORITHMS[self.algorithm]
 
 
     def is_valid_hash(self, hash: bytes) -> bool:
-        return len(hash) == HASH_SIZE
+        return len(hash) == self.hash_size
 
 
     def hash_block(self, block: Block) -> bytes:
-        hash = HASH_ALGORITHM(block.prev_hash + int.to_bytes(block.num, 2, 'little') + block.data).digest()
+        num_bytes = HASH_NUM_BYTES if block.num < WIDE_HASH_HEIGHT else WIDE_HASH_NUM_BYTES
+        hash = self.constructor(block.prev_hash + int.to_bytes(block.num, num_bytes, 'little') + block.data).digest()
         return hash
 
     def reserved_prev_hash(self) -> bytes:
-        return b'\x00' * HASH_SIZE
\ No newline at end of file
+        return b'\x00' * self.hash_size
\ No newline at end of file
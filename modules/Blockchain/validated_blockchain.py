@@ -1,5 +1,7 @@
-from typing import List
-from .blockchain import Block, Blockchain, HashManager
+from typing import Iterator, List
+from .blockchain import Block, BlockBuilder, BlockTable, Blockchain, HashIndex, HashManager, InvalidLink
+
+import contextlib
 
 
 class ValidatedBlockchain(Blockchain):
@@ -9,13 +11,106 @@ class ValidatedBlockchain(Blockchain):
         Each operation with this class is validated to prevent invalid Blockchain.
         
         Could be used as Blockchain instance.
+
+        In lazy rehash mode and inside a transaction edits only mark
+        the first changed Block. Blockchain is recalculated once from it
+        when the header, a Block or a hash lookup is asked for.
     """
 
-    def recalculate_blockchain(self, start: int):
+    # Header
+    @property
+    def hash(self) -> bytes:
+        self.refresh()
+        return self.header_hash
+
+    @hash.setter
+    def hash(self, hash: bytes):
+        self.header_hash = hash
+
+    @property
+    def num(self) -> int:
+        self.refresh()
+        return self.header_num
+
+    @num.setter
+    def num(self, num: int):
+        self.header_num = num
+
+    # Deferred recalculation
+    def is_deferred(self) -> bool:
+        """Checks if edits only mark changed Blocks."""
+
+        return self.lazy_rehash or self.transactions > 0
+
+    def mark_dirty(self, num: int):
+        """Marks Blocks from num to be recalculated."""
+
+        self.dirty_from = num if self.dirty_from is None else min(self.dirty_from, num)
+
+    def refresh(self):
+        """Recalculates Blocks marked by deferred edits."""
+
+        if self.dirty_from is not None:
+            start, self.dirty_from = self.dirty_from, None
+            self.recalculate_tail(start)
+
+    def commit(self):
+        """Applies deferred edits."""
+
+        self.refresh()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Defers recalculation of edits made inside until the end.
+
+        Transactions could be nested, edits are committed by the outer one.
+        Edits are not rolled back on error, they are committed as well.
+
+        Yields:
+            The Blockchain itself.
+        """
+
+        self.transactions += 1
+
+        try:
+            yield self
+
+        finally:
+            self.transactions -= 1
+
+            if self.transactions == 0:
+                self.commit()
+
+    def update_blocks(self, num: int):
+        """Recalculates Blocks from num now or marks them if edits are deferred."""
+
+        self.mark_dirty(num)
+
+        if not self.is_deferred():
+            self.refresh()
+
+    def recalculate_tail(self, num: int):
+        """Recalculates Blocks from num, or only the header if there are none."""
+
+        if num <= len(self):
+            self.recalculate_blockchain(num)
+
+        elif len(self) > 0:
+            self.hash = self.blocks[-1].hash
+            self.num = self.blocks[-1].num
+
+        else:
+            self.hash = self.hash_manager.reserved_prev_hash()
+            self.num = 0
+
+    def recalculate_blockchain(self, start: int) -> int:
         """Recalculates blocks in a Blockchain from start to end.
         
         Args:
             start: Block number to start with.
+
+        Returns:
+            Number of the first Block that has changed. None if nothing changed.
         """
 
         index = start - 1
@@ -27,36 +122,70 @@ class ValidatedBlockchain(Blockchain):
         else:
             prev_block = self.blocks[index - 1]
 
+        changed = None
 
         for i in range(index, len(self)):
             block = self.blocks[i]
-            block.link_prev_block(prev_block)
-            block.set_num(i + 1)
-            block.hash = self.hash_manager.hash_block(block)
 
+            builder = BlockBuilder.from_block(block)
+            builder.link_prev_block(prev_block)
+            builder.set_num(i + 1)
+            builder.set_hash(self.hash_manager.hash_block(builder))
+
+            # Blocks are immutable, so only changed ones are replaced
+            if (block.hash, block.prev_hash, block.num) != (builder.hash, builder.prev_hash, builder.num):
+                block = builder.build()
+                self.blocks[i] = block
+
+                if changed is None:
+                    changed = i + 1
+
+            self.index_block(block)
             prev_block = block
 
 
         self.hash = self.blocks[-1].hash
         self.num = self.blocks[-1].num
 
-    def __init__(self, hash_manager: HashManager, blocks: List[Block] = []) -> None:
+        return changed
+
+    def __init__(self, hash_manager: HashManager, blocks: List[Block] = None, verified: int = 0, hash_index: HashIndex = None,
+                 lazy_rehash: bool = False) -> None:
         """Validated Blockchain constructor.
         
         Args:
             blocks: List of Blocks to store. Blocks would be recalculated. Could be empty.
+                Packed into BlockTable if it's a list.
+            verified: Count of the first Blocks known to be valid.
+                They are not recalculated and not even read,
+                so blocks could be a lazy list.
+            hash_index: Known numbers of Blocks by their hashes.
+                Recalculated Blocks are added to it.
+            lazy_rehash: Recalculate edited Blocks only when they are needed.
         """
 
         self.hash_manager = hash_manager
+        self.lazy_rehash = lazy_rehash
+        self.transactions = 0
+        self.dirty_from = None
+        self.hash_index = hash_index if hash_index is not None else HashIndex()
+
+        # Lists are packed into the table, other lists of Blocks are kept as they are
+        if blocks is None or isinstance(blocks, list):
+            blocks = BlockTable(blocks or ())
+
+        self.blocks = blocks
 
-        if len(blocks) > 0:
-            self.blocks = blocks
-            self.recalculate_blockchain(1)
+        if verified < len(self.blocks):
+            self.recalculate_blockchain(verified + 1)
+
+        elif len(self.blocks) > 0:
+            self.hash = self.blocks[-1].hash
+            self.num = self.blocks[-1].num
 
         else:
             self.hash = self.hash_manager.reserved_prev_hash()
             self.num = 0
-            self.blocks = []
 
     def get_block(self, num: int) -> Block:
         """Get a Block in the Blockchain.
@@ -71,8 +200,44 @@ class ValidatedBlockchain(Blockchain):
             InvalidBlockNumber: Block number is out of bounds!
         """
 
+        self.refresh()
+
         return super().get_block(num - 1)
 
+    def get_block_by_hash(self, hash: bytes) -> Block:
+        """Finds a Block in the Blockchain by its hash.
+
+        Args:
+            hash: Hash of the Block.
+
+        Returns:
+            Block with the hash. None if there's no such Block.
+        """
+
+        self.refresh()
+
+        return super().get_block_by_hash(hash)
+
+    def iter_blocks(self, start: int = 1, stop: int = None, step: int = 1, reverse: bool = False) -> Iterator[Block]:
+        """Iterates over Blocks in the Blockchain.
+
+        Bounds are taken at the call, so Blocks appended while iterating are not yielded.
+        Blocks are immutable and shared, BlockTable builds them from its columns.
+
+        Args:
+            start: Number of the first Block.
+            stop: Number to stop before. None for the end of Blockchain.
+            step: Step between numbers.
+            reverse: Walk the same numbers from the last one.
+
+        Returns:
+            Iterator over Blocks.
+        """
+
+        self.refresh()
+
+        return super().iter_blocks(max(start - 1, 0), None if stop is None else max(stop - 1, 0), step, reverse)
+
     def set_block(self, block: Block, num: int):
         """Set a Block in the Blockchain.
         
@@ -85,7 +250,7 @@ class ValidatedBlockchain(Blockchain):
         """
 
         super().set_block(block, num - 1)
-        self.recalculate_blockchain(num)
+        self.update_blocks(num)
 
     def append_block(self, block: Block):
         """Appends a block to the end of Blockchain.
@@ -95,7 +260,39 @@ class ValidatedBlockchain(Blockchain):
         """
 
         super().append_block(block)
-        self.recalculate_blockchain(len(self))
+        self.update_blocks(len(self))
+
+    def append_blocks(self, blocks: List[Block], verified: bool = False):
+        """Appends several blocks to the end of Blockchain.
+
+        Blockchain is recalculated once for all of them.
+
+        Args:
+            blocks: Blocks to append in order.
+            verified: Blocks are already validated and linked to each other,
+                so they are appended as they are without rehashing.
+
+        Raises:
+            InvalidLink: Verified Blocks don't follow the last Block.
+        """
+
+        if not blocks:
+            return
+
+        start = len(self) + 1
+
+        if verified and (blocks[0].num != start or blocks[0].prev_hash != self.hash):
+            raise InvalidLink('Verified blocks don\'t follow the last block!')
+
+        for block in blocks:
+            super().append_block(block)
+
+        if verified:
+            self.hash = blocks[-1].hash
+            self.num = blocks[-1].num
+
+        else:
+            self.update_blocks(start)
 
     def remove_block(self, num: int):
         """Removes a block from the Blockchain.
@@ -108,13 +305,28 @@ class ValidatedBlockchain(Blockchain):
         """
 
         super().remove_block(num - 1)
-        
-        if num <= len(self):
-            self.recalculate_blockchain(num)
+        self.update_blocks(num)
+
+    def replace_blocks(self, num: int, blocks: List[Block]):
+        """Replaces Blocks from num to the end of Blockchain.
+
+        Blockchain is recalculated once from num.
+
+        Args:
+            num: Number of the first replaced Block. Could be the number after the last one.
+            blocks: New Blocks following the kept ones.
+
+        Raises:
+            InvalidBlockNumber: Block number is out of bounds!
+        """
+
+        super().replace_blocks(num - 1, blocks)
+        self.update_blocks(num)
 
     def clear(self):
         """Clears Blockchain."""
 
         super().clear()
+        self.dirty_from = None
         self.hash = self.hash_manager.reserved_prev_hash()
         self.num = 0
\ No newline at end of file
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from .blockchain import Block, HashManager, InvalidHash, InvalidBlockNumber
+from .validator import BlockchainValidator
+
+import threading
+
+
+VALIDATION_CACHE_SIZE = 4096
+"""Count of recently validated Blocks remembered."""
+
+REJECTION_CACHE_SIZE = 1024
+"""Count of recently rejected Blocks remembered with their reason."""
+
+
+class ValidationCache:
+    """Bounded LRU cache of validation results.
+
+    Usage:
+        Results are kept by the claimed hash of a Block, so a lookup doesn't hash anything.
+        A hit also compares the other fields, so a Block can't take over
+        the result of another one claiming the same hash.
+
+        Safe to use from several threads.
+    """
+
+    def __init__(self, size: int) -> None:
+        """Validation Cache constructor.
+
+        Args:
+            size: Max count of remembered Blocks. The least recently used ones are dropped.
+        """
+
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, block: Block):
+        """Gets the result kept for the Block.
+
+        Returns:
+            Kept result. None if the Block is not remembered.
+        """
+
+        with self.lock:
+            entry = self.entries.get(block.hash)
+
+            if entry is None:
+                return None
+
+            cached, result = entry
+
+            if cached is not block and (cached.num != block.num or cached.prev_hash != block.prev_hash or cached.data != block.data):
+                return None
+
+            self.entries.move_to_end(block.hash)
+            return result
+
+    def put(self, block: Block, result=True):
+        """Remembers the result for the Block, dropping the least recently used one if full."""
+
+        with self.lock:
+            self.entries[block.hash] = (block, result)
+            self.entries.move_to_end(block.hash)
+
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CachedBlockchainValidator(BlockchainValidator):
+    """Blockchain Validator remembering recent results of Block validation.
+
+    Usage:
+        A Block delivered again costs a lookup instead of hashing.
+        Rejected Blocks are remembered with their reason, so floods of the same
+        invalid Block are rejected without hashing.
+
+        Only checks of the Block itself are cached.
+        Links depend on the Blockchain at the moment, so they are always checked.
+    """
+
+    def __init__(self, hash_manager: HashManager, cache_size: int = VALIDATION_CACHE_SIZE,
+                 rejection_cache_size: int = REJECTION_CACHE_SIZE) -> None:
+        """Cached Blockchain Validator constructor.
+
+        Args:
+            hash_manager: Hash Manager to use for validation.
+            cache_size: Count of remembered valid Blocks.
+            rejection_cache_size: Count of remembered rejected Blocks.
+        """
+
+        super().__init__(hash_manager)
+
+        self.valid = ValidationCache(cache_size)
+        self.rejected = ValidationCache(rejection_cache_size)
+
+    def validate_block(self, block: Block):
+        """Function validating a block using remembered results.
+
+        Raises:
+            InvalidBlockNumber: Thrown when a block has an invalid number.
+            InvalidHash: Thrown when a hash of a block doesn't match a hash in field
+                or if some of hashes is invalid.
+        """
+
+        if self.valid.get(block):
+            return
+
+        rejection = self.rejected.get(block)
+
+        # New exception every time, so tracebacks don't pile up
+        if rejection is not None:
+            error, args = rejection
+            raise error(*args)
+
+        try:
+            super().validate_block(block)
+
+        except (InvalidHash, InvalidBlockNumber) as exc:
+            self.rejected.put(block, (type(exc), exc.args))
+            raise
+
+        self.valid.put(block)
@@ -1,10 +1,12 @@
-from typing import List
+from typing import Iterable, List, Tuple
 
-from ..utils.Drivers.hash import HashManagerDriver
+from ..utils.Drivers.hash import HashManagerDriver, DEFAULT_HASH_ALGORITHM
 from ..validated_blockchain import Block, ValidatedBlockchain, Blockchain
 from ..server_blockchain import ServerBlockchain
+from ..block_tree import BlockTree
+from ..validation_cache import CachedBlockchainValidator
 
-from ..validator import BlockchainValidator
+from ..validator import BlockchainValidator, ParallelBlockchainValidator, VALIDATION_EXECUTOR_PROCESS
 
 
 class ValidatedBlockchainFactory:
@@ -13,18 +15,19 @@ class ValidatedBlockchainFactory:
     def __init__(self) -> None:
         """Factory constructor."""
 
-    def create(self, blocks: List[Block]) -> Blockchain:
+    def create(self, blocks: List[Block], hash_algorithm: str = DEFAULT_HASH_ALGORITHM) -> Blockchain:
         """Creates Validated Blockchain.
         
         Args:
             blocks: Blocks for Validated Blockchain.
+            hash_algorithm: Name of the Hash algorithm from hash HASH_ALGORITHMS.
             
         Returns:
             Constructed Validated Blockchain.
         """
 
         # Dependencies
-        hash_manager = HashManagerDriver()
+        hash_manager = HashManagerDriver(hash_algorithm)
 
         return ValidatedBlockchain(hash_manager, blocks)
 
@@ -35,17 +38,46 @@ class ValidatorFactory:
     def __init__(self) -> None:
         """Factory constructor."""
 
-    def create(self) -> BlockchainValidator:
+    def create(self, hash_algorithm: str = DEFAULT_HASH_ALGORITHM, checkpoints: Iterable[Tuple[int, bytes]] = ()) -> BlockchainValidator:
         """Creates Blockchain Validator.
+
+        Args:
+            hash_algorithm: Name of the Hash algorithm from hash HASH_ALGORITHMS.
+            checkpoints: Trusted numbers and hashes of Blocks.
         
         Returns:
             Constructed Blockchain Validator.
         """
 
         # Dependencies
-        hash_manager = HashManagerDriver()
+        hash_manager = HashManagerDriver(hash_algorithm)
+
+        return BlockchainValidator(hash_manager, checkpoints)
+
+
+class ParallelValidatorFactory:
+    """Factory for Parallel Blockchain Validator."""
+
+    def __init__(self) -> None:
+        """Factory constructor."""
+
+    def create(self, workers: int = None, executor: str = VALIDATION_EXECUTOR_PROCESS,
+               hash_algorithm: str = DEFAULT_HASH_ALGORITHM) -> ParallelBlockchainValidator:
+        """Creates Parallel Blockchain Validator.
+
+        Args:
+            workers: Count of workers. None for the count of cores.
+            executor: Name of the executor from validator VALIDATION_EXECUTORS.
+            hash_algorithm: Name of the Hash algorithm from hash HASH_ALGORITHMS.
+
+        Returns:
+            Constructed Parallel Blockchain Validator.
+        """
+
+        # Dependencies
+        hash_manager = HashManagerDriver(hash_algorithm)
 
-        return BlockchainValidator(hash_manager)
+        return ParallelBlockchainValidator(hash_manager, workers, executor)
 
 
 class ServerBlockchainFactory:
@@ -54,13 +86,42 @@ class ServerBlockchainFactory:
     def __init__(self) -> None:
         """Factory constructor."""
 
-    def create(self, header: Blockchain) -> ServerBlockchain:
+    def create(self, header: Blockchain, hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+               checkpoints: Iterable[Tuple[int, bytes]] = ()) -> ServerBlockchain:
         """Creates Server Blockchain.
+
+        Args:
+            header: Header of the Blockchain of the server.
+            hash_algorithm: Name of the Hash algorithm of the server.
+            checkpoints: Trusted numbers and hashes of Blocks.
+                Downloaded Blocks up to a matching one are not hashed.
         
         Returns:
             Constructed Server Blockchain.
         """
 
-        validator = ValidatorFactory().create()
+        validator = ValidatorFactory().create(hash_algorithm, checkpoints)
+
+        return ServerBlockchain(validator, header)
+
+class BlockTreeFactory:
+    """Factory for Block Tree."""
+
+    def __init__(self) -> None:
+        """Factory constructor."""
+
+    def create(self, chain: ValidatedBlockchain) -> BlockTree:
+        """Creates Block Tree over the best chain.
+
+        Args:
+            chain: The best chain.
+
+        Returns:
+            Constructed Block Tree.
+        """
+
+        # Received Blocks are hashed like the chain's own.
+        # The same Block comes from several peers, so results are remembered
+        validator = CachedBlockchainValidator(chain.hash_manager)
 
-        return ServerBlockchain(validator, header)
\ No newline at end of file
+        return BlockTree(validator, chain)
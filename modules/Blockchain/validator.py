@@ -1,21 +1,71 @@
-from typing import Union
-from .blockchain import Blockchain, Block, HashManager
+from typing import Iterable, Iterator, List, Tuple, Union
+from .blockchain import Blockchain, Block, BlockTable, HashManager
 
 # Import Raises
 from .blockchain import InvalidHash, InvalidBlockOrder, InvalidBlockchainNumber, InvalidLink, InvalidBlockNumber
 
+import concurrent.futures
+import itertools
+import os
+
+
+VALIDATION_CHUNK_SIZE = 4096
+"""Count of Blocks validated by a worker at once."""
+
+VALIDATION_EXECUTOR_PROCESS = 'process'
+"""Validate chunks in worker processes. Scales with cores for any Block size."""
+
+VALIDATION_EXECUTOR_THREAD = 'thread'
+"""Validate chunks in threads. Scales only with large Blocks, since hashlib releases the GIL for them."""
+
+VALIDATION_EXECUTORS = {
+    VALIDATION_EXECUTOR_PROCESS: concurrent.futures.ProcessPoolExecutor,
+    VALIDATION_EXECUTOR_THREAD: concurrent.futures.ThreadPoolExecutor,
+}
+"""Executors of the parallel validator by name."""
+
 
 class BlockchainValidator:
     """Class checking a Blockchain or a Block for Validity"""
 
-    def __init__(self, hash_manager: HashManager) -> None:
+    def __init__(self, hash_manager: HashManager, checkpoints: Iterable[Tuple[int, bytes]] = (), full_rehash: bool = False) -> None:
         """Blockchain Validator constructor.
         
         Args:
             hash_manager: Hash Manager to use for validation
+            checkpoints: Trusted numbers and hashes of Blocks.
+                The highest matching one is rehashed, Blocks below it are only checked for order and links.
+            full_rehash: Rehash Blocks below checkpoints too.
         """
 
         self.hash_manager = hash_manager
+        self.checkpoints = dict(checkpoints)
+        self.full_rehash = full_rehash
+
+    def is_checkpoint(self, block: Block) -> bool:
+        """Checks if the Block claims the hash of a trusted checkpoint.
+
+        The claim is trusted only after the Block is validated,
+        then Blocks below it are trusted by their links to it.
+        """
+
+        return not self.full_rehash and self.checkpoints.get(block.num) == block.hash
+
+    def find_anchor(self, blocks: List[Block]) -> int:
+        """Finds the highest checkpoint the Blocks match.
+
+        Args:
+            blocks: Blocks from the first one.
+
+        Returns:
+            Number of the checkpoint Block. Zero if no checkpoint matches.
+        """
+
+        for num in sorted(self.checkpoints, reverse=True):
+            if 0 < num <= len(blocks) and self.is_checkpoint(blocks[num - 1]):
+                return num
+
+        return 0
 
     def validate_link(self, block: Block, pointer: Union[Blockchain, Block]):
         """Validates a reference to block.
@@ -77,19 +127,12 @@ class BlockchainValidator:
             if not self.hash_manager.is_valid_hash(block.prev_hash):
                 raise InvalidHash('prev_field hash format is not appropriated for the current algorithm!')
 
-    def validate_blockchain(self, chain: Blockchain):
-        """Function validating a blockchain.
-        
-        If blockchain hasn't passed the validation, function will throw an exception.
-        
-        Args:
-            chain: Blockchain to validate.
-            
+    def validate_header(self, chain: Blockchain):
+        """Validates the header of a Blockchain against its last Block.
+
         Raises:
             InvalidHash: Hash of a Blockchain doesn't match a hash of the last Block.
             InvalidBlockchainNumber: Number of a Blockchain doesn't match a number of the last Block.
-            InvalidBlockOrder: List with Blocks is not ascending ordered or with gaps.
-            InvalidLink: When one of blocks references invalid previous Block.
         """
 
         # Handle empty Blockchain
@@ -111,6 +154,34 @@ class BlockchainValidator:
         if chain.num != last_block.num:
             raise InvalidBlockchainNumber("Number of a Blockchain doesn't match a number of the last Block.")
 
+    def validate_blockchain(self, chain: Blockchain):
+        """Function validating a blockchain.
+        
+        If blockchain hasn't passed the validation, function will throw an exception.
+        
+        Args:
+            chain: Blockchain to validate.
+            
+        Raises:
+            InvalidHash: Hash of a Blockchain doesn't match a hash of the last Block.
+            InvalidBlockchainNumber: Number of a Blockchain doesn't match a number of the last Block.
+            InvalidBlockOrder: List with Blocks is not ascending ordered or with gaps.
+            InvalidLink: When one of blocks references invalid previous Block.
+        """
+
+        self.validate_header(chain)
+
+        # Handle empty Blockchain
+        if len(chain.blocks) == 0:
+            return
+
+        # Blocks below the checkpoint are trusted by their links
+        anchor = self.find_anchor(chain.blocks)
+
+        if isinstance(chain.blocks, BlockTable):
+            self.validate_table(chain.blocks, anchor)
+            return
+
         # Check the chain for blocks order and links
         prev_hash = None
         try:
@@ -128,8 +199,9 @@ class BlockchainValidator:
                 elif prev_hash != block.hash:
                     raise InvalidLink(f"Found invalid pointer from block {block.num + 1} to block {block.num}!")
 
-                # Check the block
-                self.validate_block(block)
+                # Check the block, ones below the checkpoint are bound to it by links
+                if n >= anchor:
+                    self.validate_block(block)
 
                 # Save hash for links validation
                 prev_hash = block.prev_hash
@@ -142,4 +214,187 @@ class BlockchainValidator:
 
         # Check the first block prev_hash field
         if chain.blocks[0].prev_hash != self.hash_manager.reserved_prev_hash():
-            raise InvalidLink("Invalid Previous Hash value of the First block!")
\ No newline at end of file
+            raise InvalidLink("Invalid Previous Hash value of the First block!")
+
+    def validate_table(self, table: BlockTable, anchor: int = 0):
+        """Validates Blocks kept in columns.
+
+        Order and links are checked over whole columns first,
+        so only hashing of Blocks is left per Block.
+
+        Args:
+            table: Blocks to validate.
+            anchor: Number of the trusted checkpoint. Blocks below it are not rehashed.
+
+        Raises:
+            InvalidBlockOrder: List with Blocks is not ascending ordered or with gaps.
+            InvalidLink: When one of blocks references invalid previous Block.
+            InvalidHash: One of blocks has invalid hash.
+        """
+
+        if table.find_misnumbered(1) is not None:
+            raise InvalidBlockOrder("List of blocks is not ordered!")
+
+        index = table.find_broken_link()
+
+        if index is not None:
+            raise InvalidLink(f"Found invalid pointer from block {index + 1} to block {index}!")
+
+        for block in table.iter_range(range(max(anchor - 1, 0), len(table))):
+            self.validate_block(block)
+
+        if table[0].prev_hash != self.hash_manager.reserved_prev_hash():
+            raise InvalidLink("Invalid Previous Hash value of the First block!")
+
+
+def audit_chunk(hash_manager: HashManager, start: int, blocks: List[Block]) -> List[Tuple[int, Exception]]:
+    """Validates a chunk of Blocks and links inside it.
+
+    Runs in a worker of ParallelBlockchainValidator.
+
+    Args:
+        hash_manager: Hash Manager of the Blockchain.
+        start: Expected number of the first Block.
+        blocks: Blocks in order.
+
+    Returns:
+        Number and the first error of every invalid Block.
+    """
+
+    validator = BlockchainValidator(hash_manager)
+    errors = []
+    prev_block = None
+
+    for num, block in enumerate(blocks, start):
+        try:
+            if block.num != num:
+                raise InvalidBlockOrder("List of blocks is not ordered!")
+
+            validator.validate_block(block)
+
+            if prev_block is not None and prev_block.hash != block.prev_hash:
+                raise InvalidLink(f"Found invalid pointer from block {num} to block {num - 1}!")
+
+        except (InvalidBlockOrder, InvalidBlockNumber, InvalidLink, InvalidHash) as exc:
+            errors.append((num, exc))
+
+        prev_block = block
+
+    return errors
+
+
+class ParallelBlockchainValidator(BlockchainValidator):
+    """Blockchain Validator sharding the chain across workers.
+
+    Usage:
+        Hash of a Block depends only on its own fields, so Blocks are
+        validated in chunks by a pool of workers. Links between chunks are
+        checked afterwards, so every error of the sequential walk is found.
+
+        Blocks are streamed from the Blockchain and only a few chunks
+        per worker are in flight, so lazily loaded storages are validated with bounded memory.
+
+        validate_blockchain raises the error of the lowest invalid Block.
+        audit_blockchain reports every invalid Block instead.
+    """
+
+    def __init__(self, hash_manager: HashManager, workers: int = None, executor: str = VALIDATION_EXECUTOR_PROCESS,
+                 chunk_size: int = VALIDATION_CHUNK_SIZE) -> None:
+        """Parallel Blockchain Validator constructor.
+
+        Args:
+            hash_manager: Hash Manager to use for validation.
+            workers: Count of workers. None for the count of cores.
+            executor: Name of the executor from VALIDATION_EXECUTORS.
+            chunk_size: Count of Blocks validated by a worker at once.
+
+        Raises:
+            ValueError: Unknown executor.
+        """
+
+        if executor not in VALIDATION_EXECUTORS:
+            raise ValueError(f"Unknown validation executor '{executor}'! Use one of: {', '.join(VALIDATION_EXECUTORS)}")
+
+        super().__init__(hash_manager)
+
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.chunk_size = chunk_size
+
+    def validate_blockchain(self, chain: Blockchain):
+        """Function validating a blockchain in parallel.
+
+        If blockchain hasn't passed the validation, function will throw an exception.
+
+        Raises:
+            InvalidHash: Hash of a Blockchain doesn't match a hash of the last Block.
+            InvalidBlockchainNumber: Number of a Blockchain doesn't match a number of the last Block.
+            InvalidBlockOrder: List with Blocks is not ascending ordered or with gaps.
+            InvalidLink: When one of blocks references invalid previous Block.
+        """
+
+        errors = self.audit_blockchain(chain)
+
+        if errors:
+            raise errors[0][1]
+
+    def audit_blockchain(self, chain: Blockchain) -> List[Tuple[int, Exception]]:
+        """Validates the whole Blockchain collecting every error.
+
+        Args:
+            chain: Blockchain to validate.
+
+        Returns:
+            Number and the first error of every invalid Block ordered by number.
+            Errors of the header are reported with the number of the Blockchain.
+        """
+
+        errors = []
+
+        try:
+            self.validate_header(chain)
+
+        except (InvalidHash, InvalidBlockchainNumber) as exc:
+            errors.append((chain.num, exc))
+
+        # Hashes are checked by chunks, links between them are checked here
+        prev_block = None
+
+        for start, blocks, chunk_errors in self.audit_chunks(chain.iter_blocks()):
+            if prev_block is not None and prev_block.hash != blocks[0].prev_hash:
+                if not chunk_errors or chunk_errors[0][0] != start:
+                    chunk_errors.insert(0, (start, InvalidLink(f"Found invalid pointer from block {start} to block {start - 1}!")))
+
+            errors.extend(chunk_errors)
+            prev_block = blocks[-1]
+
+        errors.sort(key=lambda error: error[0])
+
+        return errors
+
+    def audit_chunks(self, blocks: Iterator[Block]) -> Iterator[Tuple[int, List[Block], List[Tuple[int, Exception]]]]:
+        """Validates chunks of Blocks in workers.
+
+        Yields:
+            Number of the first Block, Blocks and errors of every chunk in order.
+        """
+
+        in_flight = []
+        start = 1
+
+        with VALIDATION_EXECUTORS[self.executor](self.workers) as executor:
+            while True:
+                chunk = list(itertools.islice(blocks, self.chunk_size))
+
+                if chunk:
+                    future = executor.submit(audit_chunk, self.hash_manager, start, chunk)
+                    in_flight.append((start, chunk, future))
+                    start += len(chunk)
+
+                # Keep a couple of chunks per worker queued
+                while in_flight and (not chunk or len(in_flight) >= 2 * self.workers):
+                    chunk_start, chunk_blocks, future = in_flight.pop(0)
+                    yield chunk_start, chunk_blocks, future.result()
+
+                if not chunk:
+                    return
@@ -1,16 +1,16 @@
 import socket, threading, time, sys, os
 
-from modules.Blockchain.blockchain import Blockchain, Block
+from modules.Blockchain.blockchain import Blockchain, Block, BlockBuilder
 from modules.Blockchain.validation_utils.factories import ServerBlockchainFactory
 
 from modules.Network.servers import TRUSTED_SERVERS
 
 from modules.Sockets.blockchain.protocol_factory import BlockchainNetworkManagerFactory
+from modules.Sockets.blockchain.pipeline import RequestPipeline
+from modules.Protocol.header import ProtocolException
 import modules.Protocol.blockchain.header as ProtocolHeader
 import modules.Protocol.blockchain.operations as ProtocolOperations
 
-from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
-
 
 
 def print_header(header: Blockchain):
@@ -55,7 +55,7 @@ def request_scan():
             print(f'Trusted server: {trusted_server} doesn\'t answer!')
 
         else:
-            manager = BlockchainNetworkManagerFactory.create(server, ProtocolHeader.BlockchainProtocolPacket)
+            manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket)
             manager.send(ProtocolOperations.LedgerAskHeader())
             respond = manager.recv()
             print(f"Trusted server: {trusted_server} responded with header!")
@@ -91,7 +91,7 @@ def request_header(index: int):
         print(f'Trusted server: {trusted_server} doesn\'t answer!')
 
     else:
-        manager = BlockchainNetworkManagerFactory.create(server, ProtocolHeader.BlockchainProtocolPacket)
+        manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket)
         manager.send(ProtocolOperations.LedgerAskHeader())
         respond = manager.recv()
         print(f"Trusted server: {trusted_server} responded with header!")
@@ -127,8 +127,8 @@ def request_get_block(index: int, num: int):
         print(f'Trusted server: {trusted_server} doesn\'t answer!')
 
     else:
-        manager = BlockchainNetworkManagerFactory.create(server, ProtocolHeader.BlockchainProtocolPacket)
-        manager.send(ProtocolOperations.LedgerAskBlock(Block(b'', b'', num, b'')))
+        manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket)
+        manager.send(ProtocolOperations.LedgerAskBlock(Block(b'', b'', num, b''), manager.num_bytes))
         respond = manager.recv()
         if respond.operation == b"SERVER_DENY":
             print(f"Trusted server: {trusted_server} denied!")
@@ -141,6 +141,92 @@ def request_get_block(index: int, num: int):
         server.close()
 
 
+def request_get_range(index: int, start: int, count: int, headers_only: bool = False):
+    """Asks server for blocks from the start number down.
+    
+    Args:
+        index: Index of trusted server.
+        start: Number of the first block.
+        count: Count of blocks.
+        headers_only: Ask for blocks without data.
+    """
+
+    # Check index
+    if index < 0 or index >= len(TRUSTED_SERVERS):
+        print("Invelid trusted server index! Try again...")
+        return
+
+    # Get blocks of trusted server
+    trusted_server = TRUSTED_SERVERS[index]
+
+    try:
+        # Create socket for server
+        server = socket.socket(
+            socket.AF_INET,
+            socket.SOCK_STREAM
+        )
+        server.connect(trusted_server)
+
+    except ConnectionRefusedError:
+        print(f'Trusted server: {trusted_server} doesn\'t answer!')
+
+    else:
+        manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket)
+        ask = ProtocolOperations.LedgerAskRangeHeaders if headers_only else ProtocolOperations.LedgerAskRange
+        direction = ProtocolHeader.BlockchainProtocolPacket.RANGE_BACKWARD
+
+        # Server gives at most RANGE_MAX_COUNT blocks per request
+        ranges = []
+        while count > 0 and start >= 1:
+            size = min(count, ProtocolHeader.BlockchainProtocolPacket.RANGE_MAX_COUNT)
+            ranges.append((start, size))
+            start -= size
+            count -= size
+
+        # Every request is sent at once if the server takes request ids
+        try:
+            pipeline = RequestPipeline(manager)
+
+        except ProtocolException:
+            pipeline = None
+            responds = None
+
+        else:
+            requests = [pipeline.ask_range(start, size, direction, headers_only) for start, size in ranges]
+            responds = (future.result() for future in requests)
+
+        for start, size in ranges:
+            if responds is not None:
+                packets = iter(next(responds))
+
+            else:
+                manager.send(ask(start, size, direction, manager.num_bytes))
+                packets = iter(manager.recv, None)
+
+            more = True
+            while more:
+                respond = next(packets)
+
+                if respond.operation == b"SERVER_DENY":
+                    print(f"Trusted server: {trusted_server} denied!")
+                    print(respond.payload)
+                    break
+
+                blocks, more = manager.decode_range(respond)
+
+                for block in blocks:
+                    print_block(block)
+
+            if more:
+                break
+
+        if pipeline is not None:
+            pipeline.close()
+
+        else:
+            server.close()
+
+
 def request_add_block(index: int, data: bytes):
     """Asks to add new block in blockchain.
     
@@ -157,7 +243,6 @@ def request_add_block(index: int, data: bytes):
     # Get the Last Block
     # Get block of trusted server
     trusted_server = TRUSTED_SERVERS[index]
-    hash_manager = HashManagerDriver()
 
     try:
         # Create socket for server
@@ -172,16 +257,17 @@ def request_add_block(index: int, data: bytes):
 
     else:
         # Get Header
-        manager = BlockchainNetworkManagerFactory.create(server, ProtocolHeader.BlockchainProtocolPacket)
+        manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket)
         manager.send(ProtocolOperations.LedgerAskHeader())
         header = manager.decode_header(manager.recv())
 
         # Generate valid block with given data
-        block = Block(b'', header.get_hash(), header.get_num() + 1, data)
-        block.set_hash(hash_manager.hash_block(block))
+        builder = BlockBuilder(b'', header.get_hash(), header.get_num() + 1, data)
+        builder.set_hash(manager.hash_manager.hash_block(builder))
+        block = builder.build()
 
         # Send new block to the server
-        manager.send(ProtocolOperations.BlockAdd(block))
+        manager.send(ProtocolOperations.BlockAdd(block, manager.num_bytes))
 
         # Handle Respond
         respond = manager.recv()
@@ -211,6 +297,7 @@ def main(path: str):
                 print('quit - Exit client programm.')
                 print('scan [<index> | None] - Scans trusted servers.')
                 print('get_block <index> <number of block> - Downloads block from server.')
+                print('get_range <index> <number of block> <count> [headers] - Downloads blocks from the number down.')
                 print('generate <server index> <data> - Generates new block.')
                 print('')
 
@@ -239,6 +326,16 @@ def main(path: str):
                     num = int(args[2])
                     request_get_block(index, num)
 
+            elif command == 'get_range':
+                if len(args) not in (4, 5):
+                    print("Invalid arguments number!")
+
+                else:
+                    index = int(args[1])
+                    start = int(args[2])
+                    count = int(args[3])
+                    request_get_range(index, start, count, len(args) == 5 and args[4] == 'headers')
+
             elif command == 'generate':
                 if len(args) < 3:
                     print("Invalid arguments number!")
@@ -0,0 +1,10 @@
+TRUSTED_CHECKPOINTS = (
+)
+"""Trusted Checkpoints: number and hash of Blocks signed off by the operator.
+
+The highest checkpoint a Blockchain matches is rehashed, Blocks below it are only checked
+for order and links on download and on load, so checks scale with Blocks after it.
+Hashes are of the Hash algorithm of the Blockchain, checkpoints of other chains never match.
+
+Add one like: (1000, bytes.fromhex('<hash of block 1000>')),
+"""
@@ -1,4 +1,4 @@
-from ..header import ProtocolPacket
+from ..header import ProtocolPacket, operations_by_code
 from ..header import PayloadSizeIsOutOfBounds, PacketEndDelimiterIsMissing, PacketSizeIsOutOfBounds
 from ..header import PacketSizeDiffersFromGivenValue, UnknownOperation
 
@@ -25,6 +25,15 @@ class BaseProtocolPacket(ProtocolPacket):
     )
     """Protocol Allowed Operations."""
 
+    OPERATION_CODES = {
+        b'SERVER_ACCEPT': 0x01,
+        b'SERVER_DENY': 0x02,
+    }
+    """Codes of operations in binary Packets."""
+
+    OPERATIONS_BY_CODE = operations_by_code(OPERATION_CODES)
+    """Operations by code."""
+
     def __init__(self, operation: bytes, payload: bytes = b'', delimiter: bytes = ProtocolPacket.HEADER_PACKET_END_DELIMITER, size: int = None) -> None:
         """TestHeader constructor.
         
@@ -40,16 +49,17 @@ class BaseProtocolPacket(ProtocolPacket):
 
         Raises:
             UnknownOperation: Used unknown operation in the operation field.
-            PayloadSizeIsOutOfBounds: The size of the payload is greater than HEADER_PAYLOAD_MAX_SIZE
+            PayloadSizeIsOutOfBounds: The size of the payload is greater than HEADER_LARGE_PAYLOAD_MAX_SIZE.
+                Payloads greater than HEADER_PAYLOAD_MAX_SIZE are sent only in chunks.
             PacketEndDelimiterIsMissing: There's no HEADER_PAYLOAD_END_DELIMITER
                 determed in the end of payload field.
-            PacketSizeIsOutOfBounds: Packet size is greater than PACKET_MAX_SIZE.
+            PacketSizeIsOutOfBounds: Packet size is greater than PACKET_LARGE_MAX_SIZE.
         """
 
         if operation not in self.ALLOWED_OPERATIONS:
             raise UnknownOperation('Unknown operation has been given!')
 
-        if len(payload) > ProtocolPacket.HEADER_PAYLOAD_MAX_SIZE:
+        if len(payload) > ProtocolPacket.HEADER_LARGE_PAYLOAD_MAX_SIZE:
             raise PayloadSizeIsOutOfBounds('Payload size is out of bounds!')
 
         if delimiter != ProtocolPacket.HEADER_PACKET_END_DELIMITER:
@@ -58,11 +68,13 @@ class BaseProtocolPacket(ProtocolPacket):
         self.operation = operation
         self.payload = payload
         self.delimiter = delimiter
+        self.remaining = 0
+        self.request_id = 0
 
         if size is None:
             self.size = self.calculate_size()
         else:
-            if size > ProtocolPacket.PACKET_MAX_SIZE:
+            if size > ProtocolPacket.PACKET_LARGE_MAX_SIZE:
                 raise PacketSizeIsOutOfBounds('Packet size is out of bounds!')
 
             elif size != self.calculate_size():
@@ -81,7 +93,7 @@ class BaseProtocolPacket(ProtocolPacket):
         """
 
         size = len(self.operation) + len(self.payload) + len(self.delimiter)
-        if size > ProtocolPacket.PACKET_MAX_SIZE:
+        if size > ProtocolPacket.PACKET_LARGE_MAX_SIZE:
             raise PacketSizeIsOutOfBounds('New Packet size is out of bounds!')
         else:
             return size
\ No newline at end of file
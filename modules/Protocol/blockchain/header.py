@@ -1,4 +1,7 @@
+import struct
+
 from ..base.header import BaseProtocolPacket
+from ..header import operations_by_code
 
 
 class BlockchainProtocolPacket(BaseProtocolPacket):
@@ -19,15 +22,95 @@ class BlockchainProtocolPacket(BaseProtocolPacket):
 
     ALLOWED_OPERATIONS = (
         *BaseProtocolPacket.ALLOWED_OPERATIONS,
+        b'PROTOCOL_HELLO',
         b'BLOCK_SPREAD',
         b'BLOCK_ADD',
         b'LEDGER_RESPOND_HEADER',
         b'LEDGER_RESPOND_BLOCK',
+        b'LEDGER_RESPOND_PROOF',
+        b'LEDGER_RESPOND_PEAKS',
+        b'LEDGER_RESPOND_RANGE_HEADERS',
+        b'LEDGER_RESPOND_RANGE',
         b'LEDGER_ASK_HEADER',
+        b'LEDGER_ASK_PROOF',
+        b'LEDGER_ASK_PEAKS',
+        b'LEDGER_ASK_BLOCK_BY_HASH',
         b'LEDGER_ASK_BLOCK',
+        b'LEDGER_ASK_RANGE_HEADERS',
+        b'LEDGER_ASK_RANGE',
         b'LEDGER_ASK',
     )
     """Protocol Allowed Operations."""
 
+    OPERATION_CODES = {
+        **BaseProtocolPacket.OPERATION_CODES,
+        b'PROTOCOL_HELLO': 0x10,
+        b'BLOCK_SPREAD': 0x20,
+        b'BLOCK_ADD': 0x21,
+        b'LEDGER_RESPOND_HEADER': 0x30,
+        b'LEDGER_RESPOND_BLOCK': 0x31,
+        b'LEDGER_RESPOND_PROOF': 0x32,
+        b'LEDGER_RESPOND_PEAKS': 0x33,
+        b'LEDGER_RESPOND_RANGE': 0x34,
+        b'LEDGER_RESPOND_RANGE_HEADERS': 0x35,
+        b'LEDGER_ASK_HEADER': 0x40,
+        b'LEDGER_ASK_PROOF': 0x41,
+        b'LEDGER_ASK_PEAKS': 0x42,
+        b'LEDGER_ASK_BLOCK_BY_HASH': 0x43,
+        b'LEDGER_ASK_BLOCK': 0x44,
+        b'LEDGER_ASK': 0x45,
+        b'LEDGER_ASK_RANGE': 0x46,
+        b'LEDGER_ASK_RANGE_HEADERS': 0x47,
+    }
+    """Codes of operations in binary Packets."""
+
+    OPERATIONS_BY_CODE = operations_by_code(OPERATION_CODES)
+    """Operations by code."""
+
     PACKET_BLOCK_SIZE_BYTES = 2
-    """Bytes Size of Block Size"""
\ No newline at end of file
+    """Bytes Size of Block Size"""
+
+    PACKET_WIDE_BLOCK_SIZE_BYTES = 8
+    """Bytes Size of Block Size when both sides support FEATURE_WIDE_NUMBERS."""
+
+    RANGE_FORWARD = 0
+    """Range direction. Blocks from the start number up."""
+
+    RANGE_BACKWARD = 1
+    """Range direction. Blocks from the start number down."""
+
+    RANGE_MAX_COUNT = 4096
+    """Max count of Blocks given for one range request. Ask again from where it stopped."""
+
+    RANGE_FRAME_BUDGET = BaseProtocolPacket.HEADER_PAYLOAD_MAX_SIZE
+    """Max size in bytes of a range respond packing several Blocks."""
+
+    RANGE_LARGE_FRAME_BUDGET = 1 << 16
+    """Max size in bytes of a range respond packing several Blocks, if chunked Packets are agreed."""
+
+    RANGE_DATA_SIZE = struct.Struct('<I')
+    """Size of Block data in a range respond record."""
+
+    RANGE_MORE = 0x01
+    """Range respond flag. More responds to the same request follow."""
+
+    FEATURE_WIDE_NUMBERS = 0x01
+    """Hello feature flag. Block numbers and counts take PACKET_WIDE_BLOCK_SIZE_BYTES."""
+
+    FEATURE_PROTOCOL_V2 = 0x02
+    """Hello feature flag. Packets are sent in PROTOCOL_V2 format after hello."""
+
+    FEATURE_CHUNKED_PACKETS = 0x04
+    """Hello feature flag. Payloads up to HEADER_LARGE_PAYLOAD_MAX_SIZE are sent in chunks.
+
+    Used only together with FEATURE_PROTOCOL_V2.
+    """
+
+    FEATURE_REQUEST_IDS = 0x08
+    """Hello feature flag. Binary Packets take TAGGED_HEADER and responds may come out of order.
+
+    Used only together with FEATURE_PROTOCOL_V2.
+    """
+
+    SUPPORTED_FEATURES = FEATURE_WIDE_NUMBERS | FEATURE_PROTOCOL_V2 | FEATURE_CHUNKED_PACKETS | FEATURE_REQUEST_IDS
+    """Flags of features this side supports."""
\ No newline at end of file
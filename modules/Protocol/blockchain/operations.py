@@ -1,16 +1,39 @@
+from typing import List
 from .header import BlockchainProtocolPacket
 from modules.Blockchain.blockchain import Block, Blockchain
 
 
+# Connection related operations
+class ProtocolHello(BlockchainProtocolPacket):
+    """Protocol Hello operation.
+
+    Client offers ids of Hash algorithms it supports, preferred one first.
+    Server answers with the id its Blockchain uses or denies.
+
+    Ids are followed by a zero and flags of protocol features the side supports.
+    Features both sides support are used from the next operation on.
+    """
+
+    def __init__(self, algorithm_ids: List[int], features: int = 0) -> None:
+        """Operation constructor."""
+
+        data = b''
+        data += bytes(algorithm_ids)
+        data += b'\x00'
+        data += bytes([features])
+
+        super().__init__(b'PROTOCOL_HELLO', data)
+
+
 # New Block related operations
 class BlockAdd(BlockchainProtocolPacket):
     """Offer new Block operation."""
 
-    def __init__(self, block: Block) -> None:
+    def __init__(self, block: Block, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
         """Operation constructor."""
 
         data = b''
-        data += int.to_bytes(block.get_num(), 2, 'little')
+        data += int.to_bytes(block.get_num(), num_bytes, 'little')
         data += block.get_hash()
         data += block.get_prev_hash()
         data += block.get_data()
@@ -21,11 +44,11 @@ class BlockAdd(BlockchainProtocolPacket):
 class BlockSpread(BlockchainProtocolPacket):
     """Spread Block operation."""
 
-    def __init__(self, block: Block) -> None:
+    def __init__(self, block: Block, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
         """Operation constructor."""
 
         data = b''
-        data += int.to_bytes(block.get_num(), 2, 'little')
+        data += int.to_bytes(block.get_num(), num_bytes, 'little')
         data += block.get_hash()
         data += block.get_prev_hash()
         data += block.get_data()
@@ -46,11 +69,11 @@ class LedgerAskHeader(BlockchainProtocolPacket):
 class LedgerRespondHeader(BlockchainProtocolPacket):
     """Give Ledger information operation."""
 
-    def __init__(self, header: Blockchain) -> None:
+    def __init__(self, header: Blockchain, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
         """Operation constructor."""
 
         data = b''
-        data += int.to_bytes(header.get_num(), 2, 'little')
+        data += int.to_bytes(header.get_num(), num_bytes, 'little')
         data += header.get_hash()
 
         super().__init__(b'LEDGER_RESPOND_HEADER', data)
@@ -75,28 +98,189 @@ class LedgerAskBlock(BlockchainProtocolPacket):
     Asks for Block with specific number.
     """
 
-    def __init__(self, block: Block) -> None:
+    def __init__(self, block: Block, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
         """Operation constructor."""
 
         data = b''
-        data += int.to_bytes(block.get_num(), 2, 'little')
+        data += int.to_bytes(block.get_num(), num_bytes, 'little')
 
         super().__init__(b'LEDGER_ASK_BLOCK', data)
 
 
+class LedgerAskBlockByHash(BlockchainProtocolPacket):
+    """Ledger Ask Block By Hash operation.
+    
+    Asks for Block with specific hash.
+    """
+
+    def __init__(self, hash: bytes) -> None:
+        """Operation constructor."""
+
+        super().__init__(b'LEDGER_ASK_BLOCK_BY_HASH', hash)
+
+
 class LedgerRespondBlock(BlockchainProtocolPacket):
     """Ledger Ask Block operation.
     
     Asks for Block with specific number.
     """
 
-    def __init__(self, block: Block) -> None:
+    def __init__(self, block: Block, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
         """Operation constructor."""
 
         data = b''
-        data += int.to_bytes(block.get_num(), 2, 'little')
+        data += int.to_bytes(block.get_num(), num_bytes, 'little')
         data += block.get_hash()
         data += block.get_prev_hash()
         data += block.get_data()
 
-        super().__init__(b'LEDGER_RESPOND_BLOCK', data)
\ No newline at end of file
+        super().__init__(b'LEDGER_RESPOND_BLOCK', data)
+
+
+# Merkle Mountain Range operations
+class LedgerAskProof(BlockchainProtocolPacket):
+    """Ledger Ask Proof operation.
+    
+    Asks for the inclusion proof of Block with specific number.
+    """
+
+    def __init__(self, num: int, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
+        """Operation constructor."""
+
+        data = b''
+        data += int.to_bytes(num, num_bytes, 'little')
+
+        super().__init__(b'LEDGER_ASK_PROOF', data)
+
+
+class LedgerRespondProof(BlockchainProtocolPacket):
+    """Ledger Respond Proof operation.
+    
+    Gives the inclusion proof of Block: siblings from the leaf up
+    and peaks of the Blockchain with count of Blocks.
+    """
+
+    def __init__(self, num: int, count: int, siblings: List[bytes], peaks: List[bytes],
+                 num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
+        """Operation constructor."""
+
+        data = b''
+        data += int.to_bytes(num, num_bytes, 'little')
+        data += int.to_bytes(count, num_bytes, 'little')
+        data += b''.join(siblings)
+        data += b''.join(peaks)
+
+        super().__init__(b'LEDGER_RESPOND_PROOF', data)
+
+
+class LedgerAskPeaks(BlockchainProtocolPacket):
+    """Ledger Ask Peaks operation.
+    
+    Asks for peaks of the Merkle Mountain Range to compare Blockchains.
+    """
+
+    def __init__(self) -> None:
+        """Operation constructor."""
+
+        super().__init__(b'LEDGER_ASK_PEAKS')
+
+
+class LedgerRespondPeaks(BlockchainProtocolPacket):
+    """Ledger Respond Peaks operation.
+    
+    Gives count of Blocks and peaks of the Merkle Mountain Range.
+    """
+
+    def __init__(self, count: int, peaks: List[bytes], num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
+        """Operation constructor."""
+
+        data = b''
+        data += int.to_bytes(count, num_bytes, 'little')
+        data += b''.join(peaks)
+
+        super().__init__(b'LEDGER_RESPOND_PEAKS', data)
+
+
+# Range operations
+class LedgerAskRange(BlockchainProtocolPacket):
+    """Ledger Ask Range operation.
+    
+    Asks for count of Blocks from the start number in the direction.
+    Answered by LedgerRespondRange Packets, the last one without RANGE_MORE.
+    """
+
+    OPERATION = b'LEDGER_ASK_RANGE'
+
+    def __init__(self, start: int, count: int, direction: int = BlockchainProtocolPacket.RANGE_FORWARD,
+                 num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
+        """Operation constructor."""
+
+        data = b''
+        data += int.to_bytes(start, num_bytes, 'little')
+        data += int.to_bytes(count, num_bytes, 'little')
+        data += bytes([direction])
+
+        super().__init__(self.OPERATION, data)
+
+
+class LedgerAskRangeHeaders(LedgerAskRange):
+    """Ledger Ask Range Headers operation.
+    
+    Asks for Blocks of the range without their data.
+    Answered by LedgerRespondRangeHeaders Packets.
+    """
+
+    OPERATION = b'LEDGER_ASK_RANGE_HEADERS'
+
+
+class LedgerRespondRange(BlockchainProtocolPacket):
+    """Ledger Respond Range operation.
+    
+    Gives Blocks of the asked range. Flags are followed by Block records:
+    number, hash, previous hash, data size and data.
+    """
+
+    OPERATION = b'LEDGER_RESPOND_RANGE'
+
+    def __init__(self, blocks: List[Block], more: bool, num_bytes: int = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES) -> None:
+        """Operation constructor."""
+
+        data = bytearray()
+        data.append(BlockchainProtocolPacket.RANGE_MORE if more else 0)
+
+        for block in blocks:
+            data += self.encode_record(block, num_bytes)
+
+        super().__init__(self.OPERATION, bytes(data))
+
+    @staticmethod
+    def record_size(block: Block, num_bytes: int) -> int:
+        return num_bytes + len(block.get_hash()) + len(block.get_prev_hash()) + BlockchainProtocolPacket.RANGE_DATA_SIZE.size + len(block.get_data())
+
+    @staticmethod
+    def encode_record(block: Block, num_bytes: int) -> bytes:
+        return b''.join((
+            int.to_bytes(block.get_num(), num_bytes, 'little'),
+            block.get_hash(),
+            block.get_prev_hash(),
+            BlockchainProtocolPacket.RANGE_DATA_SIZE.pack(len(block.get_data())),
+            block.get_data(),
+        ))
+
+
+class LedgerRespondRangeHeaders(LedgerRespondRange):
+    """Ledger Respond Range Headers operation.
+    
+    Gives Blocks of the asked range without data. Flags are followed by Block records:
+    number, hash and previous hash.
+    """
+
+    OPERATION = b'LEDGER_RESPOND_RANGE_HEADERS'
+
+    @staticmethod
+    def record_size(block: Block, num_bytes: int) -> int:
+        return num_bytes + len(block.get_hash()) + len(block.get_prev_hash())
+
+    @staticmethod
+    def encode_record(block: Block, num_bytes: int) -> bytes:
+        return int.to_bytes(block.get_num(), num_bytes, 'little') + block.get_hash() + block.get_prev_hash()
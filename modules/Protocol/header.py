@@ -1,3 +1,8 @@
+from typing import Dict, Optional, Tuple
+
+import struct
+
+
 # Protocol Raises
 class ProtocolException(Exception):
     """Base Test Protocol Exception.
@@ -27,6 +32,24 @@ class PacketSizeDiffersFromGivenValue(ProtocolException):
     """
 
 
+def operations_by_code(codes: Dict[bytes, int]) -> Tuple[Optional[bytes], ...]:
+    """Builds the table decoding operation codes of binary Packets.
+
+    Args:
+        codes: Operation codes by operation.
+
+    Returns:
+        Operation of every one byte code. None for unused codes.
+    """
+
+    table = [None] * 256
+
+    for operation, code in codes.items():
+        table[code] = operation
+
+    return tuple(table)
+
+
 class ProtocolPacket:
     """Structure Class determining the structure of a protocol packet.
 
@@ -64,6 +87,20 @@ class ProtocolPacket:
                 )
     """Determines the Maximum size of Packet."""
 
+    HEADER_LARGE_PAYLOAD_MAX_SIZE = 1 << 24
+    """Maximum Payload size of chunked Packets.
+
+    Larger Payloads than HEADER_PAYLOAD_MAX_SIZE are sent in chunks,
+    only if both sides agreed on it.
+    """
+
+    PACKET_LARGE_MAX_SIZE = (
+                HEADER_OPERATION_MAX_SIZE + 
+                HEADER_LARGE_PAYLOAD_MAX_SIZE + 
+                len(HEADER_PACKET_END_DELIMITER)
+                )
+    """Determines the Maximum size of chunked Packet."""
+
     PACKET_SIZE_BYTES = 2
     """The Size of Size Field itself.
 
@@ -73,6 +110,46 @@ class ProtocolPacket:
     HEADER_DATA_CODING = 'utf-8'
     """Determines used Coding for a packet transfer."""
 
+    PROTOCOL_V1 = 1
+    """Text Packets: size, operation name, payload and delimiter.
+
+    Used by every connection until both sides agree on another version.
+    """
+
+    PROTOCOL_V2 = 2
+    """Binary Packets: BINARY_HEADER followed by payload."""
+
+    BINARY_HEADER = struct.Struct('<HB')
+    """Header of binary Packets: payload size, operation code."""
+
+    TAGGED_HEADER = struct.Struct('<HBI')
+    """Header of binary Packets with request ids: payload size, operation code, request id.
+
+    Responds carry the id of their request, so several requests can wait on one connection.
+    Id 0 marks Packets not related to any request.
+    """
+
+    LARGE_SIZE = struct.Struct('<I')
+    """Wide size field opening chunked binary Packets: size of the whole Payload."""
+
+    CHUNKED_FLAG = 0x80
+    """Set on the operation code of the frame opening a chunked Packet.
+
+    Frame payload is LARGE_SIZE followed by the first chunk of Payload.
+    """
+
+    CONTINUATION_CODE = 0x00
+    """Operation code of frames carrying the next chunks of Payload."""
+
+    OPERATION_CODES = {}
+    """Codes of operations in binary Packets. From 0x01 to 0x7F.
+
+    Codes are sent to peers, so they never change.
+    """
+
+    OPERATIONS_BY_CODE = operations_by_code(OPERATION_CODES)
+    """Operations by code. Built from OPERATION_CODES."""
+
     def __init__(self, size: int, operation: bytes, payload: bytes = b'', delimiter: bytes = HEADER_PACKET_END_DELIMITER) -> None:
         """Packet constructor.
         
@@ -92,6 +169,10 @@ class ProtocolPacket:
         self.delimiter = delimiter
         self.size = size
 
+        # Payload size left in chunks after the received one
+        self.remaining = 0
+        self.request_id = 0
+
     def calculate_size(self) -> int:
         """Calculates the size of packet.
 
@@ -1,17 +1,20 @@
 import socket
 import threading
 import concurrent.futures
+from typing import List, Tuple
 
 from modules.Sockets.blockchain.protocol_factory import BlockchainNetworkManagerFactory, BlockchainNetworkManager
 
-from modules.Protocol.header import UnknownOperation
+from modules.Protocol.header import ProtocolException, UnknownOperation, PayloadSizeIsOutOfBounds
 from modules.Protocol.base.operations import ServerAccept, ServerDeny
 import modules.Protocol.blockchain.header as ProtocolHeader
 import modules.Protocol.blockchain.operations as ProtocolOperations
 
-from modules.Blockchain.blockchain import Blockchain, Block
+from modules.Blockchain.blockchain import Blockchain, Block, HashManager, InvalidHash, InvalidBlockNumber
+from modules.Blockchain.utils.Drivers.hash import InvalidHashAlgorithm, get_hash_algorithm
 from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
-from modules.Blockchain.validation_utils.factories import ValidatorFactory
+from modules.Blockchain.validation_utils.factories import BlockTreeFactory
+from modules.Blockchain.block_tree import BlockTree, BLOCK_KNOWN, BLOCK_EXTENDED, BLOCK_STALE, BLOCK_REORGANIZED
 
 from modules.Network.servers import TRUSTED_SERVERS
 
@@ -29,12 +32,24 @@ SERVER_MAX_LISTEN = 5
 """Max count of client connected
 """
 
+SERVER_WORKERS = 8
+"""Count of threads handling requests with ids of every client
+"""
+
+CLIENT_FRAME_TIMEOUT = 2
+"""Seconds a client has to finish a started Packet, idle clients are kept
+"""
+
+LEDGER_CHUNK = 4096
+"""Count of Blocks collected at once for LEDGER_ASK
+"""
+
 global server_address
 
 TRUSTED_IPS = [ip for ip, port in TRUSTED_SERVERS]
 
 
-def spread_block(block: Block):
+def spread_block(block: Block, hash_manager: HashManager):
     for trusted_server in TRUSTED_SERVERS:
         # Don't send us
         if trusted_server == server_address:
@@ -49,13 +64,24 @@ def spread_block(block: Block):
             server.connect(trusted_server)
 
             # Send block
-            manager = BlockchainNetworkManagerFactory.create(server, ProtocolHeader.BlockchainProtocolPacket)
-            manager.send(ProtocolOperations.BlockSpread(block))
+            manager = BlockchainNetworkManagerFactory.negotiate(server, ProtocolHeader.BlockchainProtocolPacket, hash_manager)
+            packet = ProtocolOperations.BlockSpread(block, manager.num_bytes)
+
+            if manager.can_send(packet):
+                manager.send(packet)
+
+            else:
+                print(f'Trusted server: {trusted_server} doesn\'t take large blocks!')
+
             server.close()
 
         # Server doesn't answer
         except ConnectionRefusedError:
             print(f'Trusted server: {trusted_server} doesn\'t answer!')
+
+        except InvalidHashAlgorithm:
+            print(f'Trusted server: {trusted_server} uses another hash algorithm!')
+            server.close()
             
 
 # Set up Server Socket to listen
@@ -80,143 +106,408 @@ def server_listen(index: int):
     return server
 
 
+# Client requests
+def collect_blocks(tree: BlockTree, start: int, stop: int, reverse: bool = False) -> List[Block]:
+    """Collects Blocks of the best chain under the tree lock.
+
+    Other workers could reorganize the chain meanwhile, so Blocks of a respond
+    are taken at once and sent after the lock is released.
+
+    Args:
+        tree: Block Tree over the served Blockchain
+        start: Number of the first Block
+        stop: Number to stop before
+        reverse: Collect from the last Block
+
+    Returns:
+        Blocks in the asked order.
+    """
+
+    with tree.lock:
+        return list(tree.chain.iter_blocks(start, stop, reverse=reverse))
+
+
+def send_ledger(manager: BlockchainNetworkManager, tree: BlockTree, request_id: int) -> str:
+    """Sends the whole Blockchain from the last Block in chunks collected under the tree lock.
+
+    Chunks have to link to each other, so a reorganization between them stops the respond.
+
+    Returns:
+        Result of the request to print.
+    """
+
+    stop = tree.chain.num + 1
+    last = None
+
+    while stop > 1:
+        blocks = collect_blocks(tree, max(1, stop - LEDGER_CHUNK), stop, True)
+
+        if not blocks or last is not None and last.prev_hash != blocks[0].hash:
+            manager.send(ServerDeny(b"Blockchain changed while sending!"), request_id)
+            return 'Operation: LEDGER_ASK - Blockchain changed while sending!'
+
+        for block in blocks:
+            packet = ProtocolOperations.LedgerRespondBlock(block, manager.num_bytes)
+
+            if not manager.can_send(packet):
+                manager.send(ServerDeny(b"Block is too large for the protocol!"), request_id)
+                return f'Operation: LEDGER_ASK - Block {block.num} is too large for the client protocol!'
+
+            manager.send(packet, request_id)
+
+        last = blocks[-1]
+        stop = last.num
+
+    return 'Operation: LEDGER_ASK'
+
+
+def handle_request(manager: BlockchainNetworkManager, respond: ProtocolHeader.BlockchainProtocolPacket, addr, tree: BlockTree) -> Tuple[str, bool]:
+    """Handles a request of the client.
+
+    Responds carry the id of the request, so they could be sent from any thread.
+    Blocks are read under the tree lock, so a respond doesn't mix branches of a reorganization.
+
+    Args:
+        manager: Network Manager of the client connection
+        respond: Received request
+        addr: Address of a client connected
+        tree: Block Tree over the served Blockchain
+
+    Returns:
+        Result of the request to print and whether the connection is kept.
+    """
+
+    chain = tree.chain
+    info_result = 'None'
+
+    if respond.operation == b'PROTOCOL_HELLO':
+        algorithm_id = chain.hash_manager.get_algorithm_id()
+        algorithm_ids, features = manager.decode_hello(respond)
+
+        if algorithm_id in algorithm_ids:
+            manager.send(ProtocolOperations.ProtocolHello([algorithm_id], ProtocolHeader.BlockchainProtocolPacket.SUPPORTED_FEATURES), respond.request_id)
+            manager.use_features(features)
+            info_result = f'Operation: PROTOCOL_HELLO - Agreed on hash algorithm {get_hash_algorithm(algorithm_id)}, protocol v{manager.version}.'
+
+        else:
+            manager.send(ServerDeny(b"Unsupported hash algorithm!"), respond.request_id)
+            info_result = 'Operation: PROTOCOL_HELLO - Client doesn\'t support the hash algorithm!'
+
+    elif respond.operation == b'LEDGER_ASK_HEADER':
+        with tree.lock:
+            packet = ProtocolOperations.LedgerRespondHeader(chain, manager.num_bytes)
+
+        manager.send(packet, respond.request_id)
+        info_result = 'Operation: LEDGER_ASK_HEADER'
+
+    elif respond.operation == b'LEDGER_ASK_BLOCK':
+        num = manager.decode_block(respond, True).num
+
+        with tree.lock:
+            block = chain.get_block(num) if 1 <= num <= chain.num else None
+
+        if block is None:
+            manager.send(ServerDeny(b"Invalid block number!"), respond.request_id)
+            info_result = f"Asked for invalid block with number: {num}!"
+
+        else:
+            packet = ProtocolOperations.LedgerRespondBlock(block, manager.num_bytes)
+
+            if manager.can_send(packet):
+                manager.send(packet, respond.request_id)
+                info_result = f"Asked for valid block with number: {block.num}! Responding with block..."
+
+            else:
+                manager.send(ServerDeny(b"Block is too large for the protocol!"), respond.request_id)
+                info_result = f"Asked for block {block.num} too large for the client protocol!"
+
+    elif respond.operation == b'LEDGER_ASK_BLOCK_BY_HASH':
+        try:
+            hash = manager.decode_hash(respond)
+
+        except InvalidHash:
+            block = None
+
+        else:
+            with tree.lock:
+                block = chain.get_block_by_hash(hash)
+
+        if block is None:
+            manager.send(ServerDeny(b"Unknown block hash!"), respond.request_id)
+            info_result = f"Asked for unknown block with hash: {respond.payload.hex()}!"
+
+        else:
+            packet = ProtocolOperations.LedgerRespondBlock(block, manager.num_bytes)
+
+            if manager.can_send(packet):
+                manager.send(packet, respond.request_id)
+                info_result = f"Asked for block with hash: {respond.payload.hex()}! Responding with block {block.num}..."
+
+            else:
+                manager.send(ServerDeny(b"Block is too large for the protocol!"), respond.request_id)
+                info_result = f"Asked for block {block.num} too large for the client protocol!"
+
+    elif respond.operation == b'LEDGER_ASK_PROOF':
+        num = manager.decode_block(respond, True).num
+
+        try:
+            with tree.lock:
+                count, siblings, peaks = chain.get_proof(num)
+
+        except InvalidBlockNumber:
+            manager.send(ServerDeny(b"Invalid block number!"), respond.request_id)
+            info_result = f"Asked for proof of invalid block with number: {num}!"
+
+        else:
+            manager.send(ProtocolOperations.LedgerRespondProof(num, count, siblings, peaks, manager.num_bytes), respond.request_id)
+            info_result = f"Asked for proof of block {num}! Responding with {len(siblings)} siblings..."
+
+    elif respond.operation == b'LEDGER_ASK_PEAKS':
+        with tree.lock:
+            count, peaks = chain.get_peaks()
+
+        manager.send(ProtocolOperations.LedgerRespondPeaks(count, peaks, manager.num_bytes), respond.request_id)
+        info_result = 'Operation: LEDGER_ASK_PEAKS'
+
+    elif respond.operation == b'LEDGER_ASK':
+        info_result = send_ledger(manager, tree, respond.request_id)
+
+    elif respond.operation in (b'LEDGER_ASK_RANGE', b'LEDGER_ASK_RANGE_HEADERS'):
+        start, count, direction = manager.decode_range_ask(respond)
+        headers_only = respond.operation == b'LEDGER_ASK_RANGE_HEADERS'
+        count = min(count, ProtocolHeader.BlockchainProtocolPacket.RANGE_MAX_COUNT)
+
+        blocks = []
+
+        if start >= 1 and direction == ProtocolHeader.BlockchainProtocolPacket.RANGE_BACKWARD:
+            blocks = collect_blocks(tree, max(1, start - count + 1), start + 1, True)
+
+        elif start >= 1:
+            blocks = collect_blocks(tree, start, start + count)
+
+        # Range starts with the asked Block in both directions
+        if not blocks or blocks[0].num != start:
+            manager.send(ServerDeny(b"Invalid block number!"), respond.request_id)
+            info_result = f"Asked for range from invalid block with number: {start}!"
+
+        else:
+
+            try:
+                sent = manager.send_range(blocks, headers_only, respond.request_id)
+
+            except PayloadSizeIsOutOfBounds:
+                manager.send(ServerDeny(b"Block is too large for the protocol!"), respond.request_id)
+                info_result = f"Asked for range from block {start} with blocks too large for the client protocol!"
+
+            else:
+                info_result = f"Asked for range from block {start}! Responded with {sent} {'headers' if headers_only else 'blocks'}..."
+
+    elif respond.operation == b'BLOCK_ADD':
+        try:
+            block = manager.decode_block(respond)
+
+            # Clients only extend the best chain, forks come from trusted servers
+            status = tree.add_block(block, extend_only=True)
+
+        except Exception as exc:
+            info_result = 'Operation: BLOCK_ADD - Received invalid block.'
+            header = ServerDeny(str(exc).encode('utf-8'))
+            manager.send(header, respond.request_id)
+            return info_result, False
+
+        if status != BLOCK_EXTENDED:
+            info_result = 'Operation: BLOCK_ADD - Received block that doesn\'t extend Blockchain.'
+            manager.send(ServerDeny(b"Block doesn't extend the best chain!"), respond.request_id)
+
+        else:
+            header = ServerAccept()
+            manager.send(header, respond.request_id)
+            info_result = 'Operation: BLOCK_ADD - Received valid block. Adding to Blockchain.'
+
+            #Spread block
+            spread_block(block, chain.hash_manager)
+
+    # Spread block
+    elif respond.operation == b'BLOCK_SPREAD':
+        if addr[0] not in TRUSTED_IPS:
+            info_result = 'Operation: BLOCK_SPREAD - Requested from untrusted source!'
+
+            # Requests with ids are waited for
+            if respond.request_id:
+                manager.send(ServerDeny(b"Untrusted source!"), respond.request_id)
+
+            return info_result, False
+
+        try:
+            block = manager.decode_block(respond)
+            status = tree.add_block(block)
+
+        except Exception as exc:
+            info_result = 'Operation: BLOCK_SPREAD - Received invalid block!'
+
+            if respond.request_id:
+                manager.send(ServerDeny(str(exc).encode('utf-8')), respond.request_id)
+
+            return info_result, False
+
+        # Known Blocks are not spread again, so spreading stops
+        if status in (BLOCK_KNOWN, BLOCK_STALE):
+            info_result = 'Operation: BLOCK_SPREAD - Received known block!'
+
+        else:
+            info_result = 'Operation: BLOCK_SPREAD - Received valid block!'
+
+            if status == BLOCK_REORGANIZED:
+                info_result = f'Operation: BLOCK_SPREAD - Switched to the branch of block {block.num}!'
+
+            spread_block(block, chain.hash_manager)
+
+    else:
+        info_result = 'Client closed connection!'
+
+        if respond.request_id:
+            manager.send(ServerDeny(b"Unknown request!"), respond.request_id)
+
+        return info_result, False
+
+    return info_result, True
+
+
+def serve_request(client: socket.socket, manager: BlockchainNetworkManager, respond: ProtocolHeader.BlockchainProtocolPacket, addr, tree: BlockTree):
+    """Handles a request with id of the client on a worker.
+
+    Failed request is denied under its id, other requests of the connection go on.
+    Connection is closed only if it's broken.
+    """
+
+    try:
+        info_result, keep = handle_request(manager, respond, addr, tree)
+
+    except OSError:
+        info_result = 'Client closed connection!'
+
+        # Reading side of the connection stops
+        try:
+            client.shutdown(socket.SHUT_RDWR)
+
+        except OSError:
+            pass
+
+    except Exception as exc:
+        info_result = f'Request failed: {exc}'
+
+        try:
+            manager.send(ServerDeny(str(exc).encode('utf-8')), respond.request_id)
+
+        except OSError:
+            pass
+
+    print(f'[Client: {addr}] Request {respond.request_id}: {info_result}')
+
+
 # Server connection
-def server_connection(client: socket.socket, addr, chain: Blockchain):
+def server_connection(client: socket.socket, addr, tree: BlockTree, workers: concurrent.futures.Executor):
     """Handles and determines a connection with client.
 
+    Requests with ids are handled by workers, so responds could go out of order.
+    Others are handled one by one in the order they came.
+    Hello changes the format of Packets, so it's handled here
+    after responds of queued requests are sent.
+
+    Connection is kept while the client is idle, a started Packet
+    must be finished within CLIENT_FRAME_TIMEOUT.
+
     Args:
         client: Socket of a client connected
         addr: Address of a client connected
+        tree: Block Tree over the served Blockchain
+        workers: Executor handling requests with ids
     """
 
     print(f'[Client: {addr}] Connected!')
 
-    manager = BlockchainNetworkManagerFactory.create(client, ProtocolHeader.BlockchainProtocolPacket)
-    validator = ValidatorFactory().create()
+    chain = tree.chain
+    manager = BlockchainNetworkManagerFactory.create(client, ProtocolHeader.BlockchainProtocolPacket, chain.hash_manager)
+    manager.frame_timeout = CLIENT_FRAME_TIMEOUT
+    pending = set()
 
-    while client:
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            info_result = 'None'
-            
-            # Handle client behaviour
-            try:
-                respond = executor.submit(manager.recv).result(2)
-                
-            # Handle client Time Out
-            except concurrent.futures.TimeoutError:
-                info_result = 'Client doesn\'t send anything! Stop connection...'
-                break
+    while True:
+        info_result = 'None'
+
+        # Handle client behaviour
+        try:
+            respond = manager.recv()
+
+            if manager.tagged and respond.request_id and respond.operation != b'PROTOCOL_HELLO':
+                # Chunks are read here, workers don't touch the socket
+                respond.payload = manager.recv_payload(respond)
+
+                future = workers.submit(serve_request, client, manager, respond, addr, tree)
+                pending.add(future)
+                future.add_done_callback(pending.discard)
+
+                info_result = None
+                continue
 
-            except (ConnectionResetError, UnknownOperation):
-                info_result = 'Client closed connection!'
+            # Workers send in the agreed format until hello changes it
+            if respond.operation == b'PROTOCOL_HELLO':
+                concurrent.futures.wait(list(pending))
+
+            info_result, keep = handle_request(manager, respond, addr, tree)
+
+            if not keep:
                 break
 
-            # Handle client
-            else:
-                if respond.operation == b'LEDGER_ASK_HEADER':
-                    manager.send(ProtocolOperations.LedgerRespondHeader(chain))
-                    info_result = 'Operation: LEDGER_ASK_HEADER'
-
-                elif respond.operation == b'LEDGER_ASK_BLOCK':
-                    block = manager.decode_block(respond, True)
-                    if block.num < 1 or block.num > chain.num:
-                        manager.send(ServerDeny(b"Invalid block number!"))
-                        info_result = f"Asked for invalid block with number: {block.num}!"
-
-                    else:
-                        block = chain.get_block(block.num)
-                        manager.send(ProtocolOperations.LedgerRespondBlock(block))
-                        info_result = f"Asked for valid block with number: {block.num}! Responding with block..."
-
-                elif respond.operation == b'LEDGER_ASK':
-                    for n in range(chain.num, 0, -1):
-                        block = chain.get_block(n)
-                        manager.send(ProtocolOperations.LedgerRespondBlock(block))
-                    info_result = 'Operation: LEDGER_ASK'
-
-                elif respond.operation == b'BLOCK_ADD':
-                    try:
-                        block = manager.decode_block(respond)
-                        validator.validate_block(block)
-
-                        last_block = chain.get_block(chain.get_num())
-                        validator.validate_link(last_block, block)
-
-                    except Exception as exc:
-                        info_result = 'Operation: BLOCK_ADD - Received invalid block.'
-                        header = ServerDeny(str(exc).encode('utf-8'))
-                        manager.send(header)
-                        break
-
-                    else:
-                        header = ServerAccept()
-                        manager.send(header)
-                        info_result = 'Operation: BLOCK_ADD - Received valid block. Adding to Blockchain.'
-                        chain.append_block(block)
-
-                        #Spread block
-                        spread_block(block)
-
-                # Spread block
-                elif respond.operation == b'BLOCK_SPREAD':
-                    if addr[0] not in TRUSTED_IPS:
-                        info_result = 'Operation: BLOCK_SPREAD - Requested from untrusted source!'
-                        break
-
-                    block = manager.decode_block(respond)
-
-                    if block.get_num() != chain.get_num():
-                        try:
-                            block = manager.decode_block(respond)
-                            validator.validate_block(block)
-
-                            last_block = chain.get_block(chain.get_num())
-                            validator.validate_link(last_block, block)
-
-                        except Exception:
-                            info_result = 'Operation: BLOCK_SPREAD - Received invalid block!'
-                            break
-
-                        else:
-                            info_result = 'Operation: BLOCK_SPREAD - Received valid block!'
-                            chain.append_block(block)
-                            spread_block(block)
-
-                else:
-                    info_result = 'Client closed connection!'
-                    break
-
-            # Print result of query
-            finally:
+        # Handle client Time Out
+        except socket.timeout:
+            info_result = 'Client stopped inside a request! Stop connection...'
+            break
+
+        except (OSError, ProtocolException):
+            info_result = 'Client closed connection!'
+            break
+
+        # Print result of query
+        finally:
+            if info_result is not None:
                 print(f'[Client: {addr}] {info_result}')
-                
+
+    # Responds of queued requests are sent before closing
+    concurrent.futures.wait(list(pending))
     client.close()
 
 
 # Server loop
-def server_loop(server: socket.socket, chain: Blockchain):
+def server_loop(server: socket.socket, tree: BlockTree, workers: concurrent.futures.Executor):
     """Represents Looping function for the Server.
     
     Infinite loop, accepting client connections.
 
     Args:
         server: Socket representing the Server
+        tree: Block Tree over the served Blockchain
+        workers: Executor handling requests with ids
     """
 
     while True:
-        connection = threading.Thread(target=server_connection, daemon=True, args=(*server.accept(), chain))
+        connection = threading.Thread(target=server_connection, daemon=True, args=(*server.accept(), tree, workers))
         connection.start()
 
 
 # Server set up & Handle console commands
-def main(path: str, index: int):
+def main(path: str, index: int, storage_options: dict = None):
     server = server_listen(index)
     global server_address
     server_address = TRUSTED_SERVERS[index]
 
-    chain = StoredBlockchainFactory().create(path)
+    chain = StoredBlockchainFactory().create(path, **(storage_options or {}))
+    tree = BlockTreeFactory().create(chain)
+
+    if chain.invalid_from is not None:
+        print(f'Stored block {chain.invalid_from} failed verification! Blocks from it are fixed in memory only, audit the storage to find them.')
+    workers = concurrent.futures.ThreadPoolExecutor(SERVER_WORKERS)
 
-    listen_thread = threading.Thread(target=server_loop, daemon=True, args=(server, chain))
+    listen_thread = threading.Thread(target=server_loop, daemon=True, args=(server, tree, workers))
     listen_thread.start()
 
     while True:
@@ -228,6 +519,8 @@ def main(path: str, index: int):
             print('clear(cls) - Clears the console.\n')
         
         elif console == 'quit':
+            workers.shutdown(wait=True, cancel_futures=True)
+            chain.close()
             break
 
         elif console == 'threads' or console == 'thr':
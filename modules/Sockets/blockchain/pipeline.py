@@ -0,0 +1,165 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+import itertools
+import socket
+import threading
+
+from .protocol import BlockchainNetworkManager
+
+from modules.Protocol.header import ProtocolPacket, ProtocolException
+from modules.Protocol.blockchain.header import BlockchainProtocolPacket
+import modules.Protocol.blockchain.operations as ProtocolOperations
+
+
+REQUEST_ID_LIMIT = 1 << 32
+"""Request ids are taken from 1 below it and start over after it."""
+
+
+def is_range_end(packet: ProtocolPacket) -> bool:
+    """Checks if the Packet is the last respond to a range request."""
+
+    if packet.operation not in (b'LEDGER_RESPOND_RANGE', b'LEDGER_RESPOND_RANGE_HEADERS'):
+        return True
+
+    return not packet.payload or not packet.payload[0] & BlockchainProtocolPacket.RANGE_MORE
+
+
+class RequestPipeline:
+    """Class keeping many requests in flight on one connection.
+
+    Usage:
+        Requests are sent right away with new ids and give futures.
+        A receiver thread matches responds to requests by their ids,
+        so responds could come in any order and waiting is bounded by
+        the slowest request instead of the sum of round trips.
+
+        Needs a connection with request ids agreed on hello,
+        which BlockchainNetworkManagerFactory.negotiate does with any current server.
+        Nothing else should receive from the manager while the pipeline is open.
+    """
+
+    def __init__(self, manager: BlockchainNetworkManager) -> None:
+        """Request Pipeline constructor. Starts the receiver thread.
+
+        Args:
+            manager: Network Manager of the negotiated connection.
+
+        Raises:
+            ProtocolException: Server doesn't support request ids.
+        """
+
+        if not manager.tagged:
+            raise ProtocolException('Server doesn\'t support request ids!')
+
+        self.manager = manager
+        self.ids = itertools.count()
+
+        # Requests waiting for responds: future, received responds and check of the last respond
+        self.waiting: Dict[int, Tuple[Future, List[ProtocolPacket], Callable[[ProtocolPacket], bool]]] = {}
+        self.lock = threading.Lock()
+        self.error = None
+
+        self.receiver = threading.Thread(target=self.receive, daemon=True)
+        self.receiver.start()
+
+    def request(self, packet: ProtocolPacket, is_last: Callable[[ProtocolPacket], bool] = None) -> Future:
+        """Sends the request.
+
+        Args:
+            packet: Request to send.
+            is_last: Checks if a respond is the last one to the request.
+                If None, the request has a single respond.
+
+        Returns:
+            Future giving the respond. If is_last is given, the list of responds up to the last one.
+        """
+
+        future = Future()
+
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+
+            request_id = next(self.ids) % (REQUEST_ID_LIMIT - 1) + 1
+
+            # Registered first, so the respond can't come before the request is known
+            self.waiting[request_id] = (future, [], is_last)
+
+        try:
+            self.manager.send(packet, request_id)
+
+        except Exception:
+            with self.lock:
+                self.waiting.pop(request_id, None)
+
+            raise
+
+        return future
+
+    def ask_range(self, start: int, count: int, direction: int = BlockchainProtocolPacket.RANGE_FORWARD,
+                  headers_only: bool = False) -> Future:
+        """Asks for a range of Blocks.
+
+        Returns:
+            Future giving the list of range responds, a deny comes as the last one. Decode them with manager decode_range.
+        """
+
+        ask = ProtocolOperations.LedgerAskRangeHeaders if headers_only else ProtocolOperations.LedgerAskRange
+        return self.request(ask(start, count, direction, self.manager.num_bytes), is_range_end)
+
+    def receive(self):
+        """Receiver thread. Completes futures of requests with their responds."""
+
+        try:
+            while True:
+                packet = self.manager.recv()
+
+                # Chunks are taken now, so the next respond could be read
+                if packet.remaining:
+                    packet.payload = self.manager.recv_payload(packet)
+
+                with self.lock:
+                    entry = self.waiting.get(packet.request_id)
+
+                    # Respond to no waiting request
+                    if entry is None:
+                        continue
+
+                    future, responds, is_last = entry
+
+                    if is_last is not None:
+                        responds.append(packet)
+
+                        if not is_last(packet):
+                            continue
+
+                    del self.waiting[packet.request_id]
+
+                future.set_result(responds if is_last is not None else packet)
+
+        except (OSError, ProtocolException) as exc:
+            self.fail(exc)
+
+    def fail(self, exc: Exception):
+        """Fails every waiting request with the exception."""
+
+        with self.lock:
+            self.error = exc
+            waiting = list(self.waiting.values())
+            self.waiting.clear()
+
+        for future, _, _ in waiting:
+            future.set_exception(exc)
+
+    def close(self):
+        """Closes the connection. Waiting requests fail."""
+
+        try:
+            self.manager.socket.shutdown(socket.SHUT_RDWR)
+
+        except OSError:
+            pass
+
+        self.manager.socket.close()
+        self.receiver.join()
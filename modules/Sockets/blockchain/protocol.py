@@ -1,13 +1,14 @@
 from socket import socket
-from typing import Literal, Type
+from typing import Iterable, List, Literal, Tuple, Type
 
 from ..protocol import ProtocolNetworkManager
 
-from modules.Blockchain.blockchain import Block, Blockchain, HashManager
+from modules.Blockchain.blockchain import Block, Blockchain, HashManager, InvalidHash
+from modules.Blockchain.mmr import mmr_mountains
 
 from modules.Protocol.blockchain.header import BlockchainProtocolPacket
 import modules.Protocol.blockchain.operations as ProtocolOperations
-from modules.Protocol.header import ProtocolPacket
+from modules.Protocol.header import ProtocolPacket, PacketSizeDiffersFromGivenValue
 
 
 class BlockchainNetworkManager(ProtocolNetworkManager):
@@ -17,8 +18,44 @@ class BlockchainNetworkManager(ProtocolNetworkManager):
         """Manager constructor."""
 
         self.hash_manager = hash_manager
+        self.num_bytes = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES
         super().__init__(socket, PACKET)
 
+    def use_features(self, features: int):
+        """Switches to features both sides support after hello.
+
+        Args:
+            features: Flags of features the other side supports.
+        """
+
+        features &= BlockchainProtocolPacket.SUPPORTED_FEATURES
+
+        if features & BlockchainProtocolPacket.FEATURE_WIDE_NUMBERS:
+            self.num_bytes = BlockchainProtocolPacket.PACKET_WIDE_BLOCK_SIZE_BYTES
+
+        if features & BlockchainProtocolPacket.FEATURE_PROTOCOL_V2:
+            self.version = BlockchainProtocolPacket.PROTOCOL_V2
+
+            if features & BlockchainProtocolPacket.FEATURE_CHUNKED_PACKETS:
+                self.chunked = True
+
+            if features & BlockchainProtocolPacket.FEATURE_REQUEST_IDS:
+                self.tagged = True
+
+    def decode_hello(self, packet: ProtocolPacket) -> Tuple[List[int], int]:
+        """Decodes received hello.
+
+        Args:
+            packet: Packet to decode.
+
+        Returns:
+            Ids of Hash algorithms and feature flags. No features if the other side doesn't tell them.
+        """
+
+        algorithm_ids, _, features = packet.payload.partition(b'\x00')
+
+        return list(algorithm_ids), features[0] if features else 0
+
     def decode_header(self, packet: ProtocolPacket) -> Blockchain:
         """Decodes received Blockchain Header.
         
@@ -29,23 +66,218 @@ class BlockchainNetworkManager(ProtocolNetworkManager):
             InvalidHash: Can't decode hash.
         """
 
-        num = packet.payload[:BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES]
+        num = packet.payload[:self.num_bytes]
         num = int.from_bytes(num, 'little')
 
-        hash = packet.payload[BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES:]
+        hash = packet.payload[self.num_bytes:]
 
         return Blockchain(hash, num)
 
+    def decode_hash(self, packet: ProtocolPacket) -> bytes:
+        """Decodes received Block Hash.
+        
+        Args:
+            packet: Packet to decode.
+
+        Raises:
+            InvalidHash: Hash doesn't match the current algorithm.
+        """
+
+        if not self.hash_manager.is_valid_hash(packet.payload):
+            raise InvalidHash('Received hash doesn\'t match the current algorithm!')
+
+        return packet.payload
+
+    def decode_hashes(self, data: bytes, count: int) -> List[bytes]:
+        """Splits concatenated hashes.
+
+        Raises:
+            InvalidHash: Data doesn't hold count of hashes.
+        """
+
+        size = self.hash_manager.get_hash_len()
+
+        if len(data) != count * size:
+            raise InvalidHash('Received hashes don\'t match the current algorithm!')
+
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def decode_proof(self, packet: ProtocolPacket) -> Tuple[int, int, List[bytes], List[bytes]]:
+        """Decodes received inclusion proof.
+        
+        Args:
+            packet: Packet to decode.
+
+        Returns:
+            Number of the Block, count of Blocks, siblings and peaks.
+
+        Raises:
+            InvalidHash: Can't decode hashes.
+        """
+
+        size = self.num_bytes
+        num = int.from_bytes(packet.payload[:size], 'little')
+        count = int.from_bytes(packet.payload[size:2 * size], 'little')
+
+        # Peaks are the last hashes, one for each mountain
+        mountains = mmr_mountains(count)
+        hashes = self.decode_hashes(packet.payload[2 * size:], (len(packet.payload) - 2 * size) // self.hash_manager.get_hash_len())
+
+        if len(hashes) < len(mountains):
+            raise InvalidHash('Received proof misses peaks!')
+
+        siblings = hashes[:len(hashes) - len(mountains)]
+        peaks = hashes[len(hashes) - len(mountains):]
+
+        return num, count, siblings, peaks
+
+    def decode_peaks(self, packet: ProtocolPacket) -> Tuple[int, List[bytes]]:
+        """Decodes received peaks.
+        
+        Args:
+            packet: Packet to decode.
+
+        Returns:
+            Count of Blocks and peaks.
+
+        Raises:
+            InvalidHash: Can't decode hashes.
+        """
+
+        size = self.num_bytes
+        count = int.from_bytes(packet.payload[:size], 'little')
+        peaks = self.decode_hashes(packet.payload[size:], len(mmr_mountains(count)))
+
+        return count, peaks
+
+    def send_range(self, blocks: Iterable[Block], headers_only: bool = False, request_id: int = 0) -> int:
+        """Sends Blocks of a range packed into as few responds as the frame budget lets.
+
+        Args:
+            blocks: Blocks of the range in the asked order.
+            headers_only: Send Blocks without data.
+            request_id: Id of the range request.
+
+        Returns:
+            Count of sent Blocks.
+
+        Raises:
+            PayloadSizeIsOutOfBounds: Block doesn't fit a Packet the other side takes.
+                Responds sent before it tell more Blocks follow, so answer with ServerDeny.
+        """
+
+        RESPOND = ProtocolOperations.LedgerRespondRangeHeaders if headers_only else ProtocolOperations.LedgerRespondRange
+        budget = BlockchainProtocolPacket.RANGE_LARGE_FRAME_BUDGET if self.chunked else BlockchainProtocolPacket.RANGE_FRAME_BUDGET
+
+        # Blocks of the respond are sent once the next one doesn't fit
+        frame = []
+        size = 1
+        count = 0
+
+        for block in blocks:
+            record_size = RESPOND.record_size(block, self.num_bytes)
+
+            if frame and size + record_size > budget:
+                self.send(RESPOND(frame, True, self.num_bytes), request_id)
+                frame = []
+                size = 1
+
+            frame.append(block)
+            size += record_size
+            count += 1
+
+        self.send(RESPOND(frame, False, self.num_bytes), request_id)
+
+        return count
+
+    def decode_range_ask(self, packet: ProtocolPacket) -> Tuple[int, int, int]:
+        """Decodes received range request.
+
+        Args:
+            packet: Packet to decode.
+
+        Returns:
+            Start number, count of Blocks and direction.
+        """
+
+        size = self.num_bytes
+        start = int.from_bytes(packet.payload[:size], 'little')
+        count = int.from_bytes(packet.payload[size:2 * size], 'little')
+        direction = packet.payload[2 * size] if len(packet.payload) > 2 * size else BlockchainProtocolPacket.RANGE_FORWARD
+
+        return start, count, direction
+
+    def decode_range(self, packet: ProtocolPacket) -> Tuple[List[Block], bool]:
+        """Decodes received range respond.
+
+        Blocks of LEDGER_RESPOND_RANGE_HEADERS have empty data.
+        Chunks of the Packet are received, so it must be the last received one.
+        
+        Args:
+            packet: Packet to decode.
+
+        Returns:
+            Blocks and whether more responds to the request follow.
+
+        Raises:
+            PacketSizeDiffersFromGivenValue: Respond is cut inside a Block.
+        """
+
+        payload = memoryview(self.recv_payload(packet))
+        headers_only = packet.operation == b'LEDGER_RESPOND_RANGE_HEADERS'
+
+        hash_size = self.hash_manager.get_hash_len()
+        header_size = self.num_bytes + 2 * hash_size
+        DATA_SIZE = BlockchainProtocolPacket.RANGE_DATA_SIZE
+
+        more = bool(payload[0] & BlockchainProtocolPacket.RANGE_MORE) if payload else False
+        blocks = []
+
+        start = 1
+        while start < len(payload):
+            end = start + header_size + (0 if headers_only else DATA_SIZE.size)
+
+            if end > len(payload):
+                raise PacketSizeDiffersFromGivenValue('Received range is cut inside a block!')
+
+            num = int.from_bytes(payload[start:start + self.num_bytes], 'little')
+            start += self.num_bytes
+
+            hash = bytes(payload[start:start + hash_size])
+            prev_hash = bytes(payload[start + hash_size:start + 2 * hash_size])
+            start += 2 * hash_size
+
+            data = b''
+            if not headers_only:
+                data_size, = DATA_SIZE.unpack_from(payload, start)
+                start = end
+
+                if start + data_size > len(payload):
+                    raise PacketSizeDiffersFromGivenValue('Received range is cut inside a block!')
+
+                data = bytes(payload[start:start + data_size])
+                start += data_size
+
+            blocks.append(Block(hash, prev_hash, num, data))
+
+        return blocks, more
+
     def decode_block(self, packet: ProtocolPacket, num_only: bool = False) -> Block:
         """Decodes received Block.
+
+        Data of a chunked Block is received chunk by chunk into its place,
+        so the Packet must be the last received one.
         
         Args:
             packet: Packet to decode.
+
+        Raises:
+            InvalidHash: Chunked Packet doesn't hold hashes in its first chunk.
         """
 
         # Num
         start = 0
-        end = BlockchainProtocolPacket.PACKET_BLOCK_SIZE_BYTES
+        end = self.num_bytes
         num = packet.payload[start:end]
         num = int.from_bytes(num, 'little')
 
@@ -66,4 +298,20 @@ class BlockchainNetworkManager(ProtocolNetworkManager):
         start = end
         data = packet.payload[start:]
 
+        if packet.remaining:
+            if len(prev_hash) != self.hash_manager.get_hash_len():
+                raise InvalidHash('Chunked block misses hashes!')
+
+            # Whole size is known, so data is put in place without regrowing
+            received = len(data)
+            data = bytearray(received + packet.remaining)
+            data[:received] = packet.payload[start:]
+
+            while packet.remaining:
+                chunk = self.recv_chunk(packet)
+                data[received:received + len(chunk)] = chunk
+                received += len(chunk)
+
+            data = bytes(data)
+
         return Block(hash, prev_hash, num, data)
\ No newline at end of file
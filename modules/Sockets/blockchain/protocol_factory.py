@@ -1,7 +1,10 @@
 import socket
 from typing import Type
 
-from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+from modules.Blockchain.blockchain import HashManager
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver, HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+from modules.Blockchain.utils.Drivers.hash import InvalidHashAlgorithm, get_hash_algorithm, is_hash_available
+import modules.Protocol.blockchain.operations as ProtocolOperations
 from .protocol import BlockchainNetworkManager
 
 
@@ -9,9 +12,65 @@ class BlockchainNetworkManagerFactory:
     """Factory for BlockchainNetworkManager class."""
 
     @staticmethod
-    def create(socket: socket.socket, PACKET: Type) -> BlockchainNetworkManager:
-        """Creates BlockchainNetworkManager."""
+    def create(socket: socket.socket, PACKET: Type, hash_manager: HashManager = None) -> BlockchainNetworkManager:
+        """Creates BlockchainNetworkManager.
 
-        hash_manager = HashManagerDriver()
+        Args:
+            socket: Socket of the peer.
+            PACKET: Packet class of the protocol.
+            hash_manager: Hash Manager of the served Blockchain.
+                If None, the one of DEFAULT_HASH_ALGORITHM is used.
+        """
 
-        return BlockchainNetworkManager(hash_manager, socket, PACKET)
\ No newline at end of file
+        if hash_manager is None:
+            hash_manager = HashManagerDriver()
+
+        return BlockchainNetworkManager(hash_manager, socket, PACKET)
+
+    @staticmethod
+    def negotiate(socket: socket.socket, PACKET: Type, hash_manager: HashManager = None) -> BlockchainNetworkManager:
+        """Creates BlockchainNetworkManager using the Hash algorithm of the server.
+
+        Says hello to the connected server before any other operation.
+        Protocol features both sides support are used afterwards.
+        Servers answering hello with anything else don't know it,
+        so DEFAULT_HASH_ALGORITHM is used without features.
+
+        Args:
+            socket: Socket of the connected server.
+            PACKET: Packet class of the protocol.
+            hash_manager: Hash Manager the Blocks must be hashed with.
+                If None, every available algorithm is offered, DEFAULT_HASH_ALGORITHM first.
+
+        Raises:
+            InvalidHashAlgorithm: Server uses an algorithm which wasn't offered.
+                Servers not knowing hello use DEFAULT_HASH_ALGORITHM.
+        """
+
+        if hash_manager is None:
+            algorithms = sorted((name for name in HASH_ALGORITHMS if is_hash_available(name)), key=lambda name: name != DEFAULT_HASH_ALGORITHM)
+            algorithm_ids = [HASH_ALGORITHMS[name] for name in algorithms]
+
+        else:
+            algorithm_ids = [hash_manager.get_algorithm_id()]
+
+        manager = BlockchainNetworkManager(hash_manager or HashManagerDriver(), socket, PACKET)
+        manager.send(ProtocolOperations.ProtocolHello(algorithm_ids, PACKET.SUPPORTED_FEATURES))
+
+        respond = manager.recv()
+
+        if respond.operation == b'PROTOCOL_HELLO':
+            chosen, features = manager.decode_hello(respond)
+
+        else:
+            chosen, features = [HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]], 0
+
+        if len(chosen) != 1 or chosen[0] not in algorithm_ids:
+            raise InvalidHashAlgorithm('Server uses another hash algorithm!')
+
+        if chosen[0] != manager.hash_manager.get_algorithm_id():
+            manager.hash_manager = HashManagerDriver(get_hash_algorithm(chosen[0]))
+
+        manager.use_features(features)
+
+        return manager
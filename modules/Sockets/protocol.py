@@ -1,14 +1,50 @@
-from typing import Type
+from typing import Tuple, Type
 from modules.Protocol.header import ProtocolPacket
 import modules.Protocol.header as protocol
 
+import select
 import socket
+import threading
+from socket import IPPROTO_TCP, TCP_NODELAY
+
+
+RECV_BUFFER_SIZE = 1 << 16
+"""Size in bytes of the receive buffer of a connection.
+
+Fits dozens of max sized Packets, so one recv usually brings several of them.
+"""
+
+SEND_BUFFER_SIZE = 1 << 16
+"""Max size in bytes of frames of a chunked Packet sent with one call."""
 
 
 class ProtocolNetworkManager:
     """Class used to handle network operations related with Protocol.
     
     Use this class to Receive and Send Protocol Packets.
+
+    Usage:
+        Received bytes are kept in a buffer of the connection, so a Packet split
+        by the network is completed by the next reads and Packets which came
+        together are taken from the buffer without reading the socket.
+        Every Packet is sent with one call, small Packets are not delayed by Nagle.
+
+        Packets are sent and received in the format of self.version.
+        Every connection starts with PROTOCOL_V1, so peers not knowing
+        other versions keep working. Switch only when both sides agreed.
+
+        Payloads over HEADER_PAYLOAD_MAX_SIZE are sent in chunks if self.chunked.
+        Only the first chunk is received with the Packet, the rest is read by recv_chunk,
+        so neither side keeps more than a buffer of frames. Chunks left unread
+        are skipped by the next recv.
+
+        If self.tagged, binary frames carry request ids. Every Packet,
+        chunks included, is sent under a lock, so several threads can send responds.
+        Only one thread should receive from a manager at a time.
+
+        If self.frame_timeout is set, a Packet started by the other side must be
+        finished in time. Waiting for the next Packet is never timed out,
+        so idle connections are kept. Socket timeout isn't touched, sends aren't limited.
     """
 
     def __init__(self, socket: socket.socket, PACKET: Type) -> None:
@@ -20,28 +56,163 @@ class ProtocolNetworkManager:
 
         self.socket = socket
         self.PACKET = PACKET
+        self.version = PACKET.PROTOCOL_V1
+        self.chunked = False
+        self.tagged = False
+        self.frame_timeout = None
+        self.send_lock = threading.Lock()
+
+        # Received chunked Packet with chunks left
+        self.chunked_packet = None
+
+        # Received bytes are buffer[start:end]
+        self.buffer = bytearray(max(RECV_BUFFER_SIZE, PACKET.PACKET_SIZE_BYTES + PACKET.PACKET_MAX_SIZE))
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+        # Not a TCP socket
+        try:
+            socket.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+        except OSError:
+            pass
+
+    def can_send(self, header: ProtocolPacket) -> bool:
+        """Checks if the Packet fits the agreed protocol."""
+
+        return len(header.payload) <= self.PACKET.HEADER_PAYLOAD_MAX_SIZE or self.chunked
 
-    def send(self, header: ProtocolPacket) -> int:
+    def send(self, header: ProtocolPacket, request_id: int = None) -> int:
         """Sends Protocol Packet to the network.
 
         Args:
             header: Packet to be sent.
+            request_id: Id of the request the Packet answers. If None, request_id of the Packet.
+                Sent only if self.tagged.
 
         Returns:
-            Returns whatever socket.send function returns.
+            Count of sent bytes.
+
+        Raises:
+            PayloadSizeIsOutOfBounds: Payload is too large for the agreed protocol.
         """
 
-        data = b''
-        data += header.operation
-        data += header.payload
-        data += header.delimiter
+        if not self.can_send(header):
+            raise protocol.PayloadSizeIsOutOfBounds('Payload is too large for the other side!')
+
+        if request_id is None:
+            request_id = header.request_id
+
+        if self.version == self.PACKET.PROTOCOL_V2:
+            if len(header.payload) > self.PACKET.HEADER_PAYLOAD_MAX_SIZE:
+                with self.send_lock:
+                    return self.send_chunked(header, request_id)
+
+            data = self.pack_frame(len(header.payload), self.PACKET.OPERATION_CODES[header.operation], request_id) + header.payload
+
+        else:
+            data = b''.join((
+                int.to_bytes(header.size, self.PACKET.PACKET_SIZE_BYTES, 'little'),
+                header.operation,
+                header.payload,
+                header.delimiter,
+            ))
+
+        # Size and Packet go together, partial sends are finished by sendall
+        with self.send_lock:
+            self.socket.sendall(data)
 
-        # Send the Packet size
-        size = int.to_bytes(header.size, self.PACKET.PACKET_SIZE_BYTES, 'little')
-        self.socket.send(size)
+        return len(data)
 
-        # Send the Packet itself
-        return self.socket.send(data)
+    def pack_frame(self, size: int, code: int, request_id: int = 0) -> bytes:
+        """Packs the header of a binary frame."""
+
+        if self.tagged:
+            return self.PACKET.TAGGED_HEADER.pack(size, code, request_id)
+
+        return self.PACKET.BINARY_HEADER.pack(size, code)
+
+    def send_chunked(self, header: ProtocolPacket, request_id: int = 0) -> int:
+        """Sends the Packet in chunks of HEADER_PAYLOAD_MAX_SIZE.
+
+        Frames are collected up to SEND_BUFFER_SIZE and sent together.
+        Called holding send_lock, so frames of other Packets don't come between them.
+
+        Returns:
+            Count of sent bytes.
+        """
+
+        frame_size = len(self.pack_frame(0, 0))
+        chunk_size = self.PACKET.HEADER_PAYLOAD_MAX_SIZE
+        payload = memoryview(header.payload)
+
+        # First frame tells the whole size
+        first = chunk_size - self.PACKET.LARGE_SIZE.size
+
+        data = bytearray()
+        data += self.pack_frame(chunk_size, self.PACKET.OPERATION_CODES[header.operation] | self.PACKET.CHUNKED_FLAG, request_id)
+        data += self.PACKET.LARGE_SIZE.pack(len(payload))
+        data += payload[:first]
+
+        sent = 0
+        for start in range(first, len(payload), chunk_size):
+            chunk = payload[start:start + chunk_size]
+
+            if len(data) + frame_size + len(chunk) > SEND_BUFFER_SIZE:
+                self.socket.sendall(data)
+                sent += len(data)
+                data.clear()
+
+            data += self.pack_frame(len(chunk), self.PACKET.CONTINUATION_CODE, request_id)
+            data += chunk
+
+        self.socket.sendall(data)
+
+        return sent + len(data)
+
+    def pending(self) -> int:
+        """Gives the count of received bytes not taken by Packets yet."""
+
+        return self.end - self.start
+
+    def fill(self, size: int):
+        """Reads the socket until the buffer keeps at least size bytes.
+
+        Args:
+            size: Count of bytes needed from the buffer start.
+
+        Raises:
+            ConnectionResetError: The other side closed the connection between Packets.
+            PacketSizeDiffersFromGivenValue: The other side closed the connection inside a Packet.
+            socket.timeout: Started Packet wasn't finished within self.frame_timeout.
+        """
+
+        while self.end - self.start < size:
+            # Only a started Packet or chunks left of one are timed out
+            if self.frame_timeout is not None and (self.start != self.end or self.chunked_packet is not None):
+                if not select.select([self.socket], [], [], self.frame_timeout)[0]:
+                    raise socket.timeout('Packet wasn\'t finished in time!')
+
+            # Move the kept bytes to the front if the rest doesn't fit
+            if self.start + size > len(self.buffer):
+                kept = self.end - self.start
+                self.buffer[:kept] = self.buffer[self.start:self.end]
+                self.start, self.end = 0, kept
+
+            received = self.socket.recv_into(self.view[self.end:])
+
+            if received == 0:
+                if self.start == self.end:
+                    raise ConnectionResetError('Connection closed!')
+
+                # Cut Packet is dropped, so the next read tells about the closed connection
+                got = self.end - self.start
+                self.start = self.end = 0
+
+                raise protocol.PacketSizeDiffersFromGivenValue(f'Got {got} bytes. Expected {size} bytes!')
+
+            self.end += received
 
     def recv(self) -> ProtocolPacket:
         """Receives Protocol Packet from the network.
@@ -51,21 +222,44 @@ class ProtocolNetworkManager:
 
         Raises:
             PacketSizeIsOutOfBounds: When received invalid Packet size.
+            PacketSizeDiffersFromGivenValue: Connection was closed inside a Packet.
             UnknownOperation: When couldn't decode an operation.
+            ConnectionResetError: Connection was closed.
         """
 
+        self.skip_chunks()
+
+        if self.version == self.PACKET.PROTOCOL_V2:
+            return self.recv_binary()
+
+        return self.recv_text()
+
+    def take(self, start: int, size: int) -> bytes:
+        """Takes size bytes of the buffer from start, where the next Packet begins."""
+
+        data = bytes(self.view[start:start + size])
+
+        self.start = start + size
+        if self.start == self.end:
+            self.start = self.end = 0
+
+        return data
+
+    def recv_text(self) -> ProtocolPacket:
+        """Receives PROTOCOL_V1 Packet."""
+
         # Get Packet Size
-        size = self.socket.recv(self.PACKET.PACKET_SIZE_BYTES)
-        size = int.from_bytes(size, 'little')
+        size_bytes = self.PACKET.PACKET_SIZE_BYTES
+        self.fill(size_bytes)
+
+        size = int.from_bytes(self.view[self.start:self.start + size_bytes], 'little')
 
         if size > self.PACKET.PACKET_MAX_SIZE:
             raise protocol.PacketSizeIsOutOfBounds('Packet size is too big!')
 
         # Get Packet
-        data = self.socket.recv(size)
-
-        if len(data) != size:
-            raise protocol.PacketSizeDiffersFromGivenValue(f'Got {len(data)} bytes. Expected {size} bytes!')
+        self.fill(size_bytes + size)
+        data = self.take(self.start + size_bytes, size)
 
         # Decode operation
         operation = None
@@ -86,4 +280,129 @@ class ProtocolNetworkManager:
         # Collect received data to the TestHeader
         header = self.PACKET(size=size, operation=operation, payload=payload, delimiter=delimiter)
 
-        return header
\ No newline at end of file
+        return header
+
+    def recv_frame_header(self) -> Tuple[int, int, int, int]:
+        """Receives the header of the next binary frame.
+
+        Returns:
+            Size of the header, payload size, operation code and request id. Id is 0 if not self.tagged.
+        """
+
+        if self.tagged:
+            HEADER = self.PACKET.TAGGED_HEADER
+            self.fill(HEADER.size)
+
+            return (HEADER.size, *HEADER.unpack_from(self.buffer, self.start))
+
+        HEADER = self.PACKET.BINARY_HEADER
+        self.fill(HEADER.size)
+
+        return (HEADER.size, *HEADER.unpack_from(self.buffer, self.start), 0)
+
+    def recv_binary(self) -> ProtocolPacket:
+        """Receives PROTOCOL_V2 Packet.
+
+        Only the first chunk of a chunked Packet is received.
+        """
+
+        # Get Packet Header
+        header_size, size, code, request_id = self.recv_frame_header()
+
+        if size > self.PACKET.HEADER_PAYLOAD_MAX_SIZE:
+            raise protocol.PacketSizeIsOutOfBounds('Packet size is too big!')
+
+        # Decode operation
+        operation = self.PACKET.OPERATIONS_BY_CODE[code & ~self.PACKET.CHUNKED_FLAG]
+
+        if operation is None or code & self.PACKET.CHUNKED_FLAG and not self.chunked:
+            raise protocol.UnknownOperation(f'Unknown operation code {code}!')
+
+        # Get Payload
+        self.fill(header_size + size)
+
+        if not code & self.PACKET.CHUNKED_FLAG:
+            payload = self.take(self.start + header_size, size)
+
+            header = self.PACKET(operation=operation, payload=payload)
+            header.request_id = request_id
+
+            return header
+
+        # Chunked Payload
+        LARGE_SIZE = self.PACKET.LARGE_SIZE
+
+        if size < LARGE_SIZE.size:
+            raise protocol.PacketSizeDiffersFromGivenValue('Chunked Packet misses its size!')
+
+        total, = LARGE_SIZE.unpack_from(self.buffer, self.start + header_size)
+
+        if total > self.PACKET.HEADER_LARGE_PAYLOAD_MAX_SIZE or total < size - LARGE_SIZE.size:
+            raise protocol.PacketSizeIsOutOfBounds('Chunked Packet size is out of bounds!')
+
+        payload = self.take(self.start + header_size + LARGE_SIZE.size, size - LARGE_SIZE.size)
+
+        header = self.PACKET(operation=operation, payload=payload)
+        header.remaining = total - len(payload)
+        header.request_id = request_id
+
+        if header.remaining:
+            self.chunked_packet = header
+
+        return header
+
+    def recv_chunk(self, header: ProtocolPacket) -> bytes:
+        """Receives the next chunk of Payload of the last received Packet.
+
+        Args:
+            header: Last received Packet with chunks left.
+
+        Returns:
+            Chunk of Payload.
+
+        Raises:
+            ProtocolException: Packet is not the last received one or has no chunks left.
+            UnknownOperation: Next frame doesn't continue the Packet.
+            PacketSizeIsOutOfBounds: Chunk is greater than the Payload left.
+        """
+
+        if header is not self.chunked_packet or not header.remaining:
+            raise protocol.ProtocolException('Packet has no chunks to receive!')
+
+        header_size, size, code, request_id = self.recv_frame_header()
+
+        if code != self.PACKET.CONTINUATION_CODE or request_id != header.request_id:
+            raise protocol.UnknownOperation('Chunked Packet isn\'t continued!')
+
+        if size == 0 or size > min(header.remaining, self.PACKET.HEADER_PAYLOAD_MAX_SIZE):
+            raise protocol.PacketSizeIsOutOfBounds('Chunk size is out of bounds!')
+
+        self.fill(header_size + size)
+        chunk = self.take(self.start + header_size, size)
+
+        header.remaining -= size
+        if not header.remaining:
+            self.chunked_packet = None
+
+        return chunk
+
+    def recv_payload(self, header: ProtocolPacket) -> bytes:
+        """Receives the whole Payload of the last received Packet, chunks included."""
+
+        if not header.remaining:
+            return header.payload
+
+        payload = bytearray(header.payload)
+
+        while header.remaining:
+            payload += self.recv_chunk(header)
+
+        return bytes(payload)
+
+    def skip_chunks(self):
+        """Skips chunks of the last received Packet nobody read."""
+
+        header = self.chunked_packet
+
+        while header is not None and header.remaining:
+            self.recv_chunk(header)
\ No newline at end of file
@@ -10,6 +10,7 @@ from modules.Blockchain.validation_utils.factories import ServerBlockchainFactor
 from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
 
 from modules.Network.servers import TRUSTED_SERVERS
+from modules.Network.checkpoints import TRUSTED_CHECKPOINTS
 
 from .blockchain import print_block, print_blockchain
 
@@ -50,7 +51,7 @@ manager.send(header)
 
 # Get Header
 header = manager.recv()
-chain = ServerBlockchainFactory().create(manager.decode_header(header))
+chain = ServerBlockchainFactory().create(manager.decode_header(header), checkpoints=TRUSTED_CHECKPOINTS)
 
 # Ask Ledger
 header = ProtocolOperations.LedgerAsk()
@@ -67,9 +68,7 @@ if chain.num > 0:
 stored_chain = StoredBlockchainFactory().create('client')
 stored_chain.clear()
 
-for n in range(0, chain.num):
-    block = chain.get_block(n)
-    stored_chain.append_block(block)
+stored_chain.append_blocks(list(chain.iter_blocks()))
 
 # stored_chain.append_block(Block(b'', b'', 0, b"Helol!"))
 
@@ -39,8 +39,7 @@ header = manager.recv()
 print_header(header)
 
 # Send LEDGER_RESPOND_BLOCK
-for n in range(chain.num, 0, -1):
-    block = chain.get_block(n)
+for block in chain.iter_blocks(reverse=True):
     header = ProtocolOperations.LedgerRespondBlock(block)
     manager.send(header)
     print_header(header)
\ No newline at end of file
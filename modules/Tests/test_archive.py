@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block, InvalidLink
+from modules.Blockchain.storage_utils.archive import export_blockchain, import_blockchain, InvalidArchive, ARCHIVE_HEADER
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+
+
+BLOCKS_COUNT = 30
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.factory = StoredBlockchainFactory()
+        self.archive = os.path.join(self.directory.name, 'archive')
+
+        path = os.path.join(self.directory.name, 'source')
+        chain = self.factory.create(path, 'segment')
+
+        for n in range(BLOCKS_COUNT):
+            chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+        chain.close()
+
+        chain = self.factory.create(path, lazy=True, read_only=True)
+        self.hashes = [block.hash for block in chain.iter_blocks(1)]
+        self.assertEqual(export_blockchain(chain, self.archive), BLOCKS_COUNT)
+        chain.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def target(self, driver: str = 'segment', **options):
+        return self.factory.create(os.path.join(self.directory.name, driver), driver, **options)
+
+    def corrupt(self, offset: int):
+        with open(self.archive, 'r+b') as archive:
+            archive.seek(offset, os.SEEK_SET if offset >= 0 else os.SEEK_END)
+            byte = archive.read(1)
+            archive.seek(-1, os.SEEK_CUR)
+            archive.write(bytes([byte[0] ^ 1]))
+
+    def test_round_trip(self):
+        for driver in ('file', 'segment', 'sqlite'):
+            chain = self.target(driver)
+            self.assertEqual(import_blockchain(chain, self.archive), BLOCKS_COUNT)
+            chain.close()
+
+            chain = self.target(driver)
+            self.assertEqual([block.hash for block in chain.iter_blocks(1)], self.hashes, driver)
+            self.assertEqual(chain.get_block_by_hash(self.hashes[5]).num, 6)
+            chain.close()
+
+    def test_corrupt_digest(self):
+        """Nothing is stored from an archive with a wrong digest."""
+
+        self.corrupt(-1)
+
+        chain = self.target()
+        with self.assertRaises(InvalidArchive):
+            import_blockchain(chain, self.archive)
+
+        self.assertEqual(len(chain), 0)
+        chain.close()
+
+        chain = self.target()
+        self.assertEqual(len(chain), 0)
+        chain.close()
+
+    def test_corrupt_block(self):
+        # Last byte of the last Block data
+        with open(self.archive, 'rb') as archive:
+            size = len(archive.read())
+
+        self.corrupt(size - 33)
+
+        chain = self.target()
+        with self.assertRaises(Exception):
+            import_blockchain(chain, self.archive)
+
+        self.assertEqual(len(chain), 0)
+        chain.close()
+
+    def test_another_algorithm(self):
+        chain = self.target(hash_algorithm='sha256')
+
+        with self.assertRaises(InvalidArchive):
+            import_blockchain(chain, self.archive)
+
+        chain.close()
+
+    def test_truncated(self):
+        with open(self.archive, 'r+b') as archive:
+            archive.truncate(ARCHIVE_HEADER.size + 10)
+
+        chain = self.target()
+        with self.assertRaises(InvalidArchive):
+            import_blockchain(chain, self.archive)
+
+        self.assertEqual(len(chain), 0)
+        chain.close()
+
+    def test_verified_append_follows_tip(self):
+        source = self.factory.create(os.path.join(self.directory.name, 'source'), lazy=True, read_only=True)
+        blocks = list(source.iter_blocks(1))
+        source.close()
+
+        chain = self.target()
+
+        with self.assertRaises(InvalidLink):
+            chain.append_blocks(blocks[1:], verified=True)
+
+        chain.append_blocks(blocks, verified=True)
+        self.assertEqual(chain.hash, self.hashes[-1])
+        chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import random
+import unittest
+
+from modules.Blockchain.blockchain import Block, BlockTable, BLOCK_TABLE_RECENT_SIZE
+
+
+def random_block(rnd: random.Random, num: int) -> Block:
+    """Builds a Block with hashes of the usual size, sometimes of another one."""
+
+    size = rnd.choice((20, 20, 20, 0))
+    prev_size = size if rnd.random() < 0.9 else 3
+
+    return Block(os.urandom(size), os.urandom(prev_size), num, os.urandom(rnd.randint(0, 5)))
+
+
+def fields(block: Block) -> tuple:
+    return block.hash, block.prev_hash, block.num, block.data
+
+
+class BlockTableTest(unittest.TestCase):
+    def test_matches_list(self):
+        """Random list operations give the same Blocks as a list."""
+
+        rnd = random.Random(3)
+        blocks, table = [], BlockTable()
+
+        for step in range(3000):
+            count = len(blocks)
+            num = rnd.choice((count + 1, rnd.randint(0, 50), 1))
+            operation = rnd.random()
+
+            if operation < 0.35 or count == 0:
+                block = random_block(rnd, num)
+                blocks.append(block)
+                table.append(block)
+
+            elif operation < 0.55:
+                index = rnd.randint(-count, count)
+                block = random_block(rnd, num)
+                blocks.insert(index, block)
+                table.insert(index, block)
+
+            elif operation < 0.75:
+                index = rnd.randrange(count)
+                block = random_block(rnd, num)
+                blocks[index] = block
+                table[index] = block
+
+            elif operation < 0.97:
+                index = rnd.randrange(-count, count)
+                del blocks[index]
+                del table[index]
+
+            else:
+                blocks.clear()
+                table.clear()
+
+            self.assertEqual(len(table), len(blocks))
+            self.assertEqual([fields(block) for block in table], [fields(block) for block in blocks], step)
+            self.assertEqual([fields(table[index]) for index in range(len(table))], [fields(block) for block in blocks], step)
+
+    def test_iter_range(self):
+        blocks = [Block(bytes([n]) * 8, bytes([n - 1]) * 8, n, b'') for n in range(1, 11)]
+        table = BlockTable(blocks)
+
+        self.assertEqual([block.num for block in table.iter_range(range(9, -1, -3))], [10, 7, 4, 1])
+        self.assertEqual([block.num for block in table.iter_range(range(8, 20))], [9, 10])
+
+    def test_tip_is_kept(self):
+        first = Block(b'a' * 4, b'\0' * 4, 1, b'')
+        second = Block(b'b' * 4, b'a' * 4, 2, b'')
+        table = BlockTable([first, second])
+
+        self.assertIs(table[-1], second)
+        self.assertIsNot(table[0], first)
+
+        del table[1]
+        self.assertEqual(fields(table[-1]), fields(first))
+
+        table[0] = second
+        self.assertIs(table[0], second)
+
+    def test_recent_blocks_are_shared(self):
+        count = 3 * BLOCK_TABLE_RECENT_SIZE
+        table = BlockTable(Block(bytes([n % 256]) * 8, bytes([(n - 1) % 256]) * 8, n, b'') for n in range(1, count + 1))
+
+        self.assertIs(table[count - 2], table[count - 2])
+        self.assertIsNot(table[0], table[0])
+
+        # Rows the table grew past are dropped
+        for n in range(count + 1, count + 3 * BLOCK_TABLE_RECENT_SIZE):
+            table.append(Block(bytes([n % 256]) * 8, bytes([(n - 1) % 256]) * 8, n, b''))
+            table[n - 2]
+
+        self.assertLessEqual(len(table.recent), 2 * BLOCK_TABLE_RECENT_SIZE)
+
+        # Kept Blocks follow the rows they were read from
+        index = len(table) - 3
+        kept = table[index]
+        del table[index - 1]
+        self.assertEqual(fields(table[index - 1]), fields(kept))
+        self.assertNotEqual(fields(table[index]), fields(kept))
+
+    def test_links_and_numbers(self):
+        blocks = [Block(bytes([n]) * 8, bytes([n - 1]) * 8, n, b'') for n in range(1, 11)]
+        table = BlockTable(blocks)
+
+        self.assertIsNone(table.find_broken_link())
+        self.assertIsNone(table.find_misnumbered(1))
+        self.assertEqual(len(table.run_starts), 1)
+
+        table[4] = Block(b'x' * 8, bytes([4]) * 8, 7, b'')
+
+        self.assertEqual(table.find_broken_link(), 5)
+        self.assertEqual(table.find_misnumbered(1), 4)
+        self.assertEqual(table.find_misnumbered(2), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
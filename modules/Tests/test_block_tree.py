@@ -0,0 +1,81 @@
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.validation_utils.factories import BlockTreeFactory
+from modules.Blockchain.block_tree import BLOCK_KNOWN, BLOCK_EXTENDED, BLOCK_SIDE, BLOCK_REORGANIZED, BLOCK_ORPHAN, BLOCK_STALE, BLOCK_FORK, MAX_FORK_DEPTH
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 10
+
+
+class BlockTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+
+        self.chain = ValidatedBlockchain(self.hash_manager, [Block(b'', b'', 0, b'main %d' % n) for n in range(BLOCKS_COUNT)])
+        self.tree = BlockTreeFactory().create(self.chain)
+
+    def branch(self, fork: int, count: int) -> list:
+        """Builds valid Blocks following Block fork of the best chain."""
+
+        blocks = [Block(b'', b'', 0, self.chain.get_block(n).data) for n in range(1, fork + 1)]
+        blocks += [Block(b'', b'', 0, b'side %d' % n) for n in range(count)]
+
+        chain = ValidatedBlockchain(self.hash_manager, blocks)
+        return [chain.get_block(n) for n in range(fork + 1, fork + count + 1)]
+
+    def test_reorganize(self):
+        """Side branch getting ahead replaces the suffix, replaced Blocks stay as a side branch."""
+
+        main = [self.chain.get_block(n) for n in range(7, BLOCKS_COUNT + 1)]
+        side = self.branch(6, 5)
+
+        for block in side[:4]:
+            self.assertEqual(self.tree.add_block(block), BLOCK_SIDE)
+
+        self.assertEqual(self.tree.add_block(side[4]), BLOCK_REORGANIZED)
+        self.assertEqual(self.chain.hash, side[4].hash)
+        self.assertEqual(self.chain.get_block(7).hash, side[0].hash)
+
+        for block in main:
+            self.assertTrue(self.tree.is_known(block.hash))
+
+        self.assertEqual(self.tree.add_block(side[2]), BLOCK_KNOWN)
+
+    def test_orphans(self):
+        blocks = self.branch(BLOCKS_COUNT, 3)
+
+        self.assertEqual(self.tree.add_block(blocks[2]), BLOCK_ORPHAN)
+        self.assertEqual(self.tree.add_block(blocks[1]), BLOCK_ORPHAN)
+        self.assertEqual(self.tree.add_block(blocks[0]), BLOCK_EXTENDED)
+        self.assertEqual(self.chain.hash, blocks[2].hash)
+
+    def test_depth_limit(self):
+        tip = self.branch(BLOCKS_COUNT, MAX_FORK_DEPTH)
+        self.chain = ValidatedBlockchain(self.hash_manager, [self.chain.get_block(n) for n in range(1, BLOCKS_COUNT + 1)] + tip)
+        self.tree = BlockTreeFactory().create(self.chain)
+
+        self.assertEqual(self.tree.add_block(self.branch(BLOCKS_COUNT - 1, 1)[0]), BLOCK_STALE)
+        self.assertEqual(self.tree.add_block(self.branch(BLOCKS_COUNT + 1, 1)[0]), BLOCK_SIDE)
+
+    def test_extend_only(self):
+        """Untrusted Blocks can't start side branches or rewrite the best chain."""
+
+        side = self.branch(6, 5)
+
+        for block in side:
+            self.assertEqual(self.tree.add_block(block, extend_only=True), BLOCK_FORK)
+
+        self.assertEqual(self.tree.add_block(self.branch(BLOCKS_COUNT, 2)[1], extend_only=True), BLOCK_FORK)
+        self.assertEqual(self.tree.side_blocks, {})
+        self.assertEqual(self.tree.orphan_count, 0)
+
+        block = self.branch(BLOCKS_COUNT, 1)[0]
+        self.assertEqual(self.tree.add_block(block, extend_only=True), BLOCK_EXTENDED)
+        self.assertEqual(self.chain.hash, block.hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
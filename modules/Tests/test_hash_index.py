@@ -0,0 +1,162 @@
+import os
+import random
+import tempfile
+import unittest
+
+import modules.Blockchain.storage_utils.hash_index as hash_index
+from modules.Blockchain.blockchain import Block, Blockchain, HashIndex
+from modules.Blockchain.storage_utils.hash_index import HashIndexFile
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+
+
+HASH_SIZE = 32
+
+
+class HashIndexTest(unittest.TestCase):
+    def test_matches_dict(self):
+        """Every added record is found until it's discarded."""
+
+        rnd = random.Random(1)
+        index, records = HashIndex(), {}
+
+        for step in range(5000):
+            if rnd.random() < 0.7 or not records:
+                hash, num = os.urandom(HASH_SIZE), rnd.randint(1, 1000)
+                index.add(hash, num)
+                records[hash] = num
+
+            else:
+                hash = rnd.choice(list(records))
+                index.discard(hash, records.pop(hash))
+
+            self.assertEqual(len(index), len(records))
+
+        for hash, num in records.items():
+            self.assertEqual(index.find(hash), [num])
+
+        self.assertEqual(index.find(os.urandom(HASH_SIZE)), [])
+
+    def test_shared_key(self):
+        """Hashes with the same first bytes keep both records."""
+
+        first, second = b'k' * 8 + b'a' * 24, b'k' * 8 + b'b' * 24
+        index = HashIndex()
+        index.add(first, 1)
+        index.add(second, 2)
+
+        self.assertEqual(sorted(index.find(first)), [1, 2])
+
+        chain = Blockchain(second, 2, [Block(first, b'\0' * 32, 1, b''), Block(second, first, 2, b'')])
+        self.assertEqual(chain.get_block_by_hash(first).num, 1)
+        self.assertEqual(chain.get_block_by_hash(second).num, 2)
+
+    def test_outdated_record(self):
+        chain = Blockchain(b'a' * 32, 1, [Block(b'a' * 32, b'\0' * 32, 1, b'')])
+        chain.set_block(Block(b'b' * 32, b'\0' * 32, 1, b''), 0)
+
+        self.assertIsNone(chain.get_block_by_hash(b'a' * 32))
+        self.assertEqual(chain.get_block_by_hash(b'b' * 32).num, 1)
+        self.assertEqual(len(chain.hash_index), 1)
+
+
+class HashIndexFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'hash_index')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_merge_and_reopen(self):
+        """Records are found before and after a merge, outdated ones are dropped by it."""
+
+        tail = hash_index.HASH_INDEX_TAIL
+        hash_index.HASH_INDEX_TAIL = 8
+
+        try:
+            file = HashIndexFile(self.path, HASH_SIZE)
+            self.assertEqual(file.open(), 0)
+
+            hashes = {num: os.urandom(HASH_SIZE) for num in range(1, 31)}
+            file.append(((hashes[num], num) for num in range(1, 31)), 30, 30)
+
+            # Block 5 got another hash, Blocks after 25 were removed
+            old = hashes[5]
+            hashes[5] = os.urandom(HASH_SIZE)
+            file.append([(hashes[5], 5)], 25, 25)
+            file.merge(25)
+
+            self.assertEqual(file.sorted, 25)
+            self.assertIsNone(file.find(old))
+
+            file.close()
+
+            file = HashIndexFile(self.path, HASH_SIZE)
+            self.assertEqual(file.open(), 25)
+
+            for num in range(1, 26):
+                self.assertEqual(file.find(hashes[num]), num)
+
+            file.close()
+
+        finally:
+            hash_index.HASH_INDEX_TAIL = tail
+
+    def test_torn_record(self):
+        file = HashIndexFile(self.path, HASH_SIZE)
+        file.open()
+        hash = os.urandom(HASH_SIZE)
+        file.append([(hash, 1)], 1, 1)
+        file.close()
+
+        with open(self.path, 'ab') as raw:
+            raw.write(b'torn')
+
+        file = HashIndexFile(self.path, HASH_SIZE)
+        self.assertEqual(file.open(), 1)
+        self.assertEqual(file.find(hash), 1)
+        file.close()
+
+    def test_damaged_file(self):
+        with open(self.path, 'wb') as raw:
+            raw.write(b'junk')
+
+        file = HashIndexFile(self.path, HASH_SIZE)
+        self.assertEqual(file.open(writable=False), 0)
+        self.assertEqual(file.open(), 0)
+        file.close()
+
+
+class StoredHashIndexTest(unittest.TestCase):
+    def test_lazy_lookup(self):
+        """Lazily opened storage finds stored Blocks in the file without loading the index."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'chain')
+            factory = StoredBlockchainFactory()
+
+            chain = factory.create(path, 'segment')
+
+            for n in range(50):
+                chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+            hashes = [chain.get_block(num).hash for num in range(1, 51)]
+            chain.close()
+
+            # Load writes the snapshot, so the next one doesn't rehash Blocks
+            factory.create(path).close()
+
+            chain = factory.create(path, lazy=True)
+            self.assertEqual(len(chain.hash_index), 0)
+
+            for num, hash in enumerate(hashes, 1):
+                self.assertEqual(chain.get_block_by_hash(hash).num, num)
+
+            self.assertEqual(len(chain.hash_index), 0)
+            self.assertIsNone(chain.get_block_by_hash(os.urandom(len(hashes[0]))))
+
+            chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+from modules.Blockchain.storage_utils.lazy import READ_AHEAD_SIZE
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 2 * READ_AHEAD_SIZE + 10
+
+RANGES = [
+    {},
+    {'start': 10},
+    {'start': 10, 'stop': 20},
+    {'start': 5, 'stop': 300, 'step': 7},
+    {'reverse': True},
+    {'start': 3, 'stop': 400, 'step': 3, 'reverse': True},
+    {'start': BLOCKS_COUNT + 5},
+]
+"""Arguments of iter_blocks the walks are checked with."""
+
+
+class IterBlocksTest(unittest.TestCase):
+    def setUp(self):
+        self.chain = ValidatedBlockchain(HashManagerDriver(), [Block(b'', b'', 0, b'data %d' % n) for n in range(BLOCKS_COUNT)])
+
+    def expected(self, start: int = 1, stop: int = None, step: int = 1, reverse: bool = False) -> list:
+        nums = range(1, len(self.chain) + 1)[start - 1:None if stop is None else stop - 1:step]
+        return [self.chain.get_block(num).hash for num in (reversed(nums) if reverse else nums)]
+
+    def test_ranges(self):
+        for args in RANGES:
+            self.assertEqual([block.hash for block in self.chain.iter_blocks(**args)], self.expected(**args), args)
+
+    def test_appends_while_iterating(self):
+        """Bounds are taken at the call."""
+
+        blocks = self.chain.iter_blocks(BLOCKS_COUNT - 1)
+        next(blocks)
+
+        self.chain.append_block(Block(b'', b'', 0, b'appended'))
+
+        self.assertEqual(len(list(blocks)), 1)
+
+    def test_stored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            factory = StoredBlockchainFactory()
+            path = os.path.join(directory, 'blockchain')
+
+            chain = factory.create(path, 'segment')
+            chain.append_blocks([self.chain.get_block(num) for num in range(1, BLOCKS_COUNT + 1)])
+            chain.close()
+
+            # Open writes the snapshot, so the lazy one doesn't rehash stored Blocks
+            factory.create(path).close()
+            chain = factory.create(path, lazy=True)
+
+            # Walks read ahead in batches without filling the cache
+            reads = []
+            cached = set(chain.blocks.cache)
+            read_blocks = chain.blocks.read_blocks
+            chain.blocks.read_blocks = lambda num, count: reads.append(count) or read_blocks(num, count)
+
+            for args in RANGES:
+                self.assertEqual([block.hash for block in chain.iter_blocks(**args)], self.expected(**args), args)
+
+            self.assertEqual(reads[:2], [READ_AHEAD_SIZE, READ_AHEAD_SIZE])
+            self.assertEqual(set(chain.blocks.cache), cached)
+            chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
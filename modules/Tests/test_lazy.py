@@ -0,0 +1,112 @@
+import random
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.storage_utils.lazy import LazyBlockList, BLOCK_OVERHEAD_SIZE
+
+
+BLOCKS_COUNT = 100
+
+EDITS_COUNT = 200
+
+
+class LazyBlockListTest(unittest.TestCase):
+    """Blocks of a plain list stand in for a storage."""
+
+    def setUp(self):
+        self.stored = [Block(b'', b'', n + 1, b'stored %d' % n) for n in range(BLOCKS_COUNT)]
+        self.reads = []
+
+    def read_block(self, num: int) -> Block:
+        self.reads.append(num)
+        return self.stored[num - 1]
+
+    def read_blocks(self, num: int, count: int) -> list:
+        self.reads.extend(range(num, num + count))
+        return self.stored[num - 1:num - 1 + count]
+
+    def create(self, **options) -> LazyBlockList:
+        return LazyBlockList(self.read_block, len(self.stored), read_blocks=self.read_blocks, **options)
+
+    def test_remapping(self):
+        """Removed and inserted Blocks shift the following ones without reading them."""
+
+        blocks = self.create()
+        expected = list(self.stored)
+        rand = random.Random(1)
+
+        for n in range(EDITS_COUNT):
+            index = rand.randrange(len(expected))
+
+            if rand.random() < 0.5 and len(expected) > 1:
+                del blocks[index]
+                del expected[index]
+
+            else:
+                block = Block(b'', b'', 0, b'inserted %d' % n)
+                blocks.insert(index, block)
+                expected.insert(index, block)
+
+        self.assertEqual(self.reads, [])
+
+        self.assertEqual(len(blocks), len(expected))
+        self.assertEqual([blocks[n] for n in range(len(expected))], expected)
+        self.assertEqual(list(blocks), expected)
+        self.assertEqual(list(blocks.iter_range(range(len(expected) - 1, -1, -1))), expected[::-1])
+
+    def test_eviction(self):
+        size = BLOCK_OVERHEAD_SIZE + len(self.stored[0].data)
+        blocks = self.create(cache_size=10 * size)
+
+        for n in range(BLOCKS_COUNT):
+            blocks[n]
+
+        self.assertLessEqual(blocks.cached_size, 10 * size)
+        self.assertLessEqual(len(blocks.cache), 10)
+
+        # Recent Blocks are cached, the first ones were evicted
+        self.reads.clear()
+        blocks[BLOCKS_COUNT - 1]
+        blocks[0]
+        self.assertEqual(self.reads, [1])
+
+    def test_iteration_keeps_cache(self):
+        blocks = self.create()
+        blocks[5]
+
+        list(blocks)
+        self.assertEqual(list(blocks.cache), [5])
+
+    def test_changed_blocks_are_not_evicted(self):
+        blocks = self.create(cache_size=1)
+        block = Block(b'', b'', 0, b'changed')
+
+        blocks[10] = block
+        blocks.append(block)
+
+        for n in range(BLOCKS_COUNT):
+            blocks[n]
+
+        self.assertIs(blocks[10], block)
+        self.assertIs(blocks[-1], block)
+        self.assertEqual(len(blocks.dirty), 2)
+
+    def test_rebase(self):
+        """Blocks taken by a write keep their places until it is done."""
+
+        blocks = self.create()
+        del blocks[0]
+
+        written = [blocks[n] for n in range(len(blocks))]
+        blocks.rebase(1, written)
+
+        self.assertEqual(blocks.run_offsets, [0])
+        self.assertEqual(len(blocks.dirty), len(written))
+
+        blocks.mark_clean(1, written)
+        self.assertEqual(blocks.dirty, {})
+        self.assertEqual(list(blocks), self.stored[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
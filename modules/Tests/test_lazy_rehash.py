@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 30
+
+EDITS = [(5, b'first'), (12, b'second'), (3, b'third')]
+"""Numbers and new data of the Blocks set by the tests."""
+
+
+class LazyRehashTest(unittest.TestCase):
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+        self.expected = self.create()
+        self.recalculations = []
+
+        for num, data in EDITS:
+            self.expected.set_block(Block(b'', b'', 0, data), num)
+
+        self.expected.remove_block(20)
+
+    def create(self, lazy_rehash: bool = False) -> ValidatedBlockchain:
+        return ValidatedBlockchain(self.hash_manager, [Block(b'', b'', 0, b'data %d' % n) for n in range(BLOCKS_COUNT)], lazy_rehash=lazy_rehash)
+
+    def count_recalculations(self, chain: ValidatedBlockchain):
+        recalculate_blockchain = chain.recalculate_blockchain
+        chain.recalculate_blockchain = lambda start: self.recalculations.append(start) or recalculate_blockchain(start)
+
+    def edit(self, chain: ValidatedBlockchain):
+        for num, data in EDITS:
+            chain.set_block(Block(b'', b'', 0, data), num)
+
+        chain.remove_block(20)
+
+    def assertSameBlocks(self, chain):
+        self.assertEqual(chain.hash, self.expected.hash)
+        self.assertEqual([block.hash for block in chain.iter_blocks(1)], [block.hash for block in self.expected.iter_blocks(1)])
+
+    def test_lazy_rehash(self):
+        chain = self.create(lazy_rehash=True)
+        self.count_recalculations(chain)
+
+        self.edit(chain)
+
+        self.assertEqual(self.recalculations, [])
+        self.assertEqual(chain.dirty_from, 3)
+
+        self.assertSameBlocks(chain)
+        self.assertEqual(self.recalculations, [3])
+
+    def test_transaction(self):
+        chain = self.create()
+        self.count_recalculations(chain)
+
+        with chain.transaction():
+            self.edit(chain)
+
+            with chain.transaction():
+                chain.append_block(Block(b'', b'', 0, b'appended'))
+
+            self.assertEqual(self.recalculations, [])
+
+        self.assertEqual(self.recalculations, [3])
+
+        self.expected.append_block(Block(b'', b'', 0, b'appended'))
+        self.assertSameBlocks(chain)
+
+    def test_stored(self):
+        """Edits are written on commit, appends right away."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            factory = StoredBlockchainFactory()
+            path = os.path.join(directory, 'blockchain')
+
+            chain = factory.create(path, 'segment', lazy_rehash=True)
+
+            for n in range(BLOCKS_COUNT):
+                chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+            self.assertIsNone(chain.dirty_from)
+
+            self.edit(chain)
+            self.assertEqual(chain.dirty_from, 3)
+
+            chain.commit()
+            self.assertIsNone(chain.dirty_from)
+            self.assertSameBlocks(chain)
+            chain.close()
+
+            chain = factory.create(path)
+            self.assertSameBlocks(chain)
+            chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
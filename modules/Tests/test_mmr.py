@@ -0,0 +1,176 @@
+import os
+import random
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block, InvalidBlockNumber
+from modules.Blockchain.mmr import MerkleMountainRange, mmr_size, bag_peaks, verify_proof
+from modules.Blockchain.storage_utils.mmr import MountainRangeFile, StoredMountainNodes
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 30
+
+
+class MerkleMountainRangeTest(unittest.TestCase):
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+        self.hash_size = self.hash_manager.get_hash_len()
+
+    def leaves(self, count: int) -> list:
+        return [self.hash_manager.hash(n.to_bytes(4, 'little')) for n in range(count)]
+
+    def test_proofs(self):
+        """Every leaf is proven for ranges of any shape."""
+
+        for count in range(1, 40):
+            leaves = self.leaves(count)
+            mmr = MerkleMountainRange(self.hash_manager)
+
+            for leaf in leaves:
+                mmr.append(leaf)
+
+            self.assertEqual(len(mmr.nodes), mmr_size(count))
+            self.assertEqual(len(mmr.peaks()), bin(count).count('1'))
+            self.assertEqual(mmr.root(), bag_peaks(self.hash_manager, mmr.peaks()))
+
+            for num, leaf in enumerate(leaves, 1):
+                self.assertEqual(mmr.get_leaf(num), leaf)
+
+                siblings = mmr.prove(num)
+                self.assertTrue(verify_proof(self.hash_manager, leaf, num, count, siblings, mmr.peaks()))
+                self.assertFalse(verify_proof(self.hash_manager, self.hash_manager.hash(b'other'), num, count, siblings, mmr.peaks()))
+
+    def test_prove_out_of_bounds(self):
+        mmr = MerkleMountainRange(self.hash_manager)
+        mmr.append(self.leaves(1)[0])
+
+        with self.assertRaises(InvalidBlockNumber):
+            mmr.prove(0)
+
+        with self.assertRaises(InvalidBlockNumber):
+            mmr.prove(2)
+
+    def test_truncate(self):
+        """Truncated range with the rest appended again equals the built one."""
+
+        leaves = self.leaves(37)
+        full = MerkleMountainRange(self.hash_manager)
+
+        for leaf in leaves:
+            full.append(leaf)
+
+        for kept in (0, 1, 16, 20, 36):
+            mmr = MerkleMountainRange(self.hash_manager)
+
+            for leaf in leaves:
+                mmr.append(leaf)
+
+            mmr.truncate(kept)
+            self.assertEqual(len(mmr), kept)
+
+            for leaf in leaves[kept:]:
+                mmr.append(leaf)
+
+            self.assertEqual(mmr.peaks(), full.peaks())
+            self.assertEqual(mmr.nodes.get_range(0, len(mmr.nodes)), full.nodes.get_range(0, len(full.nodes)))
+
+    def test_stored_nodes(self):
+        """Nodes kept in the file give the same range as nodes in memory."""
+
+        rnd = random.Random(7)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mmr')
+            file = MountainRangeFile(path, self.hash_size)
+            file.open()
+
+            stored = MerkleMountainRange(self.hash_manager, StoredMountainNodes(file))
+            memory = MerkleMountainRange(self.hash_manager)
+            leaves = []
+
+            for step in range(500):
+                operation = rnd.random()
+
+                if operation < 0.6:
+                    leaf = os.urandom(self.hash_size)
+                    leaves.append(leaf)
+                    stored.append(leaf)
+                    memory.append(leaf)
+
+                elif operation < 0.75:
+                    kept = rnd.randint(0, len(leaves))
+                    del leaves[kept:]
+                    stored.truncate(kept)
+                    memory.truncate(kept)
+
+                elif operation < 0.95:
+                    stored.nodes.store(mmr_size(rnd.randint(0, len(leaves))))
+
+                else:
+                    # Reopened file could keep nodes of dropped leaves after the stored ones
+                    stored.nodes.store(len(stored.nodes))
+                    file.close()
+
+                    file = MountainRangeFile(path, self.hash_size)
+                    file.open()
+
+                    stored = MerkleMountainRange(self.hash_manager, StoredMountainNodes(file))
+                    self.assertGreaterEqual(len(stored), len(leaves))
+                    stored.truncate(len(leaves))
+
+                self.assertEqual(stored.peaks(), memory.peaks(), step)
+                self.assertEqual(stored.nodes.get_range(0, len(stored.nodes)), memory.nodes.get_range(0, len(memory.nodes)), step)
+
+                if leaves:
+                    num = rnd.randint(1, len(leaves))
+                    self.assertEqual(stored.prove(num), memory.prove(num), step)
+
+            file.close()
+
+    def test_damaged_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mmr')
+
+            with open(path, 'wb') as file:
+                file.write(b'junk')
+
+            file = MountainRangeFile(path, self.hash_size)
+            file.open()
+
+            self.assertEqual(file.count, 0)
+            self.assertEqual(len(MerkleMountainRange(self.hash_manager, StoredMountainNodes(file))), 0)
+
+            file.close()
+
+
+class MountainRangeStorageTest(unittest.TestCase):
+    def test_proofs_after_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            factory = StoredBlockchainFactory()
+
+            for driver in ('file', 'segment', 'sqlite'):
+                path = os.path.join(directory, driver)
+                chain = factory.create(path, driver)
+
+                for n in range(BLOCKS_COUNT):
+                    chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+                chain.remove_block(BLOCKS_COUNT)
+                chain.set_block(Block(b'', b'', 0, b'changed'), 10)
+                count, peaks = chain.get_peaks()
+                chain.close()
+
+                chain = factory.create(path)
+                self.assertEqual(chain.get_peaks(), (count, peaks), driver)
+
+                for num in range(1, chain.num + 1):
+                    count, siblings, peaks = chain.get_proof(num)
+                    self.assertTrue(verify_proof(chain.hash_manager, chain.get_block(num).hash, num, count, siblings, peaks), driver)
+
+                chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import socket
+import threading
+import unittest
+
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver, InvalidHashAlgorithm, HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+from modules.Protocol.base.operations import ServerDeny
+from modules.Sockets.blockchain.protocol_factory import BlockchainNetworkManagerFactory
+import modules.Protocol.blockchain.header as ProtocolHeader
+import modules.Protocol.blockchain.operations as ProtocolOperations
+
+
+PACKET = ProtocolHeader.BlockchainProtocolPacket
+
+
+class NegotiateTest(unittest.TestCase):
+    """Hello of a client to a server answering it with the given Packet."""
+
+    def negotiate(self, answer, hash_manager=None):
+        client, served = socket.socketpair()
+
+        def serve():
+            manager = BlockchainNetworkManagerFactory.create(served, PACKET)
+            manager.recv()
+            manager.send(answer)
+
+        server = threading.Thread(target=serve, daemon=True)
+        server.start()
+
+        try:
+            return BlockchainNetworkManagerFactory.negotiate(client, PACKET, hash_manager)
+
+        finally:
+            server.join(5)
+            client.close()
+            served.close()
+
+    def test_hello(self):
+        manager = self.negotiate(ProtocolOperations.ProtocolHello([HASH_ALGORITHMS['sha256']], PACKET.SUPPORTED_FEATURES))
+
+        self.assertEqual(manager.hash_manager.get_algorithm_id(), HASH_ALGORITHMS['sha256'])
+        self.assertEqual(manager.version, PACKET.PROTOCOL_V2)
+        self.assertTrue(manager.tagged)
+
+    def test_server_without_hello(self):
+        """Old server denying hello is served with the default algorithm and no features."""
+
+        manager = self.negotiate(ServerDeny(b'Unknown operation!'))
+
+        self.assertEqual(manager.hash_manager.get_algorithm_id(), HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM])
+        self.assertEqual(manager.version, PACKET.PROTOCOL_V1)
+        self.assertFalse(manager.tagged)
+
+    def test_algorithm_not_offered(self):
+        with self.assertRaises(InvalidHashAlgorithm):
+            self.negotiate(ProtocolOperations.ProtocolHello([HASH_ALGORITHMS['sha1']]), HashManagerDriver('sha256'))
+
+        # Old servers use the default algorithm, which wasn't offered
+        with self.assertRaises(InvalidHashAlgorithm):
+            self.negotiate(ServerDeny(), HashManagerDriver('sha256'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,303 @@
+import hashlib
+import socket
+import threading
+import unittest
+
+from modules.Blockchain.blockchain import Block, Blockchain
+from modules.Blockchain.validator import BlockchainValidator
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver, WIDE_HASH_HEIGHT
+from modules.Sockets.blockchain.protocol_factory import BlockchainNetworkManagerFactory
+from modules.Protocol.base.operations import ServerDeny
+from modules.Protocol.header import PacketSizeDiffersFromGivenValue, PayloadSizeIsOutOfBounds, UnknownOperation
+import modules.Protocol.blockchain.header as ProtocolHeader
+import modules.Protocol.blockchain.operations as ProtocolOperations
+
+
+PACKET = ProtocolHeader.BlockchainProtocolPacket
+
+LARGE_DATA_SIZE = 300 * 1024
+"""Size of data of a large Block, more than a socket pair keeps unread."""
+
+RANGE_BLOCKS_COUNT = 100
+
+
+class RecordingSocket:
+    """Keeps sent bytes instead of sending them."""
+
+    def __init__(self):
+        self.sent = bytearray()
+
+    def setsockopt(self, *args):
+        raise OSError('Not a TCP socket')
+
+    def sendall(self, data: bytes):
+        self.sent += data
+
+
+class ProtocolTestCase(unittest.TestCase):
+    """Managers of both ends of a socket pair."""
+
+    FEATURES = 0
+    """Features both ends use."""
+
+    def setUp(self):
+        self.hash_manager = HashManagerDriver('sha256')
+        self.sockets = socket.socketpair()
+
+        self.sender, self.receiver = (BlockchainNetworkManagerFactory.create(end, PACKET, self.hash_manager) for end in self.sockets)
+
+        for manager in (self.sender, self.receiver):
+            manager.use_features(self.FEATURES)
+
+    def tearDown(self):
+        for end in self.sockets:
+            end.close()
+
+    def encode(self, packet, features: int = None) -> bytes:
+        """Gives the bytes the Packet is sent as. Features of the test are used if None."""
+
+        recorder = RecordingSocket()
+
+        manager = BlockchainNetworkManagerFactory.create(recorder, PACKET, self.hash_manager)
+        manager.use_features(self.FEATURES if features is None else features)
+        manager.send(packet)
+
+        return bytes(recorder.sent)
+
+    def block(self, num: int, data: bytes = b'data') -> Block:
+        prev_hash = b'\1' * self.hash_manager.get_hash_len()
+        return Block(self.hash_manager.hash_block(Block(b'', prev_hash, num, data)), prev_hash, num, data)
+
+
+class WideNumbersTest(ProtocolTestCase):
+    FEATURES = PACKET.FEATURE_WIDE_NUMBERS
+
+    def test_hash(self):
+        """Numbers below WIDE_HASH_HEIGHT are hashed as before, higher ones take 8 bytes."""
+
+        for num, size in ((WIDE_HASH_HEIGHT - 1, 2), (WIDE_HASH_HEIGHT, 8), (1 << 40, 8)):
+            block = self.block(num)
+
+            self.assertEqual(block.hash, hashlib.sha256(block.prev_hash + num.to_bytes(size, 'little') + block.data).digest())
+            BlockchainValidator(self.hash_manager).validate_block(block)
+
+    def test_wire(self):
+        block = self.block(WIDE_HASH_HEIGHT + 10)
+
+        self.sender.send(ProtocolOperations.BlockAdd(block, self.sender.num_bytes))
+        received = self.receiver.decode_block(self.receiver.recv())
+
+        self.assertEqual((received.num, received.hash, received.prev_hash, received.data), (block.num, block.hash, block.prev_hash, block.data))
+
+        self.sender.send(ProtocolOperations.LedgerRespondHeader(Blockchain(block.hash, 1 << 40), self.sender.num_bytes))
+        header = self.receiver.decode_header(self.receiver.recv())
+
+        self.assertEqual((header.num, header.hash), (1 << 40, block.hash))
+
+    def test_narrow_peer(self):
+        """Peers without the feature keep 2 byte numbers."""
+
+        manager = BlockchainNetworkManagerFactory.create(self.sockets[0], PACKET, self.hash_manager)
+        self.assertEqual(manager.num_bytes, PACKET.PACKET_BLOCK_SIZE_BYTES)
+
+        with self.assertRaises(OverflowError):
+            ProtocolOperations.BlockAdd(self.block(WIDE_HASH_HEIGHT), manager.num_bytes)
+
+
+class FramingTest(ProtocolTestCase):
+    def test_buffered_packets(self):
+        """Packets which came together are taken from the buffer."""
+
+        for n in range(1, 4):
+            self.sender.send(ProtocolOperations.BlockAdd(self.block(n)))
+
+        for n in range(1, 4):
+            self.assertEqual(self.receiver.decode_block(self.receiver.recv()).num, n)
+
+            if n < 3:
+                self.assertGreater(self.receiver.pending(), 0)
+
+        self.assertEqual(self.receiver.pending(), 0)
+
+    def test_split_packet(self):
+        """Packet coming byte by byte is received whole."""
+
+        data = self.encode(ProtocolOperations.BlockAdd(self.block(5, b'x' * 500))) * 2
+
+        def send():
+            for n in range(len(data)):
+                self.sockets[0].send(data[n:n + 1])
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+
+        for _ in range(2):
+            self.assertEqual(self.receiver.decode_block(self.receiver.recv()).data, b'x' * 500)
+
+        sender.join(5)
+
+    def test_cut_packet(self):
+        data = self.encode(ProtocolOperations.BlockAdd(self.block(1)))
+
+        self.sockets[0].sendall(data[:-3])
+        self.sockets[0].shutdown(socket.SHUT_WR)
+
+        with self.assertRaises(PacketSizeDiffersFromGivenValue):
+            self.receiver.recv()
+
+        with self.assertRaises(ConnectionResetError):
+            self.receiver.recv()
+
+    def test_frame_timeout(self):
+        """Packet started by the other side must be finished in time."""
+
+        self.receiver.frame_timeout = 0.1
+        self.sockets[0].sendall(self.encode(ProtocolOperations.LedgerAskHeader())[:3])
+
+        with self.assertRaises(socket.timeout):
+            self.receiver.recv()
+
+
+class BinaryFramingTest(ProtocolTestCase):
+    FEATURES = PACKET.FEATURE_PROTOCOL_V2
+
+    def test_round_trip(self):
+        packets = [
+            ProtocolOperations.LedgerAskHeader(),
+            ProtocolOperations.BlockAdd(self.block(7)),
+            ProtocolOperations.LedgerAskBlockByHash(self.block(7).hash),
+            ServerDeny(b'Denied!'),
+        ]
+
+        for packet in packets:
+            self.sender.send(packet)
+
+        for packet in packets:
+            received = self.receiver.recv()
+            self.assertEqual((received.operation, received.payload), (packet.operation, packet.payload))
+
+    def test_header_size(self):
+        packet = ProtocolOperations.LedgerRespondBlock(self.block(7))
+
+        binary = self.encode(packet)
+        text = self.encode(packet, 0)
+
+        self.assertEqual(len(binary), PACKET.BINARY_HEADER.size + len(packet.payload))
+        self.assertEqual(len(text) - len(packet.payload), PACKET.PACKET_SIZE_BYTES + len(packet.operation) + len(packet.delimiter))
+
+    def test_unknown_code(self):
+        self.sockets[0].sendall(PACKET.BINARY_HEADER.pack(0, 0x7f))
+
+        with self.assertRaises(UnknownOperation):
+            self.receiver.recv()
+
+    def test_request_ids(self):
+        for manager in (self.sender, self.receiver):
+            manager.use_features(PACKET.FEATURE_PROTOCOL_V2 | PACKET.FEATURE_REQUEST_IDS)
+
+        self.sender.send(ProtocolOperations.LedgerAskHeader(), 77)
+        self.sender.send(ServerDeny(), 5)
+
+        self.assertEqual([self.receiver.recv().request_id for _ in range(2)], [77, 5])
+
+
+class ChunkedTest(ProtocolTestCase):
+    FEATURES = PACKET.FEATURE_PROTOCOL_V2 | PACKET.FEATURE_CHUNKED_PACKETS
+
+    def send(self, *packets):
+        """Sends Packets from a thread, since large ones don't fit the socket."""
+
+        def send():
+            for packet in packets:
+                self.sender.send(packet)
+
+        sender = threading.Thread(target=send, daemon=True)
+        sender.start()
+
+        self.addCleanup(sender.join, 5)
+
+    def test_large_block(self):
+        block = self.block(3, bytes(range(256)) * (LARGE_DATA_SIZE // 256))
+        buffer_size = len(self.receiver.buffer)
+
+        self.send(ProtocolOperations.BlockAdd(block), ProtocolOperations.LedgerAskHeader())
+
+        packet = self.receiver.recv()
+        self.assertGreater(packet.remaining, 0)
+
+        received = self.receiver.decode_block(packet)
+        self.assertEqual((received.hash, received.prev_hash, received.data), (block.hash, block.prev_hash, block.data))
+
+        self.assertEqual(self.receiver.recv().operation, b'LEDGER_ASK_HEADER')
+        self.assertEqual(len(self.receiver.buffer), buffer_size)
+
+    def test_unread_chunks_are_skipped(self):
+        self.send(ProtocolOperations.BlockAdd(self.block(3, b'x' * LARGE_DATA_SIZE)), ProtocolOperations.LedgerAskHeader())
+
+        self.assertEqual(self.receiver.recv().operation, b'BLOCK_ADD')
+        self.assertEqual(self.receiver.recv().operation, b'LEDGER_ASK_HEADER')
+
+    def test_not_agreed(self):
+        self.sender.chunked = False
+
+        with self.assertRaises(PayloadSizeIsOutOfBounds):
+            self.sender.send(ProtocolOperations.BlockAdd(self.block(3, b'x' * (PACKET.HEADER_PAYLOAD_MAX_SIZE + 1))))
+
+
+class RangeTest(ProtocolTestCase):
+    def setUp(self):
+        super().setUp()
+        self.blocks = [self.block(n, b'data %d' % n * 10) for n in range(1, RANGE_BLOCKS_COUNT + 1)]
+
+    def receive_range(self) -> tuple:
+        """Receives responds until the last one.
+
+        Returns:
+            Blocks and sizes of the responds.
+        """
+
+        blocks = []
+        sizes = []
+        more = True
+
+        while more:
+            packet = self.receiver.recv()
+            sizes.append(len(packet.payload))
+
+            received, more = self.receiver.decode_range(packet)
+            blocks += received
+
+        return blocks, sizes
+
+    def test_paging(self):
+        self.assertEqual(self.sender.send_range(self.blocks), RANGE_BLOCKS_COUNT)
+
+        blocks, sizes = self.receive_range()
+
+        self.assertEqual([(block.num, block.hash, block.prev_hash, block.data) for block in blocks],
+                         [(block.num, block.hash, block.prev_hash, block.data) for block in self.blocks])
+
+        # Responds are packed up to the budget
+        self.assertGreater(len(sizes), 1)
+        self.assertLessEqual(max(sizes), PACKET.RANGE_FRAME_BUDGET)
+        self.assertLess(len(sizes), RANGE_BLOCKS_COUNT // 4)
+
+    def test_headers_only(self):
+        self.sender.send_range(self.blocks, headers_only=True)
+
+        blocks, _ = self.receive_range()
+
+        self.assertEqual([(block.num, block.hash, block.data) for block in blocks], [(block.num, block.hash, b'') for block in self.blocks])
+
+    def test_empty(self):
+        self.assertEqual(self.sender.send_range([]), 0)
+        self.assertEqual(self.receive_range(), ([], [1]))
+
+    def test_ask(self):
+        self.sender.send(ProtocolOperations.LedgerAskRange(70, 20, PACKET.RANGE_BACKWARD))
+
+        self.assertEqual(self.receiver.decode_range_ask(self.receiver.recv()), (70, 20, PACKET.RANGE_BACKWARD))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.storage_utils.converter import convert_file_storage
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+from modules.Blockchain.storage_utils.Drivers.segment import BlockchainSegmentStorage, INDEX_ENTRY
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 50
+
+SEGMENT_SIZE = 512
+"""Small enough for the test Blocks to take several segments."""
+
+
+class SegmentStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'blockchain')
+        self.hash_manager = HashManagerDriver()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self) -> BlockchainSegmentStorage:
+        return BlockchainSegmentStorage(self.hash_manager, self.path, SEGMENT_SIZE)
+
+    def fill(self, chain):
+        for n in range(BLOCKS_COUNT):
+            chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+    def assertSameBlocks(self, chain, expected):
+        self.assertEqual(len(chain), len(expected))
+        self.assertEqual(chain.hash, expected.hash)
+        self.assertEqual([block.hash for block in chain.iter_blocks(1)], [block.hash for block in expected.iter_blocks(1)])
+
+    def test_round_trip(self):
+        chain = self.open()
+        self.fill(chain)
+        chain.close()
+
+        expected = ValidatedBlockchain(self.hash_manager)
+        self.fill(expected)
+
+        chain = self.open()
+        self.assertGreater(len(chain.list_segments()), 1)
+        self.assertSameBlocks(chain, expected)
+        self.assertEqual(chain.get_block_by_hash(expected.get_block(20).hash).num, 20)
+        chain.close()
+
+    def test_edits(self):
+        chain = self.open()
+        expected = ValidatedBlockchain(self.hash_manager)
+
+        for target in (chain, expected):
+            self.fill(target)
+            target.set_block(Block(b'', b'', 0, b'changed'), 10)
+            target.remove_block(30)
+            target.remove_block(len(target))
+
+        self.assertSameBlocks(chain, expected)
+        chain.close()
+
+        chain = self.open()
+        self.assertSameBlocks(chain, expected)
+        chain.close()
+
+    def test_torn_index_record(self):
+        chain = self.open()
+        self.fill(chain)
+        chain.close()
+
+        # Part of the record of a Block whose append was interrupted
+        with open(os.path.join(self.path, 'index'), 'ab') as index:
+            index.write(b'\0' * (INDEX_ENTRY.size // 2))
+
+        chain = self.open()
+        self.assertEqual(len(chain), BLOCKS_COUNT)
+
+        chain.append_block(Block(b'', b'', 0, b'after'))
+        chain.close()
+
+        chain = self.open()
+        self.assertEqual(len(chain), BLOCKS_COUNT + 1)
+        self.assertEqual(chain.get_block(BLOCKS_COUNT + 1).data, b'after')
+        chain.close()
+
+    def test_convert_file_storage(self):
+        factory = StoredBlockchainFactory()
+
+        chain = factory.create(self.path, 'file')
+        self.fill(chain)
+        hashes = [block.hash for block in chain.iter_blocks(1)]
+        chain.close()
+
+        self.assertEqual(convert_file_storage(self.path), BLOCKS_COUNT)
+        self.assertNotIn('block1', os.listdir(self.path))
+
+        chain = factory.create(self.path)
+        self.assertIsInstance(chain, BlockchainSegmentStorage)
+        self.assertEqual([block.hash for block in chain.iter_blocks(1)], hashes)
+        chain.close()
+
+        with self.assertRaises(FileExistsError):
+            convert_file_storage(self.path)
+
+
+class CopyOnWriteTest(unittest.TestCase):
+    """Edits before the last Block are journaled and written by compaction."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'blockchain')
+        self.hash_manager = HashManagerDriver()
+
+        self.expected = ValidatedBlockchain(self.hash_manager)
+        self.chain = self.open(self.path)
+
+        for target in (self.chain, self.expected):
+            for n in range(BLOCKS_COUNT):
+                target.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+    def tearDown(self):
+        self.chain.close()
+        self.directory.cleanup()
+
+    def open(self, path: str) -> BlockchainSegmentStorage:
+        return BlockchainSegmentStorage(self.hash_manager, path, SEGMENT_SIZE, copy_on_write=True)
+
+    def edit(self):
+        for target in (self.chain, self.expected):
+            target.set_block(Block(b'', b'', 0, b'changed'), 3)
+            target.remove_block(5)
+
+    def assertSameBlocks(self, chain):
+        self.assertEqual(chain.hash, self.expected.hash)
+        self.assertEqual([block.hash for block in chain.iter_blocks(1)], [block.hash for block in self.expected.iter_blocks(1)])
+
+    def test_edits_are_journaled(self):
+        self.edit()
+
+        self.assertSameBlocks(self.chain)
+        self.assertFalse(self.chain.journal.is_empty())
+
+        # Index keeps only the appended records
+        self.assertEqual(os.path.getsize(os.path.join(self.path, 'index')), BLOCKS_COUNT * INDEX_ENTRY.size)
+
+    def test_journal_replay(self):
+        """Storage left before compaction is loaded with the journaled edits."""
+
+        self.edit()
+
+        copy = os.path.join(self.directory.name, 'copy')
+        shutil.copytree(self.path, copy)
+
+        chain = self.open(copy)
+        self.assertSameBlocks(chain)
+        chain.close()
+
+        chain = self.open(copy)
+        self.assertSameBlocks(chain)
+        chain.close()
+
+    def test_compact(self):
+        self.edit()
+        self.chain.compact()
+
+        self.assertTrue(self.chain.journal.is_empty())
+        self.assertSameBlocks(self.chain)
+
+        # Segments of the rewritten Blocks are reclaimed
+        self.assertNotIn(0, self.chain.list_segments())
+
+        self.chain.close()
+        self.chain = self.open(self.path)
+        self.assertSameBlocks(self.chain)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import concurrent.futures
+import socket
+import threading
+import time
+import unittest
+
+import modules.Server.server as server
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.validation_utils.factories import BlockTreeFactory
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+from modules.Sockets.blockchain.protocol_factory import BlockchainNetworkManagerFactory
+from modules.Sockets.blockchain.pipeline import RequestPipeline
+import modules.Protocol.blockchain.header as ProtocolHeader
+import modules.Protocol.blockchain.operations as ProtocolOperations
+
+
+BLOCKS_COUNT = 10
+
+CLIENT_ADDRESS = ('10.0.0.1', 1)
+"""Untrusted address the test client is served as."""
+
+
+class ServerConnectionTest(unittest.TestCase):
+    """Connection of a pipelining client served over a socket pair."""
+
+    def setUp(self):
+        hash_manager = HashManagerDriver()
+        self.chain = ValidatedBlockchain(hash_manager, [Block(b'', b'', 0, b'data %d' % n) for n in range(BLOCKS_COUNT)])
+        self.tree = BlockTreeFactory().create(self.chain)
+
+        self.frame_timeout = server.CLIENT_FRAME_TIMEOUT
+        server.CLIENT_FRAME_TIMEOUT = 0.2
+
+        self.workers = concurrent.futures.ThreadPoolExecutor(4)
+        self.client, served = socket.socketpair()
+
+        self.connection = threading.Thread(target=server.server_connection, args=(served, CLIENT_ADDRESS, self.tree, self.workers), daemon=True)
+        self.connection.start()
+
+        self.manager = BlockchainNetworkManagerFactory.negotiate(self.client, ProtocolHeader.BlockchainProtocolPacket, hash_manager)
+        self.pipeline = RequestPipeline(self.manager)
+
+    def tearDown(self):
+        self.pipeline.close()
+        self.connection.join(5)
+        self.workers.shutdown()
+
+        server.CLIENT_FRAME_TIMEOUT = self.frame_timeout
+
+    def ask_block(self, num: int):
+        return self.pipeline.request(ProtocolOperations.LedgerAskBlock(Block(b'', b'', num, b''), self.manager.num_bytes))
+
+    def test_out_of_order(self):
+        """Respond held by the tree lock doesn't hold responds to later requests."""
+
+        with self.tree.lock:
+            held = self.ask_block(3)
+            denied = self.pipeline.request(ProtocolOperations.LedgerAskBlockByHash(b'short'))
+
+            self.assertEqual(denied.result(5).operation, b'SERVER_DENY')
+            self.assertFalse(held.done())
+
+        block = self.manager.decode_block(held.result(5))
+        self.assertEqual(block.hash, self.chain.get_block(3).hash)
+
+    def test_failed_request_keeps_connection(self):
+        spread = self.pipeline.request(ProtocolOperations.BlockSpread(self.chain.get_block(1), self.manager.num_bytes))
+        self.assertEqual(spread.result(5).operation, b'SERVER_DENY')
+
+        self.assertEqual(self.ask_block(1).result(5).operation, b'LEDGER_RESPOND_BLOCK')
+
+    def test_hello_with_id(self):
+        hello = self.pipeline.request(ProtocolOperations.ProtocolHello([self.chain.hash_manager.get_algorithm_id()], ProtocolHeader.BlockchainProtocolPacket.SUPPORTED_FEATURES))
+        self.assertEqual(hello.result(5).operation, b'PROTOCOL_HELLO')
+
+        self.assertEqual(self.ask_block(2).result(5).operation, b'LEDGER_RESPOND_BLOCK')
+
+    def test_idle_connection_kept(self):
+        time.sleep(3 * server.CLIENT_FRAME_TIMEOUT)
+
+        self.assertEqual(self.ask_block(1).result(5).operation, b'LEDGER_RESPOND_BLOCK')
+
+    def test_range(self):
+        forward = self.pipeline.ask_range(3, 4).result(5)
+        backward = self.pipeline.ask_range(BLOCKS_COUNT, BLOCKS_COUNT + 5, ProtocolHeader.BlockchainProtocolPacket.RANGE_BACKWARD, True).result(5)
+
+        for responds, nums in ((forward, [3, 4, 5, 6]), (backward, list(range(BLOCKS_COUNT, 0, -1)))):
+            blocks = [block for respond in responds for block in self.manager.decode_range(respond)[0]]
+
+            self.assertEqual([block.num for block in blocks], nums)
+            self.assertEqual([block.hash for block in blocks], [self.chain.get_block(num).hash for num in nums])
+
+        self.assertEqual([respond.operation for respond in self.pipeline.ask_range(BLOCKS_COUNT + 1, 2).result(5)], [b'SERVER_DENY'])
+
+    def test_started_packet_times_out(self):
+        # Header of a frame the rest of which never comes
+        with self.manager.send_lock:
+            self.client.sendall(self.manager.pack_frame(10, ProtocolHeader.BlockchainProtocolPacket.OPERATION_CODES[b'BLOCK_ADD'], 1)[:3])
+
+        self.connection.join(5)
+        self.assertFalse(self.connection.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+
+
+BLOCKS_COUNT = 30
+
+
+class SnapshotTest(unittest.TestCase):
+    """Snapshot verification of the file storage."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'chain')
+        self.factory = StoredBlockchainFactory()
+
+        chain = self.factory.create(self.path, 'file')
+
+        for n in range(BLOCKS_COUNT):
+            chain.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+        chain.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def block_path(self, num: int) -> str:
+        return os.path.join(self.path, f'block{num}')
+
+    def test_snapshot_is_trusted(self):
+        chain = self.factory.create(self.path)
+
+        self.assertIsNotNone(chain.snapshot)
+        self.assertEqual(chain.snapshot.height, BLOCKS_COUNT)
+        self.assertEqual(chain.verified_height(chain.blocks, chain.snapshots.read()), BLOCKS_COUNT)
+        self.assertIsNone(chain.invalid_from)
+
+        chain.close()
+
+    def test_interrupted_rewrite(self):
+        """Block rewritten by a write interrupted under the snapshot is rehashed, reported and left as it is."""
+
+        chain = self.factory.create(self.path)
+        chain.lower_snapshot(5)
+        chain.close()
+
+        with open(self.block_path(5), 'r+b') as file:
+            file.seek(-1, os.SEEK_END)
+            file.write(b'X')
+
+        with open(self.block_path(5), 'rb') as file:
+            tampered = file.read()
+
+        chain = self.factory.create(self.path)
+
+        self.assertEqual(chain.invalid_from, 5)
+        self.assertIsNone(chain.snapshot)
+        self.assertEqual(chain.snapshots.read().height, 4)
+
+        chain.close()
+
+        with open(self.block_path(5), 'rb') as file:
+            self.assertEqual(file.read(), tampered)
+
+    def test_edit_refreshes_snapshot(self):
+        chain = self.factory.create(self.path)
+        chain.set_block(Block(b'', b'', 0, b'changed'), 10)
+        hash = chain.hash
+        chain.close()
+
+        chain = self.factory.create(self.path, lazy=True)
+
+        self.assertEqual(chain.snapshot.height, BLOCKS_COUNT)
+        self.assertEqual(chain.hash, hash)
+        self.assertIsNone(chain.invalid_from)
+
+        chain.close()
+
+    def test_checksum_reads_last_block_only(self):
+        chain = self.factory.create(self.path)
+        checksum = chain.storage_checksum(BLOCKS_COUNT)
+
+        os.remove(self.block_path(1))
+        self.assertEqual(chain.storage_checksum(BLOCKS_COUNT), checksum)
+
+        chain.close()
+
+    def test_full_verify(self):
+        chain = self.factory.create(self.path, full_verify=True)
+
+        self.assertIsNone(chain.invalid_from)
+        self.assertEqual(chain.num, BLOCKS_COUNT)
+
+        chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
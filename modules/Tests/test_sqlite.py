@@ -0,0 +1,94 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from modules.Blockchain.blockchain import Block
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.storage_utils.factory import StoredBlockchainFactory
+from modules.Blockchain.storage_utils.Drivers.sqlite import BlockchainSQLiteStorage
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 50
+
+
+class SQLiteStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'blockchain')
+        self.factory = StoredBlockchainFactory()
+
+        self.expected = ValidatedBlockchain(HashManagerDriver())
+        chain = self.factory.create(self.path, 'sqlite')
+
+        for target in (chain, self.expected):
+            for n in range(BLOCKS_COUNT):
+                target.append_block(Block(b'', b'', 0, b'data %d' % n))
+
+        chain.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameBlocks(self, chain):
+        self.assertEqual(len(chain), len(self.expected))
+        self.assertEqual(chain.hash, self.expected.hash)
+        self.assertEqual([block.hash for block in chain.iter_blocks(1)], [block.hash for block in self.expected.iter_blocks(1)])
+
+    def test_round_trip(self):
+        for lazy in (False, True):
+            chain = self.factory.create(self.path, lazy=lazy)
+
+            self.assertIsInstance(chain, BlockchainSQLiteStorage)
+            self.assertSameBlocks(chain)
+            chain.close()
+
+    def test_edits(self):
+        chain = self.factory.create(self.path)
+
+        for target in (chain, self.expected):
+            target.set_block(Block(b'', b'', 0, b'changed'), 10)
+            target.remove_block(20)
+
+        chain.close()
+
+        chain = self.factory.create(self.path, lazy=True)
+        self.assertSameBlocks(chain)
+        self.assertGreater(chain.read_generation(), 0)
+        chain.close()
+
+    def test_find_block(self):
+        chain = self.factory.create(self.path, lazy=True)
+        block = self.expected.get_block(30)
+
+        self.assertEqual(chain.find_block(block.hash), 30)
+        self.assertIsNone(chain.find_block(b'\0' * len(block.hash)))
+        self.assertEqual(chain.get_block_by_hash(block.hash).num, 30)
+        chain.close()
+
+    def test_concurrent_readers(self):
+        """Every thread reads through its own connection."""
+
+        chain = self.factory.create(self.path, lazy=True)
+        hashes = [block.hash for block in self.expected.iter_blocks(1)]
+        results = []
+
+        def read():
+            results.append([chain.read_block(num).hash for num in range(1, BLOCKS_COUNT + 1)])
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+
+        for reader in readers:
+            reader.start()
+
+        for reader in readers:
+            reader.join(5)
+
+        self.assertEqual(results, [hashes] * len(readers))
+        self.assertGreaterEqual(len(chain.opened), len(readers) + 1)
+        chain.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+
+from modules.Blockchain.blockchain import Block, Blockchain, InvalidHash, InvalidLink
+from modules.Blockchain.validator import BlockchainValidator, ParallelBlockchainValidator, VALIDATION_EXECUTOR_PROCESS, VALIDATION_EXECUTOR_THREAD
+from modules.Blockchain.validation_cache import CachedBlockchainValidator
+from modules.Blockchain.validated_blockchain import ValidatedBlockchain
+from modules.Blockchain.server_blockchain import ServerBlockchain
+from modules.Blockchain.utils.Drivers.hash import HashManagerDriver
+
+
+BLOCKS_COUNT = 8
+
+CHECKPOINT = 5
+
+CHUNK_SIZE = 7
+"""Chunk size of the parallel validator, small enough for several chunks."""
+
+PARALLEL_BLOCKS_COUNT = 30
+
+
+class CheckpointTest(unittest.TestCase):
+    """History below a checkpoint is trusted only after the checkpoint Block is rehashed."""
+
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+
+        chain = ValidatedBlockchain(self.hash_manager, [Block(b'', b'', n, b'data %d' % n) for n in range(1, BLOCKS_COUNT + 1)])
+        self.real = [chain.get_block(n) for n in range(1, BLOCKS_COUNT + 1)]
+
+        # Forged history ending with a Block claiming the checkpoint hash
+        junk = ValidatedBlockchain(self.hash_manager, [Block(b'', b'', n, b'junk') for n in range(1, CHECKPOINT)])
+        junk_blocks = [junk.get_block(n) for n in range(1, CHECKPOINT)]
+        claimed = Block(self.real[CHECKPOINT - 1].hash, junk_blocks[-1].hash, CHECKPOINT, b'forged')
+        self.forged = junk_blocks + [claimed] + self.real[CHECKPOINT:]
+
+        self.validator = BlockchainValidator(self.hash_manager, [(CHECKPOINT, self.real[CHECKPOINT - 1].hash)])
+
+    def chain(self, blocks: list) -> Blockchain:
+        return Blockchain(self.real[-1].hash, BLOCKS_COUNT, blocks)
+
+    def test_real_history(self):
+        self.validator.validate_blockchain(self.chain(self.real))
+
+    def test_forged_history_in_table(self):
+        with self.assertRaises(InvalidHash):
+            self.validator.validate_blockchain(self.chain(self.forged))
+
+    def test_forged_history_in_list(self):
+        chain = self.chain([])
+        chain.blocks = list(self.forged)
+
+        with self.assertRaises(InvalidHash):
+            self.validator.validate_blockchain(chain)
+
+    def test_download(self):
+        """Blocks downloaded from the tip are rehashed down to the checkpoint."""
+
+        for blocks, valid in ((self.real, True), (self.forged, False)):
+            chain = ServerBlockchain(self.validator, Blockchain(self.real[-1].hash, BLOCKS_COUNT))
+
+            if valid:
+                for block in reversed(blocks):
+                    chain.insert_block(block)
+
+                continue
+
+            with self.assertRaises(InvalidHash):
+                for block in reversed(blocks):
+                    chain.insert_block(block)
+
+
+class ParallelValidatorTest(unittest.TestCase):
+    """Chunks are checked by workers, links between them afterwards."""
+
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+
+        chain = ValidatedBlockchain(self.hash_manager, [Block(b'', b'', 0, b'data %d' % n) for n in range(PARALLEL_BLOCKS_COUNT)])
+        self.blocks = [chain.get_block(n) for n in range(1, PARALLEL_BLOCKS_COUNT + 1)]
+
+    def chain(self) -> Blockchain:
+        return Blockchain(self.blocks[-1].hash, PARALLEL_BLOCKS_COUNT, self.blocks)
+
+    def validator(self, executor: str = VALIDATION_EXECUTOR_THREAD) -> ParallelBlockchainValidator:
+        return ParallelBlockchainValidator(self.hash_manager, 2, executor, CHUNK_SIZE)
+
+    def damage(self):
+        """Changes data of Block 4 and relinks Block 15, the first one of the third chunk."""
+
+        block = self.blocks[3]
+        self.blocks[3] = Block(block.hash, block.prev_hash, block.num, b'changed')
+
+        block = self.blocks[14]
+        relinked = Block(b'', b'\1' * self.hash_manager.get_hash_len(), block.num, block.data)
+        self.blocks[14] = Block(self.hash_manager.hash_block(relinked), relinked.prev_hash, relinked.num, relinked.data)
+
+    def test_valid(self):
+        for executor in (VALIDATION_EXECUTOR_THREAD, VALIDATION_EXECUTOR_PROCESS):
+            self.validator(executor).validate_blockchain(self.chain())
+            self.assertEqual(self.validator(executor).audit_blockchain(self.chain()), [])
+
+    def test_audit(self):
+        self.damage()
+
+        errors = self.validator().audit_blockchain(self.chain())
+
+        self.assertEqual([num for num, _ in errors], [4, 15, 16])
+        self.assertEqual([type(error) for _, error in errors], [InvalidHash, InvalidLink, InvalidLink])
+
+    def test_first_error(self):
+        """Error of the lowest invalid Block is raised."""
+
+        self.damage()
+
+        with self.assertRaises(InvalidHash):
+            self.validator().validate_blockchain(self.chain())
+
+
+class ValidationCacheTest(unittest.TestCase):
+    """Repeated deliveries of a Block are answered without hashing."""
+
+    def setUp(self):
+        self.hash_manager = HashManagerDriver()
+        self.validator = CachedBlockchainValidator(self.hash_manager, 2, 2)
+
+        self.hashed = []
+        hash_block = self.hash_manager.hash_block
+        self.hash_manager.hash_block = lambda block: self.hashed.append(block.num) or hash_block(block)
+
+        chain = ValidatedBlockchain(HashManagerDriver(), [Block(b'', b'', 0, b'data %d' % n) for n in range(3)])
+        self.blocks = [chain.get_block(n) for n in range(1, 4)]
+
+    def test_valid(self):
+        for _ in range(3):
+            self.validator.validate_block(self.blocks[1])
+
+        self.assertEqual(self.hashed, [2])
+
+    def test_rejected(self):
+        block = self.blocks[1]
+        forged = Block(block.hash, block.prev_hash, block.num, b'forged')
+
+        for _ in range(3):
+            with self.assertRaises(InvalidHash):
+                self.validator.validate_block(forged)
+
+        self.assertEqual(self.hashed, [2])
+
+        # Result of a forged Block doesn't stick to the real one claiming the same hash
+        self.validator.validate_block(block)
+        self.assertEqual(self.hashed, [2, 2])
+
+    def test_bounded(self):
+        for block in self.blocks:
+            self.validator.validate_block(block)
+
+        self.assertEqual(len(self.validator.valid), 2)
+
+        self.validator.validate_block(self.blocks[0])
+        self.validator.validate_block(self.blocks[2])
+        self.assertEqual(self.hashed, [1, 2, 3, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from modules.Blockchain.storage_utils.writer import GroupCommitWriter
+
+
+class MergeTest(unittest.TestCase):
+    """Blocks are stood in for by strings, merge only moves them."""
+
+    def test_single(self):
+        self.assertEqual(GroupCommitWriter.merge([(3, ['c', 'd'])]), (3, ['c', 'd']))
+
+    def test_appends(self):
+        writes = [(1, ['a']), (2, ['b']), (3, ['c', 'd'])]
+        self.assertEqual(GroupCommitWriter.merge(writes), (1, ['a', 'b', 'c', 'd']))
+
+    def test_later_replaces_suffix(self):
+        writes = [(1, ['a', 'b', 'c', 'd']), (3, ['x'])]
+        self.assertEqual(GroupCommitWriter.merge(writes), (1, ['a', 'b', 'x']))
+
+    def test_later_starts_before(self):
+        writes = [(4, ['d', 'e']), (2, ['y', 'z']), (4, ['w'])]
+        self.assertEqual(GroupCommitWriter.merge(writes), (2, ['y', 'z', 'w']))
+
+    def test_removal(self):
+        writes = [(1, ['a', 'b', 'c']), (2, [])]
+        self.assertEqual(GroupCommitWriter.merge(writes), (1, ['a']))
+
+    def test_writes_are_not_changed(self):
+        first = ['a', 'b']
+        GroupCommitWriter.merge([(1, first), (2, ['x'])])
+
+        self.assertEqual(first, ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()